@@ -0,0 +1,160 @@
+"""複数ファイルの一括変換を行うモジュール"""
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from .compiled_config import CompiledConfig
+from .converter import XmlToExcelConverter
+
+# 一括変換でディレクトリから入力とするファイルの拡張子
+XML_SUFFIX = ".xml"
+
+# ワーカープロセスごとのコンバーター（initializer で設定を共有する）
+_worker_converter: Optional[XmlToExcelConverter] = None
+
+
+class ConversionResult(NamedTuple):
+    """1ファイルの変換結果"""
+
+    input_file: str
+    output_file: str
+    error: Optional[str] = None
+    # 統計情報（collect_stats を有効にして変換に成功した場合のみ）
+    stats: Optional[Dict[str, Any]] = None
+
+    @property
+    def succeeded(self) -> bool:
+        """変換に成功したかどうか"""
+        return self.error is None
+
+
+def expand_inputs(patterns: Iterable[str], list_file: Optional[str] = None) -> List[str]:
+    """入力指定を変換対象のファイルパスのリストに展開
+
+    Args:
+        patterns: ファイルパス、globパターン、またはディレクトリ（直下の .xml ファイル）
+        list_file: 1行に1つの入力指定を記載したファイルのパス（オプション）
+
+    Returns:
+        重複を除いた入力ファイルパスのリスト（指定順）。一致するファイルがないパターンは
+        そのまま含めるため、存在確認は呼び出し側で行う
+    """
+    specs = list(patterns)
+    if list_file:
+        with open(list_file, "r", encoding="utf-8") as f:
+            specs.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+
+    files: Dict[str, None] = {}
+    for spec in specs:
+        if glob.has_magic(spec):
+            matches = sorted(glob.glob(spec, recursive=True))
+            files.update(dict.fromkeys(matches or [spec]))
+        elif os.path.isdir(spec):
+            matches = sorted(str(path) for path in Path(spec).iterdir() if path.suffix.lower() == XML_SUFFIX)
+            files.update(dict.fromkeys(matches))
+        else:
+            files[spec] = None
+    return list(files)
+
+
+def plan_outputs(input_files: Sequence[str], output: str, suffix: str = ".xlsx") -> List[Tuple[str, str]]:
+    """入力ファイルごとの出力ファイルパスを決定
+
+    入力が1ファイルで出力先がディレクトリでない場合は出力先をそのままファイルパスとし、
+    それ以外は出力先ディレクトリに「入力ファイル名 + 拡張子」として出力する。
+
+    Args:
+        input_files: 入力ファイルパスのリスト
+        output: 出力ファイルまたは出力ディレクトリのパス
+        suffix: 出力先ディレクトリに出力する場合の拡張子
+
+    Returns:
+        (入力ファイル, 出力ファイル) のリスト
+
+    Raises:
+        ValueError: 出力ファイル名が重複する場合
+    """
+    if len(input_files) == 1 and not os.path.isdir(output):
+        return [(input_files[0], output)]
+
+    plan = []
+    outputs: Dict[str, str] = {}
+    for input_file in input_files:
+        output_file = os.path.join(output, f"{Path(input_file).stem}{suffix}")
+        if output_file in outputs:
+            raise ValueError(f"出力ファイル名が重複しています: {outputs[output_file]}, {input_file}")
+        outputs[output_file] = input_file
+        plan.append((input_file, output_file))
+    return plan
+
+
+def _create_converter(config: Union[Dict[str, Any], CompiledConfig], options: Dict[str, Any]) -> XmlToExcelConverter:
+    """読み込み済みの設定を使うコンバーターを作成"""
+    converter = XmlToExcelConverter(**options)
+    if isinstance(config, CompiledConfig):
+        converter.compiled_config = config
+    else:
+        converter.config = config
+    return converter
+
+
+def _convert_with(converter: XmlToExcelConverter, task: Tuple[str, str]) -> ConversionResult:
+    """1ファイルを変換し、失敗した場合はエラー内容を結果に含める"""
+    input_file, output_file = task
+    try:
+        converter.convert(input_file, output_file)
+    except Exception as e:
+        return ConversionResult(input_file, output_file, str(e) or type(e).__name__)
+    stats = converter.stats.as_dict() if converter.collect_stats else None
+    return ConversionResult(input_file, output_file, stats=stats)
+
+
+def _init_worker(config: Union[Dict[str, Any], CompiledConfig], options: Dict[str, Any]) -> None:
+    """ワーカープロセスのコンバーターを初期化"""
+    global _worker_converter
+    _worker_converter = _create_converter(config, options)
+
+
+def _convert_file(task: Tuple[str, str]) -> ConversionResult:
+    """ワーカープロセスで1ファイルを変換"""
+    if _worker_converter is None:
+        return ConversionResult(task[0], task[1], "ワーカーが初期化されていません")
+    return _convert_with(_worker_converter, task)
+
+
+def convert_files(
+    tasks: Sequence[Tuple[str, str]],
+    config: Union[Dict[str, Any], CompiledConfig],
+    jobs: int = 1,
+    **options: Any,
+) -> Iterator[ConversionResult]:
+    """複数のXMLファイルをExcelに変換
+
+    設定は読み込み済みのものを各ワーカープロセスに一度だけ渡し、
+    ファイルごとに読み込み直さない。1ファイルの失敗は他のファイルの変換に影響しない。
+
+    Args:
+        tasks: (入力ファイル, 出力ファイル) のリスト
+        config: 読み込み済みの設定データ、または構築済みの設定（各ワーカーで構築し直さない）
+        jobs: 並列に変換するプロセス数。1の場合は現在のプロセスで順に変換し、
+            0以下の場合はCPU数とする
+        **options: XmlToExcelConverter に渡すオプション（streaming など）
+
+    Yields:
+        ファイルごとの変換結果（tasks の順序）
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(tasks))
+    if jobs <= 1:
+        converter = _create_converter(config, options)
+        for task in tasks:
+            yield _convert_with(converter, task)
+        return
+
+    # 小さなファイルが大量にある場合のプロセス間通信を減らすため、まとめて割り当てる
+    chunksize = max(1, min(64, len(tasks) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config, options)) as executor:
+        yield from executor.map(_convert_file, tasks, chunksize=chunksize)
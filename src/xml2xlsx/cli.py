@@ -1,17 +1,30 @@
 """コマンドラインインターフェース"""
 
+import os
 import sys
+import json
 import argparse
 import logging
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterable, List, Optional
 from . import __version__
+from .batch import ConversionResult, convert_files, expand_inputs, plan_outputs
 from .converter import XmlToExcelConverter
-from .config_generator import generate_config
+from .config import load_config
+from .config_generator import SamplingOptions, generate_config
 from .exceptions import ConfigurationError
+from .parsers import PARSER_BACKENDS
+from .profiling import Profile, mapping_count, profile
+from .stats import STAGES
+from .writers import OUTPUT_FORMATS, format_suffix
 
 logger = logging.getLogger(__name__)
 
 
+_PROFILE_HELP = "処理のプロファイルを PATH.pstats と PATH.collapsed.txt（フレームグラフ用）に出力する（1プロセスで処理）"
+
+
 def create_parser() -> argparse.ArgumentParser:
     """コマンドラインパーサーを作成"""
     parser = argparse.ArgumentParser(
@@ -24,25 +37,178 @@ def create_parser() -> argparse.ArgumentParser:
 
     # convertコマンド
     convert_parser = subparsers.add_parser("convert", help="XMLをExcelに変換")
-    convert_parser.add_argument("-i", "--input", help="入力XMLファイル")
+    convert_parser.add_argument(
+        "-i", "--input", nargs="+", help="入力XMLファイル（複数指定、globパターン、ディレクトリも可）"
+    )
+    convert_parser.add_argument("--input-list", help="入力XMLファイルを1行に1つ記載したファイル")
     convert_parser.add_argument("-c", "--config", help="設定ファイル")
-    convert_parser.add_argument("-o", "--output", help="出力Excelファイル")
+    convert_parser.add_argument("-o", "--output", help="出力Excelファイル（入力が複数の場合は出力ディレクトリ）")
+    convert_parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        help="出力形式（デフォルト: 出力ファイルの拡張子から判定、なければ xlsx）。xlsx 以外はシートごとにファイルを作成",
+    )
+    convert_parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="並列に変換するプロセス数（0の場合はCPU数、デフォルト: 1）"
+    )
+    convert_parser.add_argument(
+        "--streaming", action="store_true", help="XML全体を読み込まずに逐次処理する（大容量ファイル向け）"
+    )
+    convert_parser.add_argument(
+        "--write-only", action="store_true", help="openpyxlの書き込み専用モードで出力する（大容量ファイル向け）"
+    )
+    convert_parser.add_argument(
+        "--pipeline", action="store_true", help="行データを蓄積せずに生成順に出力する（大容量ファイル向け）"
+    )
+    convert_parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        help="XMLのパーサー（デフォルト: 設定ファイルの options.parser、なければ stdlib）",
+    )
+    convert_parser.add_argument(
+        "--stats", action="store_true", help="処理段階ごとの時間、要素数、行数などの統計情報を表示する"
+    )
+    convert_parser.add_argument("--stats-json", metavar="PATH", help="統計情報をJSONファイルに保存する")
+    convert_parser.add_argument("--profile", metavar="PATH", help=_PROFILE_HELP)
+    convert_parser.add_argument(
+        "--config-cache",
+        metavar="DIR",
+        help="構築済みの設定をキャッシュするディレクトリ（デフォルト: 環境変数 XML2XLSX_CONFIG_CACHE）",
+    )
 
     # generateコマンド
     generate_parser = subparsers.add_parser("generate", help="設定ファイルを生成")
-    generate_parser.add_argument("-i", "--input", help="入力XMLファイル")
+    generate_parser.add_argument(
+        "-i", "--input", nargs="+", help="入力XMLファイル（複数指定、globパターン、ディレクトリも可）"
+    )
+    generate_parser.add_argument("--input-list", help="入力XMLファイルを1行に1つ記載したファイル")
     generate_parser.add_argument("-o", "--output", help="出力設定ファイル")
+    generate_parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="並列に解析するプロセス数（0の場合はCPU数、デフォルト: 1）"
+    )
+    generate_parser.add_argument("--sample-per-path", type=int, help="パスごとに解析する要素数の上限")
+    generate_parser.add_argument(
+        "--sample-bytes", type=_parse_size, help="ファイルごとに読み込むバイト数の上限（例: 100M, 2G）"
+    )
+    generate_parser.add_argument(
+        "--sample-ratio", type=float, help="繰り返し出現する同名の兄弟要素のうち解析する割合（0より大きく1以下）"
+    )
+    generate_parser.add_argument(
+        "--stop-after", type=int, help="新しいパス・属性・子要素が見つからない要素がこの数だけ続いたら解析を終了"
+    )
+    generate_parser.add_argument(
+        "--parser", choices=PARSER_BACKENDS, default="stdlib", help="XMLのパーサー（デフォルト: stdlib）"
+    )
+    generate_parser.add_argument("--profile", metavar="PATH", help=_PROFILE_HELP)
 
     return parser
 
 
+def _parse_size(value: str) -> int:
+    """K/M/G の単位付きのバイト数を解析"""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    text = value.strip().upper().removesuffix("B")
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"不正なサイズです: {value}")
+
+
+def _format_size(size: float) -> str:
+    """バイト数を読みやすい単位で表記"""
+    if size < 1024:
+        return f"{size:.0f}B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f}{unit}"
+
+
+def _format_stats(input_file: str, stats: Dict[str, Any]) -> str:
+    """統計情報を表示用の文字列に整形"""
+    lines = [
+        f"統計情報: {input_file}",
+        f"  {'stage':<10}{'wall':>10}{'cpu':>10}{'calls':>10}",
+    ]
+    for name, stage in stats["stages"].items():
+        lines.append(
+            f"  {name:<10}{stage['wall']:>9.3f}s{stage['cpu']:>9.3f}s{stage['calls']:>10}  {STAGES.get(name, '')}"
+        )
+    lines.append(f"  {'total':<10}{stats['wall']:>9.3f}s{stats['cpu']:>9.3f}s{'':>10}  合計")
+    lines.append(
+        f"  要素数: {stats['elements_visited']}（読み飛ばし {stats['elements_skipped']}）、"
+        f"エンティティ数: {stats['entities_created']}"
+    )
+    lines.append(
+        f"  マッピング設定の検索: キャッシュヒット {stats['mapping_cache_hits']}、"
+        f"ミス {stats['mapping_cache_misses']}"
+    )
+    rows = "、".join(f"{sheet_name} {count}" for sheet_name, count in stats["rows"].items())
+    lines.append(f"  行数: {rows or 'なし'}")
+    if stats["process_peak_memory"] is not None:
+        lines.append(f"  プロセスのピークメモリ: {_format_size(stats['process_peak_memory'])}（先に処理したファイルの分を含む）")
+    return "\n".join(lines)
+
+
+def _save_stats(path: str, results: List[ConversionResult]) -> None:
+    """変換に成功したファイルの統計情報をJSONファイルに保存"""
+    records = [
+        {"input_file": result.input_file, "output_file": result.output_file, "stats": result.stats}
+        for result in results
+        if result.stats is not None
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def _profiled(args: argparse.Namespace, input_files: Iterable[str], config: Optional[Dict] = None) -> ContextManager:
+    """--profile が指定された場合は with ブロック内の処理をプロファイルする"""
+    if not args.profile:
+        return nullcontext()
+    if args.jobs != 1:
+        # ワーカープロセスの処理は計測できないため、現在のプロセスで処理する
+        print("プロファイルを出力するため1プロセスで処理します", file=sys.stderr)
+        args.jobs = 1
+    return profile(args.profile, input_files, config)
+
+
+def _report_profile(result: Optional[Profile]) -> None:
+    """出力したプロファイルのファイルを表示"""
+    if result is not None:
+        print(
+            f"プロファイルを出力しました: {result.pstats_path}, {result.collapsed_path}（{result.label()}）",
+            file=sys.stderr,
+        )
+
+
+def _resolve_inputs(args: argparse.Namespace) -> Optional[List[str]]:
+    """--input と --input-list を入力ファイルのリストに展開
+
+    Returns:
+        入力ファイルのリスト。存在しないファイルがある場合はエラーを出力して None
+    """
+    if args.input_list and not Path(args.input_list).exists():
+        print(f"入力リストファイルが見つかりません: {args.input_list}", file=sys.stderr)
+        return None
+    input_files = expand_inputs(args.input or [], args.input_list)
+    if not input_files:
+        print("入力ファイルが見つかりません", file=sys.stderr)
+        return None
+    missing = [input_file for input_file in input_files if not Path(input_file).is_file()]
+    for input_file in missing:
+        print(f"入力ファイルが見つかりません: {input_file}", file=sys.stderr)
+    return None if missing else input_files
+
+
 def convert_command(args: argparse.Namespace) -> int:
     """変換コマンドの実行"""
     try:
-        # 入力ファイルの存在確認
-        input_path = Path(args.input)
-        if not input_path.exists():
-            print(f"入力ファイルが見つかりません: {args.input}", file=sys.stderr)
+        # 入力ファイルの展開と存在確認
+        input_files = _resolve_inputs(args)
+        if input_files is None:
             return 1
 
         # 設定ファイルの存在確認
@@ -51,11 +217,55 @@ def convert_command(args: argparse.Namespace) -> int:
             print(f"設定ファイルが見つかりません: {args.config}", file=sys.stderr)
             return 1
 
-        # 変換の実行
-        converter = XmlToExcelConverter()
+        # 設定は一度だけ読み込み、すべての変換で共有する
+        converter = XmlToExcelConverter(config_cache=args.config_cache)
         converter.load_config(str(config_path))
-        converter.convert(str(input_path), args.output)
-        print("変換が完了しました", file=sys.stderr)
+
+        try:
+            tasks = plan_outputs(input_files, args.output, format_suffix(args.format or "xlsx"))
+        except ValueError as e:
+            print(f"エラー: {str(e)}", file=sys.stderr)
+            return 1
+        if len(tasks) > 1 or os.path.isdir(args.output):
+            os.makedirs(args.output, exist_ok=True)
+
+        # 変換の実行
+        options = {
+            "streaming": args.streaming,
+            "write_only": args.write_only,
+            "pipeline": args.pipeline,
+            "parser": args.parser,
+            "output_format": args.format,
+            "collect_stats": args.stats or bool(args.stats_json),
+        }
+        batch = len(tasks) > 1
+        failed = 0
+        results = []
+        with _profiled(args, input_files, converter.config) as profile_result:
+            for result in convert_files(tasks, converter.compiled_config, jobs=args.jobs, **options):
+                results.append(result)
+                if args.stats and result.stats is not None:
+                    print(_format_stats(result.input_file, result.stats), file=sys.stderr)
+                if not result.succeeded:
+                    failed += 1
+                    if batch:
+                        print(f"エラー: {result.input_file}: {result.error}", file=sys.stderr)
+                    else:
+                        print(f"エラー: {result.error}", file=sys.stderr)
+                elif batch:
+                    print(f"変換しました: {result.input_file} -> {result.output_file}", file=sys.stderr)
+        _report_profile(profile_result)
+        if args.stats_json:
+            _save_stats(args.stats_json, results)
+
+        if failed:
+            if batch:
+                print(f"{len(tasks)}件中{failed}件の変換に失敗しました", file=sys.stderr)
+            return 1
+        if batch:
+            print(f"変換が完了しました（{len(tasks)}件）", file=sys.stderr)
+        else:
+            print("変換が完了しました", file=sys.stderr)
         return 0
 
     except ConfigurationError as e:
@@ -69,14 +279,39 @@ def convert_command(args: argparse.Namespace) -> int:
 def generate_command(args: argparse.Namespace) -> int:
     """設定ファイル生成コマンドの実行"""
     try:
-        # 入力ファイルの存在確認
-        input_path = Path(args.input)
-        if not input_path.exists():
-            print(f"入力ファイルが見つかりません: {args.input}", file=sys.stderr)
+        # 入力ファイルの展開と存在確認
+        input_files = _resolve_inputs(args)
+        if input_files is None:
             return 1
 
         # 設定ファイルの生成
-        generate_config([str(input_path)], args.output)
+        sampling = SamplingOptions(
+            max_per_path=args.sample_per_path,
+            max_bytes=args.sample_bytes,
+            sample_ratio=args.sample_ratio,
+            stop_after=args.stop_after,
+        )
+        try:
+            sampling.validate()
+        except ValueError as e:
+            print(f"エラー: {str(e)}", file=sys.stderr)
+            return 1
+        with _profiled(args, input_files) as profile_result:
+            reports = generate_config(
+                input_files, args.output, jobs=args.jobs, sampling=sampling, parser=args.parser
+            )
+            if profile_result is not None:
+                profile_result.tags["mappings"] = mapping_count(load_config(args.output))
+        _report_profile(profile_result)
+
+        # 解析した範囲を報告
+        for report in reports:
+            note = "（早期終了）" if report.stopped_early else ""
+            print(
+                f"{report.xml_file}: {_format_size(report.bytes_scanned)} / {_format_size(report.file_size)}"
+                f"（{report.scanned_ratio:.1%}）、{report.elements_analyzed}/{report.elements_scanned} 要素を解析{note}",
+                file=sys.stderr,
+            )
         print("設定ファイルを生成しました", file=sys.stderr)
         return 0
 
@@ -99,12 +334,12 @@ def main(args: list[str] | None = None) -> int:
         sys.exit(2)
 
     if parsed_args.command == "convert":
-        if not all([parsed_args.input, parsed_args.config, parsed_args.output]):
+        if not all([parsed_args.input or parsed_args.input_list, parsed_args.config, parsed_args.output]):
             parser.error("convert コマンドには --input, --config, --output が必要です")
         return convert_command(parsed_args)
 
     if parsed_args.command == "generate":
-        if not all([parsed_args.input, parsed_args.output]):
+        if not all([parsed_args.input or parsed_args.input_list, parsed_args.output]):
             parser.error("generate コマンドには --input, --output が必要です")
         return generate_command(parsed_args)
 
@@ -0,0 +1,146 @@
+"""カラムの型変換を行うモジュール
+
+抽出した値はすべて文字列のため、設定で型を宣言したカラムは出力時に変換する。
+変換は値ごとに行わず、カラム単位でまとめて pandas のベクトル化された処理で行う。
+
+型ごとのデータフレーム上の dtype は次のとおり。
+
+* int: Int64（欠損値を扱える整数型）
+* float: float64
+* decimal: decimal.Decimal のオブジェクト
+* date / datetime: datetime64（タイムゾーン付きの値は現地時刻とする）
+* bool: boolean（true/false、1/0、yes/no、on/off を大文字・小文字を区別せずに受け付ける）
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Sequence
+import pandas as pd
+from .exceptions import DataTypeError
+
+COLUMN_TYPES = ("int", "float", "decimal", "date", "datetime", "bool")
+
+# bool 型として受け付ける文字列（小文字）と値
+_BOOL_VALUES = {
+    "true": True,
+    "1": True,
+    "yes": True,
+    "on": True,
+    "false": False,
+    "0": False,
+    "no": False,
+    "off": False,
+}
+
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    """ISO 8601 形式の日時の文字列を datetime64 に変換
+
+    タイムゾーン付きの値はオフセットを除いた現地時刻とする。オフセットが値によって異なる場合
+    （夏時間の切り替えをまたぐ場合や、タイムゾーンのない値と混在する場合）は値ごとに変換する。
+    """
+    try:
+        result = pd.to_datetime(values, format="ISO8601")
+    except ValueError:
+        # オフセットが混在する（不正な値を含む場合は値ごとの変換で例外となる）
+        return pd.to_datetime(values.map(_local_timestamp, na_action="ignore"))
+    if result.dtype == object:
+        # オフセットが混在する（datetime のオブジェクトのまま返す pandas のバージョン）
+        return pd.to_datetime(values.map(_local_timestamp, na_action="ignore"))
+    if getattr(result.dt, "tz", None) is not None:
+        result = result.dt.tz_localize(None)
+    return result
+
+
+def _local_timestamp(value: str) -> pd.Timestamp:
+    """ISO 8601 形式の日時の文字列をオフセットを除いた現地時刻に変換"""
+    timestamp: pd.Timestamp = pd.Timestamp(pd.to_datetime(value, format="ISO8601"))
+    if timestamp.tzinfo is not None:
+        local: pd.Timestamp = timestamp.tz_localize(None)
+        return local
+    return timestamp
+
+
+def _to_bool(values: pd.Series) -> pd.Series:
+    """真偽値を表す文字列を boolean に変換"""
+    result = values.str.lower().map(_BOOL_VALUES)
+    invalid = values.notna() & result.isna()
+    if invalid.any():
+        raise ValueError(f"真偽値ではありません: '{values[invalid].iloc[0]}'")
+    return result.astype("boolean")
+
+
+def to_series(values: Sequence[Optional[Any]], type_name: str, column: str = "") -> pd.Series:
+    """カラムの値を宣言された型の Series に変換
+
+    Args:
+        values: カラムの値（欠損値は None）。前後の空白は除去し、空の文字列は欠損値として扱う
+        type_name: 型の名前（COLUMN_TYPES のいずれか）
+        column: エラーメッセージに含めるカラム名
+
+    Raises:
+        DataTypeError: 型に変換できない値が含まれる場合
+    """
+    if type_name not in COLUMN_TYPES:
+        raise DataTypeError(f"不明な型です: {type_name}（{', '.join(COLUMN_TYPES)} のいずれかを指定してください）")
+
+    series: pd.Series = pd.Series(list(values), dtype=object).str.strip()
+    series = series.where(series.notna() & (series != ""), None)
+    result: pd.Series
+    try:
+        if type_name == "int":
+            result = pd.to_numeric(series).astype("Int64")
+        elif type_name == "float":
+            result = pd.to_numeric(series).astype("float64")
+        elif type_name == "decimal":
+            result = series.map(Decimal, na_action="ignore")
+        elif type_name in ("date", "datetime"):
+            result = _to_datetime(series)
+            if type_name == "date":
+                result = result.dt.normalize()
+        else:
+            result = _to_bool(series)
+    except (ValueError, TypeError, OverflowError, InvalidOperation) as e:
+        raise DataTypeError(f"カラム '{column}' の値を {type_name} に変換できません: {e}") from e
+    return result
+
+
+def for_excel(series: pd.Series, type_name: Optional[str]) -> pd.Series:
+    """Excelのセルに書き込む値に変換（date 型は時刻を持たない日付とする）"""
+    if type_name == "date":
+        dates: pd.Series = series.dt.date.astype(object).where(series.notna(), None)
+        return dates
+    return series
+
+
+def to_values(values: Sequence[Optional[Any]], type_name: str, column: str = "") -> List[Optional[Any]]:
+    """カラムの値を宣言された型の Python の値のリストに変換（欠損値は None）
+
+    Raises:
+        DataTypeError: 型に変換できない値が含まれる場合
+    """
+    series = for_excel(to_series(values, type_name, column), type_name)
+    result: List[Optional[Any]] = series.astype(object).where(series.notna(), None).tolist()
+    return result
+
+
+def convert_columns(
+    columns: Sequence[str], rows: Sequence[Sequence[Optional[Any]]], types: Dict[str, str]
+) -> List[List[Optional[Any]]]:
+    """行データのうち型を宣言したカラムをまとめて変換
+
+    Args:
+        columns: 行データのカラム名
+        rows: カラムの順序に並んだ値のシーケンスのリスト
+        types: カラム名と型の名前の辞書
+
+    Returns:
+        変換後の行データのリスト
+    """
+    converted = [list(row) for row in rows]
+    for position, name in enumerate(columns):
+        type_name = types.get(name)
+        if type_name is None:
+            continue
+        for row, value in zip(converted, to_values([row[position] for row in rows], type_name, name)):
+            row[position] = value
+    return converted
@@ -0,0 +1,168 @@
+"""設定を変換処理で使用する形式に事前に構築し、キャッシュするモジュール
+
+設定の読み込みでは、TOMLの解析と検証のあと、マッピング設定の検索インデックス、カラムの抽出関数、
+シートごとのカラムの順序と型を構築する。ConfigCache はこれらをまとめて pickle 形式で
+キャッシュディレクトリに保存し、次回以降は TOML の解析と検証を行わずに1回の読み込みで復元する。
+
+キャッシュのキーは TOML ファイルの内容のハッシュ値、ライブラリのバージョン、Python のバージョンのため、
+TOML ファイルを変更するかライブラリを更新すると自動的に無効になる。
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from .config import gc_paused
+from .extractors import CompiledColumns, compile_columns, referenced_tags
+from .mapping import MappingIndex, TagFilter
+
+logger = logging.getLogger(__name__)
+
+# キャッシュディレクトリを指定する環境変数
+CACHE_DIR_ENV = "XML2XLSX_CONFIG_CACHE"
+
+# キャッシュファイルの拡張子
+CACHE_SUFFIX = ".pickle"
+
+
+class CompiledConfig(NamedTuple):
+    """変換処理で使用する形式に構築した設定"""
+
+    # 設定データ
+    config: Dict
+    # マッピング設定の検索インデックス
+    mapping_index: MappingIndex
+    # 設定パス → カラムの抽出関数（columns を持つ設定のみ）
+    columns: Dict[str, CompiledColumns]
+    # 行を出力する可能性があるタグのフィルタ
+    row_tags: TagFilter
+    # 行を出力する、または祖先要素として参照される可能性があるタグのフィルタ
+    context_tags: TagFilter
+    # シート名 → 設定のカラムの順序
+    sheet_columns: Dict[str, List[str]]
+    # シート名 → カラム名と型の名前の辞書（同じシートに出力する設定の型をまとめたもの）
+    sheet_types: Dict[str, Dict[str, str]]
+
+
+def compile_config(config: Dict) -> CompiledConfig:
+    """設定から検索インデックス、カラムの抽出関数、シートごとのカラムの順序と型を構築
+
+    シートは設定の sheet_name と設定パスの最後の部分のどちらでも対応付ける。
+    カラムの順序は定義順で最初に columns を持つ設定のものとし、型は対応するすべての設定のものをまとめる。
+    """
+    with gc_paused():
+        return _compile_config(config)
+
+
+def _compile_config(config: Dict) -> CompiledConfig:
+    """設定を構築（compile_config の本体）"""
+    mapping = config.get("mapping")
+    if not isinstance(mapping, dict):
+        mapping = {}
+    columns = {
+        path: compile_columns(definition["columns"])
+        for path, definition in mapping.items()
+        if isinstance(definition, dict) and isinstance(definition.get("columns"), dict)
+    }
+    row_tags = TagFilter.for_paths(columns)
+
+    sheet_columns: Dict[str, List[str]] = {}
+    sheet_types: Dict[str, Dict[str, str]] = {}
+    for path, definition in mapping.items():
+        if not isinstance(definition, dict):
+            continue
+        for sheet_name in dict.fromkeys([definition.get("sheet_name"), path.split(".")[-1]]):
+            if not isinstance(sheet_name, str):
+                continue
+            if "columns" in definition and sheet_name not in sheet_columns:
+                sheet_columns[sheet_name] = list(definition["columns"].values())
+            sheet_types.setdefault(sheet_name, {}).update(definition.get("types", {}))
+
+    return CompiledConfig(
+        config,
+        MappingIndex(mapping),
+        columns,
+        row_tags,
+        row_tags.union(referenced_tags(columns.values())),
+        sheet_columns,
+        sheet_types,
+    )
+
+
+def cache_key(data: bytes) -> str:
+    """設定ファイルの内容、ライブラリのバージョン、Python のバージョンからキャッシュのキーを作成"""
+    from . import __version__
+
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{__version__}\0{sys.version_info[0]}.{sys.version_info[1]}".encode())
+    return digest.hexdigest()
+
+
+class ConfigCache:
+    """構築済みの設定を保存するキャッシュディレクトリ
+
+    キャッシュファイルは pickle 形式のため、信頼できるディレクトリのみを指定すること。
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: キャッシュディレクトリ（存在しない場合は保存時に作成する）
+        """
+        self.directory = Path(directory)
+
+    @classmethod
+    def from_env(cls, directory: Optional[str] = None) -> Optional["ConfigCache"]:
+        """キャッシュディレクトリの指定（省略時は環境変数 XML2XLSX_CONFIG_CACHE）からキャッシュを作成
+
+        Returns:
+            キャッシュ。いずれも指定されていない場合は None
+        """
+        directory = directory or os.environ.get(CACHE_DIR_ENV)
+        return cls(directory) if directory else None
+
+    def path(self, data: bytes) -> Path:
+        """設定ファイルの内容に対応するキャッシュファイルのパスを取得"""
+        return self.directory / f"{cache_key(data)}{CACHE_SUFFIX}"
+
+    def get(self, data: bytes) -> Optional[CompiledConfig]:
+        """設定ファイルの内容に対応する構築済みの設定を読み込む
+
+        Returns:
+            構築済みの設定。キャッシュがない場合や読み込めない場合は None
+        """
+        path = self.path(data)
+        try:
+            with open(path, "rb") as f, gc_paused():
+                compiled = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # 壊れたキャッシュは無視して作り直す
+            logger.warning(f"設定のキャッシュを読み込めません: {path}: {e}")
+            return None
+        return compiled if isinstance(compiled, CompiledConfig) else None
+
+    def put(self, data: bytes, compiled: CompiledConfig) -> None:
+        """構築済みの設定を保存（失敗した場合は警告のみ出力する）
+
+        一時ファイルに書き込んでから置き換えるため、並行して読み込むプロセスが
+        書き込み途中のファイルを読むことはない。
+        """
+        path = self.path(data)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"設定のキャッシュを保存できません: {path}: {e}")
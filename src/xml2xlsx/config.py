@@ -1,7 +1,45 @@
-"""設定ファイル操作モジュール"""
+"""設定ファイル操作モジュール
 
-from typing import Any, Dict
-import toml
+読み込みには標準ライブラリの tomllib（Python 3.10 では互換の tomli）を使用する。
+書き込みは設定ファイルの構造（テーブル、文字列・数値・真偽値とその配列）に限定した
+専用の実装で行い、文字列のエスケープには C 実装の json.dumps を利用する。
+"""
+
+import gc
+import json
+import math
+import re
+import sys
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+# 引用符で囲まずに記述できるキー
+_BARE_KEY = re.compile(r"[A-Za-z0-9_-]+")
+
+# TOMLの基本文字列でエスケープが必要な文字
+_ESCAPED = re.compile(r'[\x00-\x1f"\\\x7f]')
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """循環参照のガベージコレクションを一時的に停止
+
+    大量のオブジェクトを作成する間は世代別GCが繰り返し実行され、作成済みのオブジェクトを
+    何度も走査するため、マッピング設定が多い場合は解析・構築時間の大半を占める。
+    作成するオブジェクトは設定として保持し続けるため、停止しても回収が遅れるものはない。
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 def load_config(file_path: str) -> Dict[str, Any]:
@@ -16,7 +54,116 @@ def load_config(file_path: str) -> Dict[str, Any]:
 
     Raises:
         FileNotFoundError: 設定ファイルが存在しない場合
-        TomlDecodeError: TOMLファイルの解析に失敗した場合
+        TOMLDecodeError: TOMLファイルの解析に失敗した場合
+    """
+    with open(file_path, "rb") as f, gc_paused():
+        config: Dict[str, Any] = tomllib.load(f)
+    return config
+
+
+def loads_config(content: str) -> Dict[str, Any]:
+    """
+    TOML形式の文字列から設定を読み込む
+
+    Args:
+        content: TOML形式の文字列
+
+    Returns:
+        設定データを含む辞書
+
+    Raises:
+        TOMLDecodeError: TOMLの解析に失敗した場合
+    """
+    with gc_paused():
+        config: Dict[str, Any] = tomllib.loads(content)
+    return config
+
+
+def dump_config(config: Dict[str, Any], f: IO[str]) -> None:
+    """
+    設定をTOML形式でファイルに書き込む
+
+    Args:
+        config: 設定データ
+        f: 書き込み先のテキストファイル
+
+    Raises:
+        TypeError: TOMLで表現できない値が含まれる場合
+    """
+    f.write(dumps_config(config))
+
+
+def dumps_config(config: Dict[str, Any]) -> str:
+    """
+    設定をTOML形式の文字列に変換
+
+    値を先に出力し、テーブルは ``[mapping."root.item".columns]`` のような見出しで出力する。
+
+    Args:
+        config: 設定データ
+
+    Returns:
+        TOML形式の文字列
+
+    Raises:
+        TypeError: TOMLで表現できない値が含まれる場合
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        return toml.load(f)
+    lines: List[str] = []
+    _dump_table(config, "", lines)
+    return "".join(lines)
+
+
+def _dump_table(table: Dict[str, Any], header: str, lines: List[str]) -> None:
+    """テーブルの値を見出し付きで出力し、入れ子のテーブルを続けて出力"""
+    values = []
+    tables = []
+    for key, value in table.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        else:
+            values.append(f"{_format_key(key)} = {_format_value(value)}\n")
+
+    # 入れ子のテーブルのみを持つテーブルは見出しを省略する（値を持たないテーブルは定義を残す）
+    if header and (values or not tables):
+        if lines:
+            lines.append("\n")
+        lines.append(f"[{header}]\n")
+    lines.extend(values)
+
+    for key, value in tables:
+        _dump_table(value, f"{header}.{_format_key(key)}" if header else _format_key(key), lines)
+
+
+def _format_key(key: str) -> str:
+    """キーをTOMLのキーの表記に変換"""
+    return key if _BARE_KEY.fullmatch(key) else _format_string(key)
+
+
+def _format_string(value: str) -> str:
+    """文字列をTOMLの基本文字列の表記に変換
+
+    エスケープが必要な文字を含む場合のみ、TOMLの基本文字列と互換の json.dumps でエスケープする。
+    TOMLでは DEL（U+007F）もエスケープが必要なため置き換える。
+    """
+    if _ESCAPED.search(value) is None:
+        return f'"{value}"'
+    return json.dumps(value, ensure_ascii=False).replace("\x7f", "\\u007f")
+
+
+def _format_value(value: Any) -> str:
+    """値をTOMLの値の表記に変換"""
+    if isinstance(value, str):
+        return _format_string(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "nan"
+        if math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return f"[{', '.join(_format_value(item) for item in value)}]"
+    raise TypeError(f"TOMLで表現できない値です: {value!r}")
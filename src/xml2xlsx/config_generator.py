@@ -1,47 +1,250 @@
 """設定ファイルの生成を行うモジュール"""
 
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Set
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 import xml.etree.ElementTree as ET
-import toml
+from .config import dump_config
+from .parsers import iterparse, resolve_backend
 
 logger = logging.getLogger(__name__)
 
+# XMLパスごとの属性名とテキストを持つ子要素のタグ
+Structure = Dict[str, Dict[str, Set[str]]]
 
-def _analyze_xml_structure(xml_file: str) -> Dict[str, Dict[str, Set[str]]]:
-    """XMLファイルの構造を解析"""
+
+class SamplingOptions(NamedTuple):
+    """構造解析のサンプリング設定（None の項目は制限しない）
+
+    Attributes:
+        max_per_path: パスごとに解析する要素数の上限。超えた要素は部分木ごと読み飛ばす
+        max_bytes: ファイルごとに読み込むバイト数の上限
+        sample_ratio: 同じ親の下で繰り返し出現する同名の要素のうち解析する割合（0より大きく1以下）。
+            最初の要素は常に解析する
+        stop_after: 新しいパス・属性・子要素が見つからないまま解析した要素数がこの値に達したら終了する
+    """
+
+    max_per_path: Optional[int] = None
+    max_bytes: Optional[int] = None
+    sample_ratio: Optional[float] = None
+    stop_after: Optional[int] = None
+
+    def validate(self) -> None:
+        """設定値の妥当性を検証
+
+        Raises:
+            ValueError: 設定値が範囲外の場合
+        """
+        for name in ("max_per_path", "max_bytes", "stop_after"):
+            value = getattr(self, name)
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} には正の値を指定してください: {value}")
+        if self.sample_ratio is not None and not 0 < self.sample_ratio <= 1:
+            raise ValueError(f"sample_ratio には0より大きく1以下の値を指定してください: {self.sample_ratio}")
+
+
+class ScanReport(NamedTuple):
+    """1ファイルの構造解析で読み込んだ範囲"""
+
+    xml_file: str
+    bytes_scanned: int
+    file_size: int
+    elements_scanned: int
+    elements_analyzed: int
+    stopped_early: bool
+
+    @property
+    def scanned_ratio(self) -> float:
+        """ファイルサイズに対する読み込んだバイト数の割合"""
+        return self.bytes_scanned / self.file_size if self.file_size else 1.0
+
+
+def _analyze_xml_structure(
+    xml_file: str, sampling: Optional[SamplingOptions] = None, parser: Optional[str] = None
+) -> Structure:
+    """XMLファイルの構造を解析
+
+    iterparseで要素を順に読み込み、処理を終えた要素はツリーから切り離すため、
+    メモリ使用量はファイルサイズではなく階層の深さとパスの種類数に依存する。
+
+    Args:
+        xml_file: 解析するXMLファイルのパス
+        sampling: サンプリング設定。省略時はすべての要素を解析する
+        parser: XMLのパーサーバックエンド（省略時は自動選択）
+    """
+    return _scan_xml_structure(xml_file, sampling, parser)[0]
+
+
+def _scan_xml_structure(
+    xml_file: str, sampling: Optional[SamplingOptions] = None, parser: Optional[str] = None
+) -> Tuple[Structure, ScanReport]:
+    """XMLファイルの構造を解析し、読み込んだ範囲とともに返す"""
     logger.info(f"入力XMLファイルの解析: {xml_file}")
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    entities: Dict[str, Dict[str, Set[str]]] = {}
+    sampling = sampling or SamplingOptions()
+    entities: Structure = {}
+    # 処理中の要素、そのパス（読み飛ばす部分木では None）、子要素のタグごとの出現数
+    stack: List[Tuple[ET.Element, Optional[str], Dict[str, int]]] = []
+    occurrences: Dict[str, int] = {}
+    elements_scanned = 0
+    elements_analyzed = 0
+    # 最後に新しいパス・属性・子要素が見つかってから解析した要素数
+    unchanged = 0
+    stopped_early = False
+
+    with open(xml_file, "rb") as source:
+        file_size = os.fstat(source.fileno()).st_size
+
+        for event, element in iterparse(source, events=("start", "end"), backend=parser):
+            if event == "start":
+                elements_scanned += 1
+                parent = stack[-1] if stack else None
+                if parent is not None and parent[1] is None:
+                    # 読み飛ばす部分木の子孫
+                    stack.append((element, None, {}))
+                    continue
+
+                current_path = f"{parent[1]}.{element.tag}" if parent else element.tag
+                if not _is_sampled(sampling, occurrences, current_path, parent[2] if parent else None, element.tag):
+                    stack.append((element, None, {}))
+                    continue
+
+                elements_analyzed += 1
+                unchanged += 1
+                definition = entities.get(current_path)
+                if definition is None:
+                    definition = entities[current_path] = {"attributes": set(), "elements": set()}
+                    unchanged = 0
+
+                # 属性を記録
+                attributes = definition["attributes"]
+                if not attributes.issuperset(element.attrib):
+                    attributes.update(element.attrib)
+                    unchanged = 0
+                stack.append((element, current_path, {}))
+
+                if sampling.stop_after is not None and unchanged >= sampling.stop_after:
+                    stopped_early = True
+                    break
+                continue
+
+            _, current_path, _ = stack.pop()
+            if not stack:
+                break
+            parent_element, parent_path, _ = stack[-1]
+
+            # テキストコンテンツを持つ子要素を記録（解析した要素の親は常に解析済み）
+            if current_path is not None and parent_path is not None and element.text and element.text.strip():
+                elements = entities[parent_path]["elements"]
+                if element.tag not in elements:
+                    elements.add(element.tag)
+                    unchanged = 0
 
-    def process_element(element: ET.Element, parent_path: str = "") -> None:
-        current_path = f"{parent_path}.{element.tag}" if parent_path else element.tag
-        if current_path not in entities:
-            entities[current_path] = {"attributes": set(), "elements": set()}
+            # 処理済みの要素を親から切り離す（終了した要素は常に親の最後の子要素）
+            del parent_element[-1]
 
-        # 属性を記録
-        for attr in element.attrib:
-            entities[current_path]["attributes"].add(attr)
+            if sampling.max_bytes is not None and source.tell() >= sampling.max_bytes:
+                stopped_early = True
+                break
 
-        # テキストコンテンツを持つ子要素を記録
-        for child in element:
-            if isinstance(child.tag, str):
-                process_element(child, current_path)
-                if child.text and child.text.strip():
-                    entities[current_path]["elements"].add(child.tag)
+        bytes_scanned = min(source.tell(), file_size) if stopped_early else file_size
 
-    process_element(root)
-    return entities
+    report = ScanReport(xml_file, bytes_scanned, file_size, elements_scanned, elements_analyzed, stopped_early)
+    logger.info(
+        f"{xml_file}: {bytes_scanned}/{file_size} バイト、{elements_analyzed}/{elements_scanned} 要素を解析しました"
+    )
+    return entities, report
 
 
-def generate_config(input_files: List[str], output_file: str) -> None:
+def _is_sampled(
+    sampling: SamplingOptions,
+    occurrences: Dict[str, int],
+    path: str,
+    sibling_counts: Optional[Dict[str, int]],
+    tag: str,
+) -> bool:
+    """要素を解析対象とするかどうかを判定"""
+    if sampling.sample_ratio is not None and sibling_counts is not None:
+        index = sibling_counts.get(tag, 0)
+        sibling_counts[tag] = index + 1
+        # 同名の兄弟要素のうち、割合に応じて等間隔に選ぶ
+        if index and int(index * sampling.sample_ratio) == int((index - 1) * sampling.sample_ratio):
+            return False
+
+    if sampling.max_per_path is not None:
+        count = occurrences.get(path, 0)
+        if count >= sampling.max_per_path:
+            return False
+        occurrences[path] = count + 1
+
+    return True
+
+
+def _merge_structures(structures: Iterable[Structure]) -> Structure:
+    """ファイルごとの解析結果を統合
+
+    パスの順序は最初に出現したファイルでの順序とする。
+    """
+    merged: Structure = {}
+    for entities in structures:
+        for path, definition in entities.items():
+            if path not in merged:
+                merged[path] = {"attributes": set(), "elements": set()}
+            merged[path]["attributes"].update(definition["attributes"])
+            merged[path]["elements"].update(definition["elements"])
+    return merged
+
+
+def _analyze_files(
+    input_files: List[str],
+    jobs: int = 1,
+    sampling: Optional[SamplingOptions] = None,
+    parser: Optional[str] = None,
+) -> Tuple[Structure, List[ScanReport]]:
+    """複数のXMLファイルを解析して統合
+
+    jobs が2以上の場合はファイルごとにワーカープロセスで解析し、
+    結果を入力順に受け取りながら統合する。
+    """
+    scan = partial(_scan_xml_structure, sampling=sampling, parser=parser)
+    reports: List[ScanReport] = []
+
+    def collect(results: Iterable[Tuple[Structure, ScanReport]]) -> Iterator[Structure]:
+        for entities, report in results:
+            reports.append(report)
+            yield entities
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(input_files))
+    if jobs <= 1:
+        return _merge_structures(collect(map(scan, input_files))), reports
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return _merge_structures(collect(executor.map(scan, input_files))), reports
+
+
+def generate_config(
+    input_files: List[str],
+    output_file: str,
+    jobs: int = 1,
+    sampling: Optional[SamplingOptions] = None,
+    parser: Optional[str] = None,
+) -> List[ScanReport]:
     """設定ファイルを生成する
 
     Args:
         input_files: 入力XMLファイルのリスト
         output_file: 出力する設定ファイルのパス
+        jobs: 並列に解析するプロセス数。0以下の場合はCPU数
+        sampling: サンプリング設定。省略時はすべての要素を解析する
+        parser: XMLのパーサーバックエンド（"lxml"、"stdlib"）。
+            省略時は標準ライブラリを使用する
+
+    Returns:
+        ファイルごとの読み込んだ範囲（入力順）
 
     Raises:
         FileNotFoundError: 入力ファイルが存在しない場合
@@ -50,23 +253,16 @@ def generate_config(input_files: List[str], output_file: str) -> None:
     logger.info(f"設定ファイル生成を開始: {output_file}")
     if not input_files:
         raise ValueError("入力XMLファイルが指定されていません")
+    if sampling is not None:
+        sampling.validate()
+    parser = resolve_backend(parser)
 
-    # XMLファイルの解析
-    all_entities = []
     for xml_file in input_files:
         if not Path(xml_file).exists():
             raise FileNotFoundError(f"入力XMLファイル '{xml_file}' が見つかりません")
-        entities = _analyze_xml_structure(xml_file)
-        all_entities.append(entities)
 
-    # 設定のマージ
-    merged: Dict[str, Dict[str, Set[str]]] = {}
-    for entities in all_entities:
-        for path, definition in entities.items():
-            if path not in merged:
-                merged[path] = {"attributes": set(), "elements": set()}
-            merged[path]["attributes"].update(definition["attributes"])
-            merged[path]["elements"].update(definition["elements"])
+    # XMLファイルの解析と統合
+    merged, reports = _analyze_files(input_files, jobs, sampling, parser)
 
     # 設定ファイルの生成
     config: Dict[str, Dict] = {"mapping": {}}
@@ -90,6 +286,7 @@ def generate_config(input_files: List[str], output_file: str) -> None:
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_file, "w", encoding="utf-8") as f:
-        toml.dump(config, f)
+        dump_config(config, f)
 
     logger.info(f"設定ファイルを生成しました: {output_file}")
+    return reports
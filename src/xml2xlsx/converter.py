@@ -1,33 +1,132 @@
 """XMLからExcelへの変換を行うモジュール"""
 
 import logging
-from typing import Dict, List, Optional, Tuple, Set
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List, Optional, Set, Tuple
 import pandas as pd
 import xml.etree.ElementTree as ET
+from .column_types import COLUMN_TYPES, for_excel
+from .compiled_config import CompiledConfig, ConfigCache, compile_config
+from .config import loads_config
 from .entity import EntityContext, Entity
 from .exceptions import ConfigurationError
+from .extractors import AncestorTable, CompiledColumns, ancestor_table
+from .parsers import PARSER_BACKENDS, parse, resolve_backend
+from .sheet import SheetBuffer
+from .stats import ConversionStats
+from .streaming import StreamProcessor
+from .writers import StreamingWriter, create_writer, detect_format, excel_sheet_parts
 
 logger = logging.getLogger(__name__)
 
+# 統計情報を集計する場合に計測するメソッドと処理段階の名前
+_INSTRUMENTED_METHODS = {
+    "_find_mapping_config": "lookup",
+    "_find_columns": "lookup",
+    "_extract_data": "extract",
+}
+
+
+class _TimedEntityContext(EntityContext):
+    """エンティティの作成を処理段階 "entities" として計測するコンテキスト"""
+
+    def __init__(self, stats: ConversionStats):
+        super().__init__()
+        self._process = stats.timed("entities", super().process_xml_element)
+
+    def process_xml_element(
+        self, element: ET.Element, parent_path: str = "", parent: Optional[Entity] = None
+    ) -> Entity:
+        return self._process(element, parent_path, parent)
+
 
 class XmlToExcelConverter:
     """XMLからExcelへの変換を行うクラス"""
 
-    def __init__(self, config_file: Optional[str] = None):
+    def __init__(
+        self,
+        config_file: Optional[str] = None,
+        streaming: bool = False,
+        write_only: bool = False,
+        pipeline: bool = False,
+        parser: Optional[str] = None,
+        output_format: Optional[str] = None,
+        collect_stats: bool = False,
+        config_cache: Optional[str] = None,
+    ):
         """コンバーターの初期化
 
         Args:
             config_file: 設定ファイルのパス（オプション）
+            streaming: iterparseによるストリーミング処理を行うかどうか。
+                XML全体を読み込まないため、巨大なファイルでもメモリ使用量を抑えられる
+            write_only: openpyxlの書き込み専用モードで出力するかどうか。
+                データフレームやセルオブジェクトを作成しないため、保存時のメモリ使用量を抑えられる
+            pipeline: 行データを蓄積せずに生成順にExcelファイルへ書き込むかどうか。
+                streaming と組み合わせると、メモリ使用量が入力・出力の大きさに依存しない
+            parser: XMLのパーサーバックエンド（"lxml"、"stdlib"）。
+                省略時は設定ファイルの options.parser、それもない場合は "stdlib"
+            output_format: 出力形式（"xlsx"、"csv"、"parquet"、"arrow"）。
+                省略時は出力ファイルの拡張子から判定し、判定できない場合は "xlsx"。
+                xlsx 以外はシートごとにファイルを作成する
+            collect_stats: 処理段階ごとの経過時間とCPU時間、要素数、シートごとの行数、
+                マッピング設定の検索のキャッシュのヒット数などを stats に集計するかどうか。
+                無効の場合は計測のための処理を行わない
+            config_cache: 構築済みの設定をキャッシュするディレクトリ。
+                省略時は環境変数 XML2XLSX_CONFIG_CACHE、それもない場合はキャッシュしない。
+                設定ファイルの内容が同じ場合は、TOMLの解析と検証を行わずにキャッシュから読み込む
         """
-        self.config: Dict = {}
+        self.config = {}
+        self.streaming = streaming
+        self.write_only = write_only
+        self.pipeline = pipeline
+        self.parser = parser
+        self.output_format = output_format
+        self.collect_stats = collect_stats
+        self.config_cache = config_cache
+        self.sheets: Dict[str, SheetBuffer] = {}
         self.data_frames: Dict[str, pd.DataFrame] = {}
-        self.processed_entities: Set[ET.Element] = set()  # 処理済み要素を追跡
+        # 直前の変換処理の統計情報
+        self.stats = ConversionStats()
         if config_file:
             self.load_config(config_file)
 
+    @property
+    def config(self) -> Dict:
+        """設定データ"""
+        return self._config
+
+    @config.setter
+    def config(self, config: Dict) -> None:
+        """設定データを設定し、マッピング設定の検索インデックスとカラムの抽出関数を構築
+
+        あわせて、行を出力する可能性があるタグ（カラムを持つ設定パスに一致しうるタグ）と、
+        それに祖先要素として参照される可能性があるタグを加えたタグのフィルタを作成する。
+        いずれにも一致しない要素の部分木は、行の出力に関係しないため読み飛ばす。
+        """
+        self.compiled_config = compile_config(config)
+
+    @property
+    def compiled_config(self) -> CompiledConfig:
+        """変換処理で使用する形式に構築した設定"""
+        return self._compiled
+
+    @compiled_config.setter
+    def compiled_config(self, compiled: CompiledConfig) -> None:
+        """構築済みの設定を設定（一括変換のワーカーやキャッシュから設定する場合に使用）"""
+        self._compiled = compiled
+        self._config = compiled.config
+        self._mapping_index = compiled.mapping_index
+        self._columns = compiled.columns
+        self._row_tags = compiled.row_tags
+        self._context_tags = compiled.context_tags
+
     def load_config(self, config_file: str) -> None:
         """設定ファイルを読み込む
 
+        キャッシュディレクトリ（config_cache）が指定されている場合は、内容が同じ設定ファイルの
+        構築済みの設定をキャッシュから読み込み、TOMLの解析と検証を省略する。
+
         Args:
             config_file: 設定ファイルのパス
 
@@ -35,10 +134,18 @@ class XmlToExcelConverter:
             ConfigurationError: 設定ファイルの読み込みに失敗した場合
         """
         try:
-            import toml
-
-            self.config = toml.load(config_file)
+            with open(config_file, "rb") as f:
+                data = f.read()
+            cache = ConfigCache.from_env(self.config_cache)
+            compiled = cache.get(data) if cache else None
+            if compiled is not None:
+                self.compiled_config = compiled
+                return
+
+            self.config = loads_config(data.decode("utf-8"))
             self._validate_config()
+            if cache:
+                cache.put(data, self._compiled)
         except Exception as e:
             raise ConfigurationError(f"設定ファイルの読み込みに失敗しました: {str(e)}")
 
@@ -47,6 +154,15 @@ class XmlToExcelConverter:
         if not isinstance(self.config.get("mapping"), dict):
             raise ConfigurationError("'mapping' セクションが必要です")
 
+        # オプションの検証
+        options = self.config.get("options", {})
+        if not isinstance(options, dict):
+            raise ConfigurationError("'options' セクションの形式が不正です")
+        if "parser" in options and options["parser"] not in PARSER_BACKENDS:
+            raise ConfigurationError(
+                f"不明なパーサーです: {options['parser']}（{', '.join(PARSER_BACKENDS)} のいずれかを指定してください）"
+            )
+
         # シート名の長さチェック
         for path, mapping in self.config["mapping"].items():
             if "sheet_name" in mapping:
@@ -54,18 +170,31 @@ class XmlToExcelConverter:
                 if len(sheet_name) > 31:
                     raise ConfigurationError(f"シート名 '{sheet_name}' がExcelの31文字制限を超えています")
 
+            # カラムの型の検証
+            types = mapping.get("types", {})
+            if not isinstance(types, dict):
+                raise ConfigurationError(f"'{path}' の types の形式が不正です")
+            for column, type_name in types.items():
+                if type_name not in COLUMN_TYPES:
+                    raise ConfigurationError(
+                        f"カラム '{column}' の型が不明です: {type_name}（{', '.join(COLUMN_TYPES)} のいずれかを指定してください）"
+                    )
+
     def convert(self, input_file: str, output_file: str) -> None:
-        """XMLファイルをExcelに変換"""
+        """XMLファイルをExcel（または output_format の形式）に変換"""
         try:
             if not self.config:
                 raise ConfigurationError("設定ファイルが必要です")
 
+            self.sheets.clear()
             self.data_frames.clear()
-            self.processed_entities.clear()  # 処理済み要素をリセット
-            tree = ET.parse(input_file)
-            root = tree.getroot()
-            self._process_root(root)
-            self._save_to_excel(output_file)
+            self.stats = ConversionStats()
+            output_format = self._output_format(output_file)
+            if self.collect_stats:
+                with self._instrumented():
+                    self._convert(input_file, output_file, output_format)
+            else:
+                self._convert(input_file, output_file, output_format)
         except ET.ParseError as e:
             logger.error(f"XMLファイルの解析に失敗しました: {e}")
             raise
@@ -73,115 +202,245 @@ class XmlToExcelConverter:
             logger.error(f"変換中にエラーが発生しました: {e}")
             raise
 
-    def _find_mapping_config(self, path: str) -> Tuple[Optional[str], Optional[Dict]]:
-        """パスに一致するマッピング設定を検索"""
-        if not self.config.get("mapping"):
-            return None, None
+    def _convert(self, input_file: str, output_file: str, output_format: str) -> None:
+        """XMLファイルを変換して出力形式で保存"""
+        if self.pipeline:
+            with self._stage("write"):
+                self._save_pipeline(self._iter_rows(input_file), output_file, output_format)
+            return
 
-        # 完全一致を優先
-        if path in self.config["mapping"]:
-            return path, self.config["mapping"][path]
+        with self._stage("buffer"):
+            for path, row_data in self._iter_rows(input_file):
+                self._append_row(path, row_data)
+        if self.write_only or output_format != "xlsx":
+            # xlsx 以外はデータフレームを作成せずに蓄積した値から書き込む
+            with self._stage("write"):
+                self._save_write_only(output_file, output_format)
+        else:
+            with self._stage("dataframe"):
+                self._build_data_frames()
+            with self._stage("write"):
+                self._save_to_excel(output_file)
 
-        # 末尾一致を確認
-        for config_path, config in self.config["mapping"].items():
-            if path.endswith(config_path):
-                return config_path, config
+    def _stage(self, name: str) -> ContextManager[None]:
+        """統計情報を集計する場合は with ブロック内を処理段階として計測"""
+        return self.stats.stage(name) if self.collect_stats else nullcontext()
 
-        return None, None
+    @contextmanager
+    def _instrumented(self) -> Iterator[None]:
+        """変換処理の間、マッピング設定の検索と行データの抽出を計測する関数に置き換える
 
-    def _process_root(self, root: ET.Element) -> None:
-        """ルート要素から処理を開始"""
-        context = EntityContext()
-        root_entity = context.process_xml_element(root)
-        self._process_entity(root_entity, context)
+        計測はインスタンスの属性で置き換えた関数のみで行うため、
+        統計情報を集計しない場合の処理には影響しない。
+        """
+        stats = self.stats
+        cache_size = self._mapping_index.cache_size
+        for name, stage in _INSTRUMENTED_METHODS.items():
+            setattr(self, name, stats.timed(stage, getattr(self, name)))
+        try:
+            with stats.measure():
+                yield
+        finally:
+            for name in _INSTRUMENTED_METHODS:
+                delattr(self, name)
+            lookup = stats.stages.get("lookup")
+            stats.mapping_cache_misses = self._mapping_index.cache_size - cache_size
+            stats.mapping_cache_hits = (lookup.calls if lookup else 0) - stats.mapping_cache_misses
+            if self.sheets:
+                stats.rows = {sheet_name: len(sheet) for sheet_name, sheet in self.sheets.items()}
 
-    def _process_entity(self, entity: Entity, context: EntityContext) -> None:
-        """エンティティを処理"""
-        if entity.element in self.processed_entities:
-            return
+    def _find_mapping_config(self, path: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """パスに一致するマッピング設定を検索"""
+        return self._mapping_index.lookup(path)
+
+    def _find_columns(self, path: str) -> Optional[CompiledColumns]:
+        """パスに一致するマッピング設定のカラムの抽出関数を検索"""
+        config_path, _ = self._mapping_index.lookup(path)
+        return self._columns.get(config_path) if config_path is not None else None
 
+    def _output_format(self, output_file: str) -> str:
+        """出力形式を決定（引数、出力ファイルの拡張子の順に優先）"""
+        try:
+            return detect_format(output_file, self.output_format)
+        except ValueError as e:
+            raise ConfigurationError(str(e))
+
+    def _parser_backend(self) -> str:
+        """使用するパーサーバックエンドを決定（引数、設定ファイルの順に優先）"""
+        options = self.config.get("options")
+        parser = self.parser or (options.get("parser") if isinstance(options, dict) else None)
+        try:
+            return resolve_backend(parser)
+        except ValueError as e:
+            raise ConfigurationError(str(e))
+
+    def _iter_rows(self, input_file: str) -> Iterator[Tuple[str, Dict]]:
+        """XMLファイルから (パス, 行データ) を出力順に生成"""
+        backend = self._parser_backend()
+        if self.streaming:
+            processor = StreamProcessor(
+                self._find_columns,
+                self._extract_data,
+                parser=backend,
+                is_relevant=self._context_tags,
+                stats=self.stats,
+            )
+            rows = processor.iter_rows(input_file)
+            yield from self.stats.timed_iter("parse", rows) if self.collect_stats else rows
+        else:
+            with self._stage("parse"):
+                root = parse(input_file, backend)
+                skippable = self._find_skippable(root)
+            context = _TimedEntityContext(self.stats) if self.collect_stats else EntityContext()
+            root_entity = context.process_xml_element(root)
+            rows = self._iter_entity_rows(root_entity, context, {}, skippable)
+            yield from self.stats.timed_iter("traverse", rows) if self.collect_stats else rows
+            if self.collect_stats:
+                self.stats.entities_created = self.stats.stages["entities"].calls
+
+    def _iter_entity_rows(
+        self,
+        entity: Entity,
+        context: EntityContext,
+        ancestors: Dict[str, Entity],
+        skippable: Dict[ET.Element, int],
+    ) -> Iterator[Tuple[str, Dict]]:
+        """エンティティとその子孫から行データを生成
+
+        コレクションの子要素は親の位置で行を出力し、その部分木は走査しない。
+        各要素は一度だけ訪れるため、処理済みの要素を記録する必要はない。
+        行を出力する可能性があるタグを含まない子要素の部分木は、エンティティを作成せずに読み飛ばす。
+
+        Args:
+            entity: 処理するエンティティ
+            context: エンティティの作成に使用するコンテキスト
+            ancestors: タグ → 最も近い祖先エンティティの対応表。
+                部分木の処理中は自身を登録し、処理後に元に戻す
+            skippable: 読み飛ばす子要素 → 部分木の要素数の対応表（_find_skippable を参照）
+        """
         # マッピング設定の確認
         config_path, config = self._find_mapping_config(entity.path)
 
         # コレクションかどうかを判定
         is_collection, child_tag = context.is_collection_element(entity.element)
 
-        if is_collection and child_tag:
-            # コレクション要素を処理
-            for child in entity.element.findall(child_tag):
-                child_entity = context.process_xml_element(child, entity.path, entity)
-                row_data = self._extract_data(child_entity)
-                if row_data:
-                    sheet_name = self._get_sheet_name(child_entity.path)
-                    df = pd.DataFrame([row_data])
-                    if sheet_name in self.data_frames:
-                        self.data_frames[sheet_name] = (
-                            pd.concat([self.data_frames[sheet_name], df], ignore_index=True)
-                            .dropna(how="all")
-                            .reset_index(drop=True)
-                        )
-                    else:
-                        self.data_frames[sheet_name] = df
-                self.processed_entities.add(child)
-
-        # 通常の要素の処理
-        elif config:
-            row_data = self._extract_data(entity)
+        # 通常の要素の処理（自身は祖先の対応表に登録する前に抽出する）
+        if config and not (is_collection and child_tag):
+            row_data = self._extract_data(entity, ancestors)
             if row_data:
-                sheet_name = self._get_sheet_name(entity.path)
-                df = pd.DataFrame([row_data])
-                if sheet_name not in self.data_frames:
-                    self.data_frames[sheet_name] = df
-                else:
-                    self.data_frames[sheet_name] = (
-                        pd.concat([self.data_frames[sheet_name], df], ignore_index=True)
-                        .dropna(how="all")
-                        .reset_index(drop=True)
-                    )
+                yield entity.path, row_data
 
-        self.processed_entities.add(entity.element)
+        # 子孫の処理中は自身を同じタグの最も近い祖先として登録する
+        tag = entity.element.tag
+        shadowed = ancestors.get(tag)
+        ancestors[tag] = entity
+        if is_collection and child_tag:
+            # コレクション要素を処理（子要素が行を出力しないタグの場合はエンティティを作成しない）
+            # 走査しない要素はストリーミング処理と同じく読み飛ばした要素として数える
+            stats = self.stats
+            if self._row_tags(child_tag):
+                for child in entity.element.findall(child_tag):
+                    child_entity = context.process_xml_element(child, entity.path, entity)
+                    stats.elements_skipped += sum(skippable.get(grandchild, 0) for grandchild in child)
+                    row_data = self._extract_data(child_entity, ancestors)
+                    if row_data:
+                        yield child_entity.path, row_data
+            else:
+                for child in entity.element.findall(child_tag):
+                    stats.elements_skipped += skippable.get(child) or sum(1 for _ in child.iter())
+        else:
+            child_tag = None
 
-        # 子要素を処理
+        # 子要素を処理（コレクションとして処理済みの子要素はエンティティを作成しない）
         for child in entity.element:
-            if isinstance(child.tag, str):
+            if isinstance(child.tag, str) and child.tag != child_tag:
+                skipped = skippable.get(child)
+                if skipped:
+                    self.stats.elements_skipped += skipped
+                    continue
                 child_entity = context.process_xml_element(child, entity.path, entity)
-                self._process_entity(child_entity, context)
+                yield from self._iter_entity_rows(child_entity, context, ancestors, skippable)
 
-    def _extract_data(self, entity: Entity) -> Optional[Dict]:
-        """エンティティからデータを抽出"""
-        config_path, mapping_config = self._find_mapping_config(entity.path)
-        if not mapping_config or "columns" not in mapping_config:
-            return None
+        # 祖先の対応表を元に戻す
+        if shadowed is None:
+            del ancestors[tag]
+        else:
+            ancestors[tag] = shadowed
 
-        data = {}
-        for source, target in mapping_config["columns"].items():
-            value = None
-            if "." in source:
-                # 親要素からの値を取得
-                value = self._extract_parent_value(entity, source)
-            else:
-                # 自身の要素または属性から値を取得
-                value = entity.get_value(source)
+    def _find_skippable(self, root: ET.Element) -> Dict[ET.Element, int]:
+        """行を出力する可能性があるタグを含まない部分木を一度の走査で取得
 
-            if value is not None:
-                data[target] = str(value)
+        子要素の部分木から順に要素数を集計するため、各要素は一度だけ訪れる。
+        走査で訪れる要素（ルートと、行を出力する可能性があるタグを含む部分木の要素）の子要素のみ登録する。
 
-        return data if data else None
+        Args:
+            root: ルート要素
 
-    def _extract_parent_value(self, entity: Entity, reference: str) -> Optional[str]:
-        """親要素からの値を取得"""
-        if "." not in reference:
-            return None
+        Returns:
+            読み飛ばす要素 → 部分木の要素数の対応表
+        """
+        row_tags = self._row_tags
+        skippable: Dict[ET.Element, int] = {}
+        # (要素, 未処理の子要素, 処理済みの子要素と部分木の要素数（行を出力しうる場合は 0）)
+        stack: List[Tuple[ET.Element, Iterator[ET.Element], List[Tuple[ET.Element, int]]]] = [(root, iter(root), [])]
+        while stack:
+            element, children, counted = stack[-1]
+            child = next(children, None)
+            if child is not None:
+                stack.append((child, iter(child), []))
+                continue
+            stack.pop()
+
+            count = 1
+            for _, child_count in counted:
+                if not child_count:
+                    count = 0
+                    break
+                count += child_count
+            if isinstance(element.tag, str) and row_tags(element.tag):
+                count = 0
+            if not count or not stack:
+                skippable.update(item for item in counted if item[1])
+            if stack:
+                stack[-1][2].append((element, count))
+        return skippable
+
+    def _append_row(self, path: str, row_data: Dict) -> None:
+        """行データをパスに対応するシートに追加"""
+        sheet_name = self._get_sheet_name(path)
+        sheet = self.sheets.get(sheet_name)
+        if sheet is None:
+            sheet = self.sheets[sheet_name] = SheetBuffer()
+        sheet.append(row_data)
+
+    def _build_data_frames(self) -> None:
+        """蓄積した行データからシートごとのデータフレームを作成"""
+        self.data_frames = {
+            sheet_name: sheet.to_dataframe(self._get_column_types(sheet_name))
+            for sheet_name, sheet in self.sheets.items()
+        }
+
+    def _extract_data(self, entity: Entity, ancestors: Optional[AncestorTable] = None) -> Optional[Dict]:
+        """エンティティからデータを抽出
 
-        first, rest = reference.split(".", 1)
-        if not entity.parent:
+        Args:
+            entity: 抽出対象のエンティティ
+            ancestors: タグ → 最も近い祖先エンティティの対応表。
+                省略時はエンティティの親をたどって作成する
+        """
+        columns = self._find_columns(entity.path)
+        if columns is None:
             return None
+        if ancestors is None:
+            ancestors = ancestor_table(entity) if columns.ancestors else {}
 
-        if entity.parent.element.tag == first:
-            return entity.parent.get_value(rest)
+        data = {}
+        for target, extract in columns.extractors:
+            value = extract(entity, ancestors)
+            if value is not None:
+                data[target] = value
 
-        # 親の親をたどる
-        return self._extract_parent_value(entity.parent, reference)
+        return data if data else None
 
     def _get_sheet_name(self, path: str) -> str:
         """パスからシート名を取得"""
@@ -198,27 +457,74 @@ class XmlToExcelConverter:
         return sheet_name
 
     def _save_to_excel(self, output_file: str) -> None:
-        """データフレームをExcelファイルとして保存"""
+        """データフレームをExcelファイルとして保存
+
+        行数がExcelの上限を超えるシートは「シート名_2」「シート名_3」…のシートに分割する。
+        """
         if not self.data_frames:
             raise ConfigurationError("保存するデータがありません")
 
+        used = self._get_sheet_names()
         with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
             for sheet_name, df in self.data_frames.items():
                 if df.empty:
                     continue
 
-                # カラム順序を設定から取得
-                ordered_columns = self._get_ordered_columns(sheet_name)
-                if ordered_columns:
-                    ordered_columns = [col for col in ordered_columns if col in df.columns]
-                    df = df[ordered_columns]
+                df = df[self._get_output_columns(sheet_name, list(df.columns))]
+                for column, type_name in self._get_column_types(sheet_name).items():
+                    if column in df.columns:
+                        df[column] = for_excel(df[column], type_name)
+                for part_name, start, stop in excel_sheet_parts(sheet_name, len(df), used):
+                    used.add(part_name)
+                    part = df if start == 0 and stop == len(df) else df.iloc[start:stop]
+                    part.to_excel(writer, sheet_name=part_name, index=False)
+
+    def _save_write_only(self, output_file: str, output_format: str = "xlsx") -> None:
+        """蓄積した行データをデータフレームを作成せずに保存（xlsx は書き込み専用モード）"""
+        if not self.sheets:
+            raise ConfigurationError("保存するデータがありません")
 
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        writer = create_writer(output_file, output_format, self._get_sheet_names())
+        for sheet_name, sheet in self.sheets.items():
+            if not len(sheet):
+                continue
+            columns = self._get_output_columns(sheet_name, sheet.columns)
+            writer.write_buffer(sheet_name, sheet, columns, self._get_column_types(sheet_name))
+        writer.save()
+
+    def _save_pipeline(self, rows: Iterator[Tuple[str, Dict]], output_file: str, output_format: str = "xlsx") -> None:
+        """行データを蓄積せずに生成順に出力ファイルへ書き込む"""
+        writer = StreamingWriter(
+            create_writer(output_file, output_format, self._get_sheet_names()),
+            self._get_ordered_columns,
+            self._get_column_types,
+        )
+        row_counts = self.stats.rows if self.collect_stats else None
+        for path, row_data in rows:
+            sheet_name = self._get_sheet_name(path)
+            writer.append(sheet_name, row_data)
+            if row_counts is not None:
+                row_counts[sheet_name] = row_counts.get(sheet_name, 0) + 1
+
+        if not len(writer):
+            raise ConfigurationError("保存するデータがありません")
+        writer.save()
+
+    def _get_sheet_names(self) -> Set[str]:
+        """出力する可能性があるシート名を取得（設定のシート名と蓄積したシート名）"""
+        return set(self._compiled.sheet_types).union(self.sheets)
+
+    def _get_output_columns(self, sheet_name: str, columns: List[str]) -> List[str]:
+        """出力するカラムを設定の順序で取得（設定がない場合は出現順）"""
+        ordered_columns = self._get_ordered_columns(sheet_name)
+        if ordered_columns:
+            return [col for col in ordered_columns if col in columns]
+        return columns
 
     def _get_ordered_columns(self, sheet_name: str) -> List[str]:
         """設定からカラムの順序を取得"""
-        for path, config in self.config.get("mapping", {}).items():
-            if sheet_name in [config.get("sheet_name"), path.split(".")[-1]]:
-                if "columns" in config:
-                    return list(config["columns"].values())
-        return []
+        return list(self._compiled.sheet_columns.get(sheet_name, ()))
+
+    def _get_column_types(self, sheet_name: str) -> Dict[str, str]:
+        """設定からシートのカラム名と型の名前の辞書を取得（同じシートに出力する設定の型をまとめる）"""
+        return dict(self._compiled.sheet_types.get(sheet_name, {}))
@@ -1,12 +1,35 @@
 """XML"""
 
+import sys
 import xml.etree.ElementTree as ET
 from typing import Dict, List, Optional, Tuple, Set
 
+# (タグ, 属性名) ごとの値のキー。エンティティ間で同じ文字列を共有する
+_ATTRIBUTE_KEYS: Dict[Tuple[str, str], str] = {}
+
+
+def attribute_key(tag: str, attr_name: str) -> str:
+    """属性値のキーを取得
+
+    Args:
+        tag: 子要素の属性の場合は子要素のタグ、自身の属性の場合は空文字
+        attr_name: 属性名
+
+    Returns:
+        "@属性名" または "タグ.@属性名"
+    """
+    key = _ATTRIBUTE_KEYS.get((tag, attr_name))
+    if key is None:
+        key = sys.intern(f"{tag}.@{attr_name}" if tag else f"@{attr_name}")
+        _ATTRIBUTE_KEYS[(tag, attr_name)] = key
+    return key
+
 
 class Entity:
     """XMLエンティティを表現するクラス"""
 
+    __slots__ = ("element", "path", "parent", "_values")
+
     def __init__(self, element: ET.Element, path: str, parent: Optional["Entity"] = None):
         """
         Args:
@@ -17,83 +40,103 @@ class Entity:
         self.element = element
         self.path = path
         self.parent = parent
-        self._columns: Set[str] = set()
         self._values: Dict[str, str] = {}
-        self._inherited_values: Dict[str, str] = {}
         self._initialize()
 
     def _initialize(self) -> None:
         """初期化処理"""
-        # 自身の値を初期化
+        # 自身の値を初期化（親からの継承値は get_value で参照時に解決する）
         self._initialize_values()
-        # 親からの継承値を初期化
-        self._inherit_values()
 
     def _initialize_values(self) -> None:
         """自身の値を初期化"""
         # テキストコンテンツ
         if self.element.text and self.element.text.strip():
             self._values[self.element.tag] = self.element.text.strip()
-            self._columns.add(self.element.tag)
 
         # 属性値
         for attr_name, attr_value in self.element.attrib.items():
-            attr_key = f"@{attr_name}"
-            self._values[attr_key] = attr_value
-            self._columns.add(attr_key)
+            self._values[attribute_key("", attr_name)] = attr_value
 
         # 子要素のテキストコンテンツと属性
         for child in self.element:
-            if isinstance(child.tag, str):
-                if child.text and child.text.strip():
-                    self._values[child.tag] = child.text.strip()
-                    self._columns.add(child.tag)
-                for attr_name, attr_value in child.attrib.items():
-                    key = f"{child.tag}.@{attr_name}"
-                    self._values[key] = attr_value
-                    self._columns.add(key)
-
-    def _inherit_values(self) -> None:
-        """親からの値を継承"""
-        if not self.parent:
-            return
-
-        # 親の値を継承（属性とテキスト）
-        parent_prefix = self.parent.element.tag
-        # 親自身の属性を継承
-        for attr_name, attr_value in self.parent.element.attrib.items():
-            inherited_key = f"{parent_prefix}.@{attr_name}"
-            self._inherited_values[inherited_key] = attr_value
-            self._columns.add(inherited_key)
-
-        # 親が持つ値も継承
-        for key, value in self.parent._values.items():
-            inherited_key = f"{parent_prefix}.{key}"
-            self._inherited_values[inherited_key] = value
-            self._columns.add(inherited_key)
-
-        # 親の継承値も引き継ぐ
-        if self.parent.parent:
-            grandparent_prefix = self.parent.parent.element.tag
-            for key, value in self.parent._inherited_values.items():
-                if key.startswith(f"{grandparent_prefix}."):
-                    inherited_key = f"{parent_prefix}.{key}"
-                    self._inherited_values[inherited_key] = value
-                    self._columns.add(inherited_key)
+            self.add_child_values(child)
+
+    def add_child_values(self, child: ET.Element) -> None:
+        """子要素のテキストと属性を自身の値に追加
+
+        Args:
+            child: 子要素
+        """
+        # コメントや処理命令（タグが文字列でないノード）を含むツリーの場合は値としない。
+        # ET の型定義ではタグは常に文字列のため、mypy では到達しないと判定される
+        if not isinstance(child.tag, str):
+            return  # type: ignore[unreachable]
+        if child.text and child.text.strip():
+            self._values[child.tag] = child.text.strip()
+        for attr_name, attr_value in child.attrib.items():
+            self._values[attribute_key(child.tag, attr_name)] = attr_value
+
+    def complete_text(self) -> None:
+        """要素の終了時に自身のテキストを値に反映（ストリーミング処理用）
+
+        開始イベントの時点ではテキストが確定していないため、終了イベントで呼び出す。
+        同名の子要素のテキストが既に設定されている場合はそちらを優先する。
+        """
+        text = self.element.text
+        if text and text.strip():
+            self._values.setdefault(self.element.tag, text.strip())
+
+    def _get_inherited_value(self, key: str) -> Optional[str]:
+        """親から継承した値を取得
+
+        親の値を複製せずに、親（さらに祖先）をたどって参照時に解決する。
+        キーは "親のタグ.親の値のキー" または "親のタグ.祖父母のタグ.…" の形式。
+        """
+        parent = self.parent
+        if parent is None:
+            return None
+
+        parent_prefix = f"{parent.element.tag}."
+        if not key.startswith(parent_prefix):
+            return None
+        rest = key[len(parent_prefix) :]
+
+        # 親の継承値（祖父母以上の値）を親自身の値より優先する
+        grandparent = parent.parent
+        if grandparent is not None and rest.startswith(f"{grandparent.element.tag}."):
+            value = parent._get_inherited_value(rest)
+            if value is not None:
+                return value
+
+        return parent._values.get(rest)
+
+    def _get_inherited_keys(self) -> Set[str]:
+        """親から継承した値のキーを取得"""
+        parent = self.parent
+        if parent is None:
+            return set()
+
+        parent_prefix = parent.element.tag
+        keys = {f"{parent_prefix}.{key}" for key in parent._values}
+        keys.update(f"{parent_prefix}.{key}" for key in parent._get_inherited_keys())
+        return keys
 
     def get_columns(self) -> List[str]:
         """利用可能なカラムのリストを取得"""
-        return sorted(list(self._columns))
+        return sorted(self._values.keys() | self._get_inherited_keys())
 
     def get_value(self, key: str) -> Optional[str]:
         """値を取得"""
         # 自身の値をチェック
-        if key in self._values:
-            return self._values[key]
+        value = self._values.get(key)
+        if value is not None:
+            return value
 
         # 継承値をチェック
-        if key in self._inherited_values:
-            return self._inherited_values[key]
+        value = self._get_inherited_value(key)
+        if value is not None:
+            return value
 
         # 親要素への参照をチェック
         if self.parent and "." in key:
@@ -104,85 +147,89 @@ class Entity:
         return None
 
 
-class EntityContext:
-    """エンティティのコンテキスト管理クラス"""
+class ChildTagCounter:
+    """子要素のタグ出現状況を集計し、コレクション判定を行うクラス
+
+    子要素を一つずつ追加できるため、EntityContext.is_collection_element と
+    要素全体を保持しないストリーミング処理で同じ判定を共有できる。
+    """
 
     def __init__(self) -> None:
-        self._current_path: str = ""
-        self._current_parent: Optional[Entity] = None
+        # タグごとの [出現回数, 内容を持つ要素数]
+        self._counts: Dict[str, List[int]] = {}
+        self._first_tag: Optional[str] = None
+        self._has_content = False
+
+    @staticmethod
+    def has_content(element: ET.Element) -> bool:
+        """要素自身または孫要素がテキストを持つかどうか"""
+        if element.text and element.text.strip():
+            return True
+        return any(grandchild.text and grandchild.text.strip() for grandchild in element)
+
+    def add(self, tag: str, has_content: bool) -> None:
+        """子要素を追加
+
+        Args:
+            tag: 子要素のタグ
+            has_content: 子要素自身または孫要素がテキストを持つかどうか
+        """
+        counts = self._counts.get(tag)
+        if counts is None:
+            counts = self._counts[tag] = [0, 0]
+            if self._first_tag is None:
+                self._first_tag = tag
+            # 各タグの最初の要素の内容有無で判定する
+            if has_content:
+                self._has_content = True
+        counts[0] += 1
+        if has_content:
+            counts[1] += 1
+
+    def decided_tag(self) -> Optional[str]:
+        """以降の子要素に関係なく判定が確定した場合にコレクションのタグを返す
+
+        最初に出現したタグが条件を満たした時点で、判定結果は後続の子要素に左右されない。
+        """
+        if not self._has_content or self._first_tag is None:
+            return None
+        count, valid = self._counts[self._first_tag]
+        if count > 1 and valid > 1:
+            return self._first_tag
+        return None
+
+    def result(self) -> Tuple[bool, Optional[str]]:
+        """コレクション判定の結果を取得"""
+        if not self._has_content:
+            return False, None
+        for tag, (count, valid) in self._counts.items():
+            if count > 1 and valid > 1:
+                return True, tag
+        return False, None
+
+
+class EntityContext:
+    """エンティティのコンテキスト管理クラス"""
 
     def process_xml_element(
         self, element: ET.Element, parent_path: str = "", parent: Optional[Entity] = None
     ) -> Entity:
-        """XMLエレメントを処理してエンティティを作成"""
-        # 現在のコンテキストを保存
-        prev_path = self._current_path
-        prev_parent = self._current_parent
-
-        try:
-            # 現在のエンティティのコンテキストを設定
-            current_path = f"{parent_path}.{element.tag}" if parent_path else element.tag
-            self._current_path = current_path
-            self._current_parent = parent
-
-            # エンティティを作成
-            current_entity = Entity(element, current_path, parent)
-
-            # 子要素を処理
-            for child in element:
-                if isinstance(child.tag, str):
-                    self.process_xml_element(child, current_path, current_entity)
-
-            return current_entity
-        finally:
-            # コンテキストを復元
-            self._current_path = prev_path
-            self._current_parent = prev_parent
+        """XMLエレメントを処理してエンティティを作成
 
-    def is_collection_element(self, element: ET.Element) -> Tuple[bool, Optional[str]]:
-        """コレクション要素かどうかを判定"""
-        child_tags = [child.tag for child in element if isinstance(child.tag, str)]
-        if not child_tags:
-            return False, None
-
-        # タグの出現回数をカウント
-        tag_counts: Dict[str, int] = {}
-        content_children = 0
-        for tag in child_tags:
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
-            # テキストコンテンツを持つ子要素をカウント
-            child = element.find(tag)
-            if child is not None:
-                # 子要素自身のテキストまたは孫要素のテキストをチェック
-                has_content = bool(child.text and child.text.strip())
-                if not has_content:
-                    for grandchild in child:
-                        if grandchild.text and grandchild.text.strip():
-                            has_content = True
-                            break
-                if has_content:
-                    content_children += 1
-
-        # テキストコンテンツを持つ要素が一つもない場合も処理継続
-        if content_children == 0:
-            # コレクションではないが、処理は継続
-            return False, None
+        子要素のエンティティは作成しない。子要素は呼び出し側が走査する際に
+        一度だけエンティティ化する。
+        """
+        current_path = f"{parent_path}.{element.tag}" if parent_path else element.tag
+        return Entity(element, current_path, parent)
 
-        # 複数回出現するタグを探す
-        for tag, count in tag_counts.items():
-            if count > 1:
-                # そのタグを持つ要素が有効なコンテンツを持っているか確認
-                children = element.findall(tag)
-                valid_children = 0
-                for child in children:
-                    if child.text and child.text.strip():
-                        valid_children += 1
-                        continue
-                    for grandchild in child:
-                        if grandchild.text and grandchild.text.strip():
-                            valid_children += 1
-                            break
-                if valid_children > 1:
-                    return True, tag
+    def is_collection_element(self, element: ET.Element) -> Tuple[bool, Optional[str]]:
+        """コレクション要素かどうかを判定
 
-        return False, None
+        子要素を一度だけ走査してタグの出現回数と内容の有無を集計する。
+        走査では要素ごとに一度だけ呼び出すため、判定結果は保持しない。
+        """
+        counter = ChildTagCounter()
+        for child in element:
+            if isinstance(child.tag, str):
+                counter.add(child.tag, ChildTagCounter.has_content(child))
+        return counter.result()
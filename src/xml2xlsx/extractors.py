@@ -0,0 +1,128 @@
+"""カラムの値の抽出処理を設定から事前に構築するモジュール
+
+設定の columns は行ごとに解釈せず、設定の読み込み時に (出力カラム名, 抽出関数) の
+タプルに変換する。カラムの参照元は次の2種類に分かれる。
+
+* ドットを含まない参照（"name"、"@id" など）: 自身のテキスト・属性・子要素のテキストで、
+  いずれもエンティティ自身の値から取得する
+* ドットを含む参照（"order.@id"、"order.customer.name" など）: 先頭のタグを持つ
+  最も近い祖先要素を探し、残りの参照をその祖先要素の値として取得する
+
+祖先要素は親をたどって探さず、走査側が管理する「タグ → 最も近い祖先要素」の
+対応表（AncestorTable）から取得する。対応表は要素に入るときに登録し、出るときに
+元の要素に戻すことで、階層の深さによらず一定時間で参照できる。
+"""
+
+from typing import Any, Callable, Dict, Iterable, Mapping, NamedTuple, Optional, Set, Tuple
+from .entity import Entity
+
+# タグ → そのタグを持つ最も近い祖先要素
+AncestorTable = Mapping[str, Entity]
+# 抽出した値（値がない場合は None）。抽出関数の作成ごとに型注釈の Optional[str] を評価しないよう別名とする
+Value = Optional[str]
+Extractor = Callable[[Entity, AncestorTable], Value]
+
+
+class AncestorReference(NamedTuple):
+    """祖先要素を参照するカラム"""
+
+    tag: str  # 参照する祖先要素のタグ
+    key: str  # 祖先要素での値のキー
+
+
+class CompiledColumns(NamedTuple):
+    """抽出関数に変換したカラム定義"""
+
+    # (出力カラム名, 抽出関数) の定義順のタプル
+    extractors: Tuple[Tuple[str, Extractor], ...]
+    # 祖先要素を参照するカラムの参照先
+    ancestors: Tuple[AncestorReference, ...]
+    # 祖先要素が閉じるまで値が確定しない参照先（属性以外を参照するもの）
+    deferred: Tuple[AncestorReference, ...]
+    # 変換元の設定の columns（参照元と出力カラム名の組）
+    source: Tuple[Tuple[str, str], ...] = ()
+
+    def __reduce__(self) -> Tuple[Callable[..., "CompiledColumns"], Tuple[Any, ...]]:
+        # 抽出関数はクロージャのため pickle できない。設定の columns から構築し直す
+        return compile_columns, (dict(self.source),)
+
+
+def _own_value(key: str) -> Extractor:
+    """エンティティ自身の値（テキスト・属性・子要素のテキスト）を取得する関数を作成"""
+
+    def extract(entity: Entity, ancestors: AncestorTable) -> Value:
+        return entity._values.get(key)
+
+    return extract
+
+
+def _ancestor_value(reference: AncestorReference) -> Extractor:
+    """タグが一致する最も近い祖先要素の値を取得する関数を作成"""
+    tag, key = reference
+    if "." in key:
+        # 祖先要素の子要素の属性や、さらに上の祖先要素への参照
+        def get_value(ancestor: Entity) -> Value:
+            return ancestor.get_value(key)
+
+    else:
+
+        def get_value(ancestor: Entity) -> Value:
+            return ancestor._values.get(key)
+
+    def extract(entity: Entity, ancestors: AncestorTable) -> Value:
+        ancestor = ancestors.get(tag)
+        return None if ancestor is None else get_value(ancestor)
+
+    return extract
+
+
+def ancestor_table(entity: Entity) -> Dict[str, Entity]:
+    """親をたどってエンティティの祖先要素の対応表を作成
+
+    走査中の対応表がない場合（エンティティを個別に処理する場合）に使用する。
+    """
+    table: Dict[str, Entity] = {}
+    ancestor = entity.parent
+    while ancestor is not None:
+        table.setdefault(ancestor.element.tag, ancestor)
+        ancestor = ancestor.parent
+    return table
+
+
+def compile_columns(columns: Dict[str, str]) -> CompiledColumns:
+    """設定の columns を抽出関数に変換
+
+    Args:
+        columns: 参照元と出力カラム名の辞書
+
+    Returns:
+        定義順の抽出関数と祖先要素の参照先
+    """
+    extractors = []
+    ancestors = []
+    deferred = []
+    for source, target in columns.items():
+        if "." in source:
+            tag, key = source.split(".", 1)
+            reference = AncestorReference(tag, key)
+            ancestors.append(reference)
+            if not key.startswith("@") or "." in key:
+                deferred.append(reference)
+            extractors.append((target, _ancestor_value(reference)))
+        else:
+            extractors.append((target, _own_value(source)))
+    return CompiledColumns(tuple(extractors), tuple(ancestors), tuple(deferred), tuple(columns.items()))
+
+
+def referenced_tags(compiled: Iterable[CompiledColumns]) -> Set[str]:
+    """祖先要素の参照で値を読み取る可能性がある要素のタグを取得
+
+    参照先の祖先要素に加え、残りの参照（"customer.@type" など）が祖先要素の親を
+    たどる場合に備えて、最後の部分を除くすべての部分のタグを含める。
+    """
+    tags: Set[str] = set()
+    for columns in compiled:
+        for tag, key in columns.ancestors:
+            tags.add(tag)
+            tags.update(key.split(".")[:-1])
+    return tags
@@ -0,0 +1,137 @@
+"""マッピング設定の検索を行うモジュール"""
+
+from typing import AbstractSet, Dict, Iterable, Optional, Tuple
+
+MappingMatch = Tuple[Optional[str], Optional[Dict]]
+
+
+class _TrieNode:
+    """設定パスを文字の逆順でたどるトライのノード"""
+
+    __slots__ = ("children", "order")
+
+    def __init__(self) -> None:
+        # 次の文字 → 子ノード
+        self.children: Dict[str, "_TrieNode"] = {}
+        # このノードで終わる設定パスの定義順（終端でない場合は None）
+        self.order: Optional[int] = None
+
+
+class MappingIndex:
+    """XMLパスに一致するマッピング設定を検索するインデックス
+
+    設定パスと完全一致するものを優先し、次に定義順で最初に末尾一致する設定パスを返す。
+    末尾一致は文字単位で判定するため（例: "item" は "root.subitem" にも一致する）、
+    設定パスを文字の逆順でたどるトライを構築し、パスの長さに比例する時間で検索する。
+    検索結果はパスごとにキャッシュする。
+    """
+
+    def __init__(self, mapping: Dict[str, Dict]):
+        """
+        Args:
+            mapping: 設定ファイルの mapping セクション
+        """
+        self._mapping = mapping
+        self._paths = list(mapping)
+        self._trie = _TrieNode()
+        self._cache: Dict[str, MappingMatch] = {}
+
+        for order, config_path in enumerate(self._paths):
+            node = self._trie
+            for char in reversed(config_path):
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _TrieNode()
+                node = child
+            # 同じパスが複数回定義されることはないが、最初の定義を優先する
+            if node.order is None:
+                node.order = order
+
+    @property
+    def cache_size(self) -> int:
+        """キャッシュしている検索結果の数（キャッシュに存在しなかった検索の累計）"""
+        return len(self._cache)
+
+    def lookup(self, path: str) -> MappingMatch:
+        """パスに一致するマッピング設定を検索
+
+        Args:
+            path: ドット区切りのXMLパス
+
+        Returns:
+            (一致した設定パス, マッピング設定)。一致しない場合は (None, None)
+        """
+        match = self._cache.get(path)
+        if match is None:
+            match = self._cache[path] = self._match(path)
+        return match
+
+    def _match(self, path: str) -> MappingMatch:
+        """キャッシュを使わずにパスを照合"""
+        # 完全一致を優先
+        if path in self._mapping:
+            return path, self._mapping[path]
+
+        # 末尾一致する設定パスのうち定義順で最初のものを探す
+        best: Optional[int] = None
+        node = self._trie
+        for char in reversed(path):
+            next_node = node.children.get(char)
+            if next_node is None:
+                break
+            node = next_node
+            order = node.order
+            if order is not None and (best is None or order < best):
+                best = order
+
+        if best is None:
+            return None, None
+        config_path = self._paths[best]
+        return config_path, self._mapping[config_path]
+
+
+class TagFilter:
+    """要素のタグが条件に一致するかどうかを判定するフィルタ
+
+    完全一致するタグの集合と、末尾一致するタグの接尾辞で条件を表す。
+    """
+
+    __slots__ = ("_tags", "_suffixes")
+
+    def __init__(self, tags: Iterable[str] = (), suffixes: Iterable[str] = ()):
+        """
+        Args:
+            tags: 完全一致するタグ
+            suffixes: 末尾一致するタグの接尾辞
+        """
+        self._tags = frozenset(tags)
+        self._suffixes = tuple(dict.fromkeys(suffixes))
+
+    def __call__(self, tag: str) -> bool:
+        return tag in self._tags or tag.endswith(self._suffixes)
+
+    @classmethod
+    def for_paths(cls, config_paths: Iterable[str]) -> "TagFilter":
+        """設定パスのいずれかに一致するパスを持ちうる要素のタグのフィルタを作成
+
+        パスは設定パスと末尾一致すれば一致するため、要素のタグ（パスの最後の部分）は
+        設定パスの最後の部分で判定できる。
+
+        * ドットを含まない設定パス（"item"）: タグが設定パスで終わる（"subitem" など）
+        * ドットを含む設定パス（"root.item"）: タグが最後の部分と一致する。
+          タグ自体がドットを含む場合に備えて ".item" で終わるタグも対象とする
+        """
+        tags = []
+        suffixes = []
+        for config_path in config_paths:
+            if "." in config_path:
+                last = config_path.rsplit(".", 1)[1]
+                tags.append(last)
+                suffixes.append(f".{last}")
+            else:
+                suffixes.append(config_path)
+        return cls(tags, suffixes)
+
+    def union(self, tags: AbstractSet[str]) -> "TagFilter":
+        """完全一致するタグを追加したフィルタを作成"""
+        return TagFilter(self._tags | tags, self._suffixes)
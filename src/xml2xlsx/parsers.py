@@ -0,0 +1,129 @@
+"""XMLの解析を行うパーサーバックエンドのモジュール
+
+既定では標準ライブラリの xml.etree.ElementTree を使用し、指定された場合のみ lxml を使用する
+（本ライブラリの処理では lxml の方が処理時間・メモリ使用量とも大きいため）。
+どちらのバックエンドでも同じ要素の構造（タグ、属性、テキスト）が得られるよう、
+lxml ではコメントと処理命令を除外し、解析エラーは標準ライブラリと同じ ET.ParseError として送出する。
+
+lxml では次のオプションを使用する。
+
+* huge_tree: 深い階層や巨大なテキストノードの制限を解除する
+* remove_blank_text: 空白のみのテキストノードを作成しない（値の抽出では空白を除去するため結果は変わらない）
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+from typing import IO, Any, Iterator, Literal, Optional, Sequence, Tuple, Union
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+logger = logging.getLogger(__name__)
+
+# パーサーバックエンドの名前
+LXML = "lxml"
+STDLIB = "stdlib"
+PARSER_BACKENDS = (LXML, STDLIB)
+
+# lxml のパーサーオプション
+_LXML_OPTIONS = {"huge_tree": True, "remove_blank_text": True, "remove_comments": True, "remove_pis": True}
+
+Source = Union[str, IO[bytes]]
+
+# iterparse で通知するイベント
+Event = Literal["start", "end"]
+
+# lxml へのフォールバックの警告を出力済みかどうか
+_fallback_warned = False
+
+
+def lxml_available() -> bool:
+    """lxml が利用可能かどうか"""
+    return lxml_etree is not None
+
+
+def _warn_fallback() -> None:
+    """lxml を指定されたが利用できない場合の警告を一度だけ出力"""
+    global _fallback_warned
+    if not _fallback_warned:
+        _fallback_warned = True
+        logger.warning("lxml がインストールされていないため、標準ライブラリのパーサーを使用します")
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """使用するパーサーバックエンドを決定
+
+    Args:
+        backend: "lxml" または "stdlib"。省略時は "stdlib" とする
+
+    Returns:
+        "lxml" または "stdlib"。lxml が利用できない場合は "stdlib" にフォールバックする
+
+    Raises:
+        ValueError: 不明なバックエンドが指定された場合
+    """
+    backend = backend or STDLIB
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"不明なパーサーです: {backend}（{', '.join(PARSER_BACKENDS)} のいずれかを指定してください）")
+    if backend == STDLIB:
+        return STDLIB
+    if lxml_etree is None:
+        _warn_fallback()
+        return STDLIB
+    return LXML
+
+
+def _parse_error(error: Any) -> ET.ParseError:
+    """lxml の解析エラーを標準ライブラリの ET.ParseError に変換"""
+    parse_error = ET.ParseError(str(error))
+    code = getattr(error, "code", None)
+    if code is not None:
+        parse_error.code = code
+    position = getattr(error, "position", None)
+    if position is not None:
+        parse_error.position = position
+    return parse_error
+
+
+def parse(source: Source, backend: Optional[str] = None) -> Any:
+    """XMLファイル全体を解析してルート要素を取得
+
+    Args:
+        source: 入力XMLファイルのパスまたはファイルオブジェクト
+        backend: パーサーバックエンド（resolve_backend を参照）
+
+    Raises:
+        ET.ParseError: XMLの解析に失敗した場合
+    """
+    if resolve_backend(backend) == STDLIB:
+        return ET.parse(source).getroot()
+
+    try:
+        return lxml_etree.parse(source, lxml_etree.XMLParser(**_LXML_OPTIONS)).getroot()
+    except lxml_etree.XMLSyntaxError as e:
+        raise _parse_error(e) from e
+
+
+def iterparse(
+    source: Source, events: Sequence[Event] = ("end",), backend: Optional[str] = None
+) -> Iterator[Tuple[str, Any]]:
+    """XMLファイルを逐次解析し、(イベント, 要素) を順に返す
+
+    Args:
+        source: 入力XMLファイルのパスまたはファイルオブジェクト
+        events: 通知するイベント（"start"、"end"）
+        backend: パーサーバックエンド（resolve_backend を参照）
+
+    Raises:
+        ET.ParseError: XMLの解析に失敗した場合
+    """
+    if resolve_backend(backend) == STDLIB:
+        yield from ET.iterparse(source, events=events)
+        return
+
+    try:
+        yield from lxml_etree.iterparse(source, events=events, **_LXML_OPTIONS)
+    except lxml_etree.XMLSyntaxError as e:
+        raise _parse_error(e) from e
@@ -0,0 +1,164 @@
+"""変換処理・設定生成のプロファイルを出力するモジュール
+
+cProfile で計測した結果を、pstats 形式のファイル（``pstats`` モジュールや snakeviz で参照）と、
+フレームグラフ用の collapsed stack 形式のテキストファイル（flamegraph.pl、speedscope などで参照）に出力する。
+
+cProfile は呼び出し元と呼び出し先の組ごとの時間のみを記録するため、collapsed stack は
+呼び出し元ごとの時間の比率で按分して近似的に復元する。
+"""
+
+import cProfile
+import os
+import pstats
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# pstats の関数のキー（ファイル名, 行番号, 関数名）
+FunctionKey = Tuple[str, int, str]
+
+# プロファイルに出力しない微小な時間（マイクロ秒）
+_MIN_MICROSECONDS = 1
+
+# collapsed stack で復元する呼び出しの深さの上限
+_MAX_DEPTH = 200
+
+# pstats に情報を記録する関数のキーのファイル名
+TAG_FILE = "xml2xlsx"
+
+
+class Profile:
+    """プロファイルの出力先と付加情報"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 出力先のパス。拡張子 .pstats / .prof は除いて出力先の名前とする
+        """
+        base = Path(path)
+        if base.suffix in (".pstats", ".prof"):
+            base = base.with_suffix("")
+        self.pstats_path = str(base) + ".pstats"
+        self.collapsed_path = str(base) + ".collapsed.txt"
+        # プロファイルに記録する付加情報（入力サイズ、マッピング設定の数など）
+        self.tags: Dict[str, Any] = {}
+
+    def label(self) -> str:
+        """付加情報を表す文字列を取得"""
+        return ",".join(f"{name}={value}" for name, value in self.tags.items())
+
+
+def input_size(input_files: Iterable[str]) -> int:
+    """入力ファイルの合計バイト数を取得（存在しないファイルは除く）"""
+    return sum(os.path.getsize(input_file) for input_file in input_files if os.path.isfile(input_file))
+
+
+def mapping_count(config: Optional[Dict]) -> int:
+    """設定のマッピング設定の数を取得"""
+    mapping = config.get("mapping") if isinstance(config, dict) else None
+    return len(mapping) if isinstance(mapping, dict) else 0
+
+
+@contextmanager
+def profile(
+    path: str, input_files: Iterable[str] = (), config: Optional[Dict] = None, **tags: Any
+) -> Iterator[Profile]:
+    """with ブロック内の処理をプロファイルし、終了時にファイルへ出力
+
+    例外が発生した場合も、それまでのプロファイルを出力する。
+
+    Args:
+        path: 出力先のパス（``<path>.pstats`` と ``<path>.collapsed.txt`` を出力）
+        input_files: 入力ファイル。合計バイト数を input_size として記録する
+        config: 変換に使用する設定。マッピング設定の数を mappings として記録する
+        **tags: その他に記録する付加情報
+
+    Yields:
+        出力先と付加情報。with ブロック内で tags に付加情報を追加できる
+        （設定生成で生成したマッピング設定の数など）
+
+    Example:
+        >>> with profile("slow", input_files=["input.xml"], config=converter.config):
+        ...     converter.convert("input.xml", "output.xlsx")
+    """
+    result = Profile(path)
+    result.tags["input_size"] = input_size(input_files)
+    if config is not None:
+        result.tags["mappings"] = mapping_count(config)
+    result.tags.update(tags)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        write_profile(profiler, result)
+
+
+def write_profile(profiler: cProfile.Profile, result: Profile) -> None:
+    """プロファイルを pstats 形式と collapsed stack 形式のファイルに出力"""
+    stats = pstats.Stats(profiler)
+    # 付加情報は呼び出し回数と時間が 0 の関数として記録する（pstats の表示に含まれる）
+    stats.stats[(TAG_FILE, 0, result.label())] = (0, 0, 0.0, 0.0, {})  # type: ignore[attr-defined]
+    for output_path in (result.pstats_path, result.collapsed_path):
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    stats.dump_stats(result.pstats_path)
+
+    root = f"{TAG_FILE}[{result.label()}]".replace(";", ",")
+    with open(result.collapsed_path, "w", encoding="utf-8") as f:
+        for stack, microseconds in collapse_stacks(stats.stats):  # type: ignore[attr-defined]
+            f.write(f"{';'.join([root] + stack)} {microseconds}\n")
+
+
+def _frame_name(key: FunctionKey) -> str:
+    """関数のキーをフレーム名に変換"""
+    filename, lineno, name = key
+    if filename == "~":
+        # 組み込み関数
+        return name.replace(";", ",")
+    return f"{os.path.basename(filename)}:{lineno}:{name}".replace(";", ",")
+
+
+def collapse_stacks(stats: Dict[FunctionKey, Tuple]) -> List[Tuple[List[str], int]]:
+    """pstats の統計情報から collapsed stack（呼び出し経路と自身の時間）を復元
+
+    関数の自身の時間と呼び出し先の時間は、呼び出し元からの累積時間の比率で各経路に按分する。
+    再帰呼び出しは経路に含まれる関数を再度たどらずに打ち切る。
+
+    Args:
+        stats: pstats.Stats の stats 属性（関数のキー → (cc, nc, tt, ct, 呼び出し元)）
+
+    Returns:
+        (フレーム名の呼び出し経路, 自身の時間（マイクロ秒）) のリスト
+    """
+    callees: Dict[FunctionKey, List[Tuple[FunctionKey, float]]] = {}
+    roots = []
+    for key, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            roots.append(key)
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, []).append((key, caller_stats[3]))
+
+    result: List[Tuple[List[str], int]] = []
+    path: List[FunctionKey] = []
+
+    def visit(key: FunctionKey, scale: float) -> None:
+        _, _, own_time, total_time, _ = stats[key]
+        path.append(key)
+        microseconds = int(own_time * scale * 1e6)
+        if microseconds >= _MIN_MICROSECONDS:
+            result.append(([_frame_name(frame) for frame in path], microseconds))
+        if len(path) < _MAX_DEPTH:
+            for callee, edge_time in callees.get(key, ()):
+                callee_total = stats[callee][3]
+                if callee in path or callee_total <= 0:
+                    continue
+                callee_scale = scale * min(edge_time / callee_total, 1.0)
+                if callee_total * callee_scale * 1e6 >= _MIN_MICROSECONDS:
+                    visit(callee, callee_scale)
+        path.pop()
+
+    for root in roots:
+        visit(root, 1.0)
+    return result
@@ -0,0 +1,91 @@
+"""シートデータの蓄積を行うモジュール"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import pandas as pd
+from .column_types import to_series, to_values
+
+
+class SheetBuffer:
+    """シートの行データを列ごとに蓄積するクラス
+
+    行を追加するたびにデータフレームを連結すると行数の二乗に比例する時間がかかるため、
+    値を列ごとのリストに追加し、データフレームは保存時に一度だけ作成する。
+    型を宣言したカラムも、保存時にカラム単位でまとめて変換する。
+    """
+
+    def __init__(self) -> None:
+        self._columns: Dict[str, List[Optional[Any]]] = {}
+        self._row_count = 0
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    @property
+    def columns(self) -> List[str]:
+        """出現順のカラム名のリスト"""
+        return list(self._columns)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """行データを追加
+
+        Args:
+            row: カラム名と値の辞書。存在しないカラムは欠損値として扱う
+        """
+        row_count = self._row_count
+        for name, value in row.items():
+            column = self._columns.get(name)
+            if column is None:
+                # 新しいカラムはそれまでの行を欠損値で埋める
+                column = self._columns[name] = [None] * row_count
+            column.append(value)
+
+        # この行に値のないカラムを欠損値で埋める
+        if len(row) < len(self._columns):
+            for column in self._columns.values():
+                if len(column) == row_count:
+                    column.append(None)
+
+        self._row_count = row_count + 1
+
+    def column_values(self, name: str) -> List[Optional[Any]]:
+        """カラムの値のリストを取得（複製しないため変更しないこと）"""
+        return self._columns[name]
+
+    def iter_rows(
+        self, columns: Optional[Sequence[str]] = None, types: Optional[Dict[str, str]] = None
+    ) -> Iterator[Tuple[Optional[Any], ...]]:
+        """行データを指定したカラムの順序で取得
+
+        Args:
+            columns: 出力するカラム名のリスト。省略時は出現順のすべてのカラム
+            types: カラム名と型の名前の辞書。型を宣言したカラムは変換した値を返す
+
+        Raises:
+            DataTypeError: 型に変換できない値が含まれる場合
+        """
+        names = self.columns if columns is None else columns
+        types = types or {}
+        return zip(
+            *(
+                to_values(self._columns[name], types[name], name) if name in types else self._columns[name]
+                for name in names
+            )
+        )
+
+    def to_dataframe(self, types: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """蓄積したデータからデータフレームを作成
+
+        Args:
+            types: カラム名と型の名前の辞書。型を宣言したカラムは対応する dtype とする
+
+        Raises:
+            DataTypeError: 型に変換できない値が含まれる場合
+        """
+        types = types or {}
+        df: pd.DataFrame = pd.DataFrame(
+            {
+                name: to_series(values, types[name], name) if name in types else values
+                for name, values in self._columns.items()
+            }
+        )
+        return df
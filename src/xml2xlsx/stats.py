@@ -0,0 +1,195 @@
+"""変換処理の統計情報を扱うモジュール
+
+読み飛ばした要素数とバイト数は常に集計する。処理段階ごとの時間やキャッシュのヒット数などの
+詳細な統計情報は、XmlToExcelConverter の collect_stats を有効にした場合のみ集計する。
+"""
+
+import functools
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, ParamSpec, TypeVar
+
+# Windows では resource モジュールを利用できない
+if sys.platform != "win32":
+    import resource
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# 処理段階の名前と説明（表示順）
+STAGES = {
+    "parse": "XMLの解析",
+    "traverse": "要素の走査",
+    "entities": "エンティティの作成",
+    "lookup": "マッピング設定の検索",
+    "extract": "行データの抽出",
+    "buffer": "行データの蓄積",
+    "dataframe": "データフレームの作成",
+    "write": "出力ファイルの書き込み",
+    "other": "その他",
+}
+
+
+def _stage_order(name: str) -> int:
+    """処理段階の表示順を取得"""
+    order = list(STAGES)
+    return order.index(name) if name in STAGES else len(order)
+
+
+def peak_rss() -> Optional[int]:
+    """プロセスの最大常駐メモリ（バイト）を取得（取得できない環境では None）"""
+    if sys.platform == "win32":
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux はキロバイト単位、macOS はバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageTime:
+    """処理段階の経過時間とCPU時間（入れ子の段階の時間は含まない）"""
+
+    __slots__ = ("wall", "cpu", "calls")
+
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """統計情報を辞書として取得"""
+        return {"wall": self.wall, "cpu": self.cpu, "calls": self.calls}
+
+
+class ConversionStats:
+    """1回の変換処理の統計情報"""
+
+    __slots__ = (
+        "elements_skipped",
+        "bytes_skipped",
+        "entities_created",
+        "mapping_cache_hits",
+        "mapping_cache_misses",
+        "rows",
+        "process_peak_memory",
+        "wall",
+        "cpu",
+        "stages",
+        "_stack",
+        "_clock",
+    )
+
+    def __init__(self) -> None:
+        # 行の出力に関係しないため読み飛ばした要素数
+        self.elements_skipped = 0
+        # 読み飛ばした部分木のおおよそのバイト数（ストリーミング処理時のみ）
+        self.bytes_skipped = 0
+        # 以下は collect_stats を有効にした場合のみ集計する
+        self.entities_created = 0
+        self.mapping_cache_hits = 0
+        self.mapping_cache_misses = 0
+        # シート名 → 出力した行数
+        self.rows: Dict[str, int] = {}
+        # 変換終了時点のプロセスの最大常駐メモリ（バイト、取得できない環境では None）。
+        # プロセス全体の値のため、同じプロセスで先に処理したファイルの分を含む
+        self.process_peak_memory: Optional[int] = None
+        # 変換処理全体の経過時間とCPU時間（秒）
+        self.wall = 0.0
+        self.cpu = 0.0
+        # 処理段階の名前 → 経過時間とCPU時間
+        self.stages: Dict[str, StageTime] = {}
+        # 計測中の処理段階のスタックと、直前に時間を配分した時点の (経過時間, CPU時間)
+        self._stack: List[StageTime] = []
+        self._clock = (0.0, 0.0)
+
+    @property
+    def elements_visited(self) -> int:
+        """処理した要素数（エンティティを作成した要素と読み飛ばした要素の合計）"""
+        return self.entities_created + self.elements_skipped
+
+    def _switch(self) -> None:
+        """前回からの時間を計測中の処理段階に配分"""
+        now = (time.perf_counter(), time.process_time())
+        if self._stack:
+            stage = self._stack[-1]
+            stage.wall += now[0] - self._clock[0]
+            stage.cpu += now[1] - self._clock[1]
+        self._clock = now
+
+    def _enter(self, name: str) -> None:
+        """処理段階の計測を開始（外側の処理段階の計測は中断する）"""
+        self._switch()
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageTime()
+        stage.calls += 1
+        self._stack.append(stage)
+
+    def _exit(self) -> None:
+        """処理段階の計測を終了（外側の処理段階の計測を再開する）"""
+        self._switch()
+        self._stack.pop()
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """変換処理全体を計測（処理段階に含まれない時間は "other" とする）"""
+        self._enter("other")
+        start = self._clock
+        try:
+            yield
+        finally:
+            self._exit()
+            self.wall = self._clock[0] - start[0]
+            self.cpu = self._clock[1] - start[1]
+            self.process_peak_memory = peak_rss()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """with ブロック内を処理段階として計測"""
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def timed(self, name: str, func: Callable[P, T]) -> Callable[P, T]:
+        """呼び出しを処理段階として計測する関数を作成（元の関数と同じシグネチャ）"""
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            self._enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit()
+
+        return wrapper
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """要素の生成を処理段階として計測するイテレータを作成（利用側の処理時間は含まない）"""
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def as_dict(self) -> Dict[str, Any]:
+        """統計情報を辞書として取得"""
+        return {
+            "elements_visited": self.elements_visited,
+            "elements_skipped": self.elements_skipped,
+            "bytes_skipped": self.bytes_skipped,
+            "entities_created": self.entities_created,
+            "mapping_cache_hits": self.mapping_cache_hits,
+            "mapping_cache_misses": self.mapping_cache_misses,
+            "rows": dict(self.rows),
+            "process_peak_memory": self.process_peak_memory,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "stages": {name: self.stages[name].as_dict() for name in sorted(self.stages, key=_stage_order)},
+        }
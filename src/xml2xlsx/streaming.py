@@ -0,0 +1,747 @@
+"""iterparseによるストリーミング処理を行うモジュール
+
+XML全体をメモリに読み込まず、要素の終了イベントごとに行データを生成する。
+処理を終えた要素はツリーから切り離すため、保持するXMLはルートから現在の要素までの
+経路のみとなる。
+
+出力はツリー全体を走査する場合と同一になるよう、次の点を考慮している。
+
+* 親要素がコレクションかどうかは親要素の終了時（または判定が確定した時点）まで
+  分からないため、子孫の行は仮に出力し、コレクションの子要素と判明した部分木の行は
+  後から除外する
+* 行の順序はツリー走査時に行が出力される順序をキーとして記録し、
+  それより前に出力される行が今後生成されないことが確定した行から順に返す
+* 祖先要素の子要素の値を参照する行は、その祖先要素が閉じて値が確定するまで
+  抽出を遅延する
+* 祖先要素は「タグ → 最も近い処理中の要素」の対応表から取得する。抽出を遅延する行は
+  途中の祖先要素が先に閉じるため、行候補の作成時に参照先を記録しておく
+
+コレクション判定を待つ子要素（属性のみを持つ要素の並びなど、親要素が閉じるまで判定が
+確定しない場合）が一定数を超えた場合も、抽出済みの行候補を一時ファイルに退避する。
+
+順序の確定を待つ行が一定数を超えた場合は、並べ替えた行を一時ファイルに退避し、
+返す際にマージする。退避したファイルは先頭の行の出力キー順のヒープで管理する。
+同じ段階のファイルが一定数に達した場合は1つのファイルにマージし、同時に開くファイル数を
+退避した行数の対数程度に抑える。
+
+行の出力や祖先要素の参照に関係しないタグの要素（TagFilter に一致しない要素）は、
+エンティティや処理中のフレームを作成せず、コレクション判定に必要な子要素の集計のみを
+行う。その部分木に関係する要素が現れた場合に限り、開いている祖先要素のフレームを
+その時点で作成する。
+"""
+
+import heapq
+import pickle
+import tempfile
+import xml.etree.ElementTree as ET
+from operator import itemgetter
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .entity import ChildTagCounter, Entity
+from .extractors import AncestorTable, CompiledColumns
+from .parsers import iterparse
+from .stats import ConversionStats
+
+FindColumns = Callable[[str], Optional[CompiledColumns]]
+IsRelevant = Callable[[str], bool]
+ExtractData = Callable[[Entity, AncestorTable], Optional[Dict]]
+
+# 出力キー（ツリー走査時に行を出力する要素の通し番号, 要素内での順序）
+RowKey = Tuple[int, int]
+
+# 一時ファイルに退避した行（出力キーの2要素, パス, 行データ）
+SpilledRow = Tuple[int, int, str, Dict]
+
+# 一時ファイルに退避したコレクション判定待ちの子要素
+# （タグ, 通し番号, 最後の通し番号, 部分木に行があるか, 行候補のパス, 行データ。行候補がない場合のパスは None）
+SpilledChild = Tuple[str, int, int, bool, Optional[str], Optional[Dict]]
+
+# 順序の確定を待つ行をメモリ上に保持する上限の既定値
+DEFAULT_SPILL_THRESHOLD = 10_000
+
+# 同じ段階の退避ファイルがこの数に達した場合に1つのファイルにマージする
+MERGE_FAN_IN = 16
+
+# 退避ファイルに1回で書き込む（読み込む）行数
+SPILL_BLOCK_SIZE = 256
+
+_spilled_key = itemgetter(0, 1)
+
+
+class _RowCandidate:
+    """行データの候補（値の抽出は遅延される場合がある）"""
+
+    __slots__ = ("path", "entity", "ancestors", "row")
+
+    def __init__(self, entity: Entity, ancestors: AncestorTable):
+        self.path = entity.path
+        self.entity: Optional[Entity] = entity
+        # 作成時点の参照先の祖先要素（抽出までに途中の祖先要素が閉じても変わらない）
+        self.ancestors = ancestors
+        self.row: Optional[Dict] = None
+
+    @classmethod
+    def resolved(cls, path: str, row: Optional[Dict]) -> "_RowCandidate":
+        """抽出済みの行候補を作成（一時ファイルから復元する場合に使用）"""
+        candidate = cls.__new__(cls)
+        candidate.path = path
+        candidate.entity = None
+        candidate.ancestors = _NO_ANCESTORS
+        candidate.row = row
+        return candidate
+
+    def resolve(self, extract: ExtractData) -> None:
+        """行データを抽出"""
+        if self.entity is not None:
+            self.row = extract(self.entity, self.ancestors)
+            self.entity = None
+            self.ancestors = _NO_ANCESTORS
+
+
+_NO_ANCESTORS: AncestorTable = {}
+
+
+class _SpilledRun:
+    """一時ファイルに退避した、出力キー順に並んだ行データ
+
+    行は SPILL_BLOCK_SIZE 行ごとにまとめて書き込み、読み込み時もブロック単位で読み込む。
+    """
+
+    __slots__ = ("_file", "_block", "_position", "head", "level")
+
+    def __init__(self, rows: Iterable[SpilledRow], level: int = 0):
+        """
+        Args:
+            rows: 出力キー順に並んだ行データ
+            level: マージした回数（退避時は 0）
+        """
+        self._file: Optional[IO[bytes]] = tempfile.TemporaryFile()
+        block: List[SpilledRow] = []
+        for row in rows:
+            block.append(row)
+            if len(block) >= SPILL_BLOCK_SIZE:
+                pickle.dump(block, self._file, pickle.HIGHEST_PROTOCOL)
+                block = []
+        if block:
+            pickle.dump(block, self._file, pickle.HIGHEST_PROTOCOL)
+        self._file.seek(0)
+        self._block: List[SpilledRow] = []
+        self._position = 0
+        self.level = level
+        self.head: Optional[SpilledRow] = None
+        self.advance()
+
+    def advance(self) -> None:
+        """次の行を読み込む（末尾に達した場合は head を None にしてファイルを閉じる）"""
+        if self._position >= len(self._block):
+            if self._file is None:
+                self.head = None
+                return
+            try:
+                self._block = pickle.load(self._file)
+            except EOFError:
+                self.close()
+                return
+            self._position = 0
+        self.head = self._block[self._position]
+        self._position += 1
+
+    def pop(self) -> SpilledRow:
+        """先頭の行を返し、次の行を読み込む"""
+        head = self.head
+        if head is None:
+            raise IndexError("退避した行をすべて読み込みました")
+        self.advance()
+        return head
+
+    def rows(self) -> Iterator[SpilledRow]:
+        """未読の行を順に返す"""
+        while self.head is not None:
+            yield self.pop()
+
+    def close(self) -> None:
+        """一時ファイルを閉じる"""
+        self.head = None
+        self._block = []
+        self._position = 0
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _SpilledChildren:
+    """一時ファイルに退避した、コレクション判定待ちの子要素"""
+
+    __slots__ = ("_file",)
+
+    def __init__(self) -> None:
+        self._file: Optional[IO[bytes]] = tempfile.TemporaryFile()
+
+    def write(self, children: List[SpilledChild]) -> None:
+        """子要素を追加で書き込む"""
+        if self._file is not None:
+            pickle.dump(children, self._file, pickle.HIGHEST_PROTOCOL)
+
+    def read(self) -> Iterator[SpilledChild]:
+        """書き込んだ子要素を順に返す"""
+        if self._file is None:
+            return
+        self._file.seek(0)
+        while True:
+            try:
+                children = pickle.load(self._file)
+            except EOFError:
+                return
+            yield from children
+
+    def close(self) -> None:
+        """一時ファイルを閉じる"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _Frame:
+    """処理中（開始済みで未終了）の要素の状態"""
+
+    __slots__ = (
+        "entity",
+        "columns",
+        "depth",
+        "shadowed",
+        "index",
+        "last_index",
+        "rows_before",
+        "counter",
+        "collection_tag",
+        "decided",
+        "has_child_text",
+        "pending_children",
+        "spilled_children",
+        "children_spill_at",
+        "deferred",
+        "suppressed",
+    )
+
+    def __init__(
+        self,
+        entity: Entity,
+        columns: Optional[CompiledColumns],
+        depth: int,
+        shadowed: Optional["_Frame"],
+        index: int,
+        rows_before: int,
+        suppressed: bool,
+    ):
+        self.entity = entity
+        self.columns = columns  # マッピング設定のカラムの抽出関数（対象外の場合は None）
+        self.depth = depth  # 処理中のフレームのスタック内の位置
+        self.shadowed = shadowed  # 同じタグを持つ外側の処理中の要素
+        self.index = index  # 文書順（前順）の通し番号
+        self.last_index = index  # 部分木内の最後の通し番号
+        self.rows_before = rows_before
+        self.counter = ChildTagCounter()
+        self.collection_tag: Optional[str] = None
+        self.decided = False
+        self.has_child_text = False
+        # コレクション判定待ちの子要素: (タグ, 通し番号, 最後の通し番号, 部分木に行があるか, 行候補)
+        self.pending_children: List[Tuple[str, int, int, bool, Optional[_RowCandidate]]] = []
+        # 一時ファイルに退避した判定待ちの子要素と、次に退避する判定待ちの子要素数
+        self.spilled_children: Optional[_SpilledChildren] = None
+        self.children_spill_at = 0
+        # この要素の終了まで抽出を遅延する行候補
+        self.deferred: List[_RowCandidate] = []
+        # この要素の位置に出力される行が除外されることが確定しているか
+        # （祖先要素が確定済みのコレクションの子要素である場合）
+        self.suppressed = suppressed
+
+
+class _SkippedElement:
+    """フレームを作成せずに読み飛ばしている（開始済みで未終了の）要素"""
+
+    __slots__ = ("element", "counter", "has_child_text")
+
+    def __init__(self, element: ET.Element):
+        self.element = element
+        # 子要素の集計（子要素が終了するまで作成しない）
+        self.counter: Optional[ChildTagCounter] = None
+        self.has_child_text = False
+
+
+class StreamProcessor:
+    """iterparseのstart/endイベントから行データを生成するクラス"""
+
+    def __init__(
+        self,
+        find_columns: FindColumns,
+        extract: ExtractData,
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        parser: Optional[str] = None,
+        is_relevant: Optional[IsRelevant] = None,
+        stats: Optional[ConversionStats] = None,
+    ):
+        """
+        Args:
+            find_columns: パスに一致するマッピング設定のカラムの抽出関数を返す関数
+            extract: エンティティから行データを抽出する関数
+            spill_threshold: 順序の確定を待つ行をメモリ上に保持する上限。
+                超えた場合は一時ファイルに退避する
+            parser: XMLのパーサーバックエンド（省略時は自動選択）
+            is_relevant: 行を出力する、または祖先要素として参照される可能性があるタグかどうかを
+                返す関数。省略時はすべての要素を処理する
+            stats: 読み飛ばした要素数とバイト数を加算する統計情報（オプション）
+        """
+        self._find_columns = find_columns
+        self._extract = extract
+        self._spill_threshold = spill_threshold
+        self._parser = parser
+        self._is_relevant = is_relevant
+        self._stats = stats
+        self._frames: List[_Frame] = []
+        # フレームを作成していない、最も内側のフレームの子孫の開いている要素（外側から順）
+        self._skipped: List[_SkippedElement] = []
+        # 読み飛ばしている部分木の開始位置（部分木の途中でフレームを作成した場合は None）
+        self._skip_start: Optional[int] = None
+        # タグ → そのタグを持つ最も内側の処理中の要素
+        self._nearest: Dict[str, _Frame] = {}
+        self._next_index = 0
+        # 出力キー順のヒープ
+        self._rows: List[Tuple[int, int, _RowCandidate]] = []
+        self._emitted = 0
+        self._spill_at = spill_threshold
+        # 未読の行がある退避ファイルの先頭の行の出力キー順のヒープ: (通し番号, 順序, 作成順, 退避ファイル)
+        self._runs: List[Tuple[int, int, int, _SpilledRun]] = []
+        # 段階ごとの退避ファイル（マージの対象の管理に使用する）
+        self._levels: List[List[_SpilledRun]] = []
+        self._run_count = 0
+        # 除外範囲（開始位置順のヒープ）と、返した行の位置までに開始した除外範囲の終端
+        self._suppressed: List[Tuple[int, int]] = []
+        self._suppressed_until = -1
+
+    def iter_rows(self, source: Union[str, IO[bytes]]) -> Iterator[Tuple[str, Dict]]:
+        """XMLファイルを処理し、(パス, 行データ) をツリー走査時と同じ順序で返す
+
+        行は順序が確定した時点で返すため、ファイル全体の読み込みを待たない。
+
+        Args:
+            source: 入力XMLファイルのパスまたはファイルオブジェクト
+
+        Raises:
+            ET.ParseError: XMLの解析に失敗した場合
+        """
+        self._reset()
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                yield from self._iter_source_rows(f)
+        else:
+            yield from self._iter_source_rows(source)
+
+    def _iter_source_rows(self, source: IO[bytes]) -> Iterator[Tuple[str, Dict]]:
+        """ファイルオブジェクトから行データを生成"""
+        is_relevant = self._is_relevant
+        skipped = self._skipped
+        stats = self._stats
+        # 読み込み位置（読み飛ばしたバイト数の概算に使用する）
+        tell = getattr(source, "tell", None) if stats is not None else None
+        try:
+            for event, element in iterparse(source, events=("start", "end"), backend=self._parser):
+                if event == "start":
+                    if is_relevant is None or is_relevant(element.tag):
+                        self._start(element)
+                    else:
+                        if not skipped and tell is not None:
+                            self._skip_start = tell()
+                        skipped.append(_SkippedElement(element))
+                elif skipped:
+                    self._end_skipped(element)
+                    if not skipped and self._skip_start is not None and stats is not None and tell is not None:
+                        # iterparse はまとめて読み込んだ範囲のイベントを返すため、位置は概算となる
+                        stats.bytes_skipped += tell() - self._skip_start
+                        self._skip_start = None
+                else:
+                    self._end(element)
+                    if self._rows or self._runs:
+                        yield from self._release(self._watermark())
+
+            if stats is not None:
+                stats.entities_created += self._next_index
+            # すべての要素が閉じたため残りの行の順序はすべて確定している
+            yield from self._release((self._next_index, 0))
+        finally:
+            self._reset()
+
+    def _reset(self) -> None:
+        """処理状態を初期化"""
+        for frame in self._frames:
+            if frame.spilled_children is not None:
+                frame.spilled_children.close()
+        for level in self._levels:
+            for run in level:
+                run.close()
+        self._frames = []
+        self._skipped = []
+        self._skip_start = None
+        self._nearest = {}
+        self._next_index = 0
+        self._rows = []
+        self._emitted = 0
+        self._spill_at = self._spill_threshold
+        self._runs = []
+        self._levels = []
+        self._run_count = 0
+        self._suppressed = []
+        self._suppressed_until = -1
+
+    def _start(self, element: ET.Element) -> None:
+        """要素の開始を処理"""
+        if self._skipped:
+            self._resume_skipped()
+        self._push_frame(element)
+
+    def _resume_skipped(self) -> None:
+        """読み飛ばしていた祖先要素のフレームを外側から順に作成
+
+        読み飛ばしていた要素は行を出力せず、祖先要素として参照されることもないため、
+        フレームの状態は子要素の集計（コレクション判定）のみを引き継げばよい。
+        また、これらの要素の開始以降に通し番号を割り当てた要素や出力した行はないため、
+        通し番号をこの時点で割り当てても前順との整合性は保たれる。
+        """
+        for skipped in self._skipped:
+            frame = self._push_frame(skipped.element, columns_lookup=False)
+            if skipped.counter is not None:
+                frame.counter = skipped.counter
+                decided_tag = skipped.counter.decided_tag()
+                if decided_tag is not None:
+                    self._decide(frame, decided_tag)
+            frame.has_child_text = skipped.has_child_text
+        self._skipped.clear()
+        self._skip_start = None
+
+    def _push_frame(self, element: ET.Element, columns_lookup: bool = True) -> _Frame:
+        """要素のフレームを作成して処理中のスタックに追加"""
+        parent_frame = self._frames[-1] if self._frames else None
+        if parent_frame is None:
+            entity = Entity(element, element.tag)
+            suppressed = False
+        else:
+            parent = parent_frame.entity
+            entity = Entity(element, f"{parent.path}.{element.tag}", parent)
+            suppressed = parent_frame.suppressed or (
+                parent_frame.decided and parent_frame.collection_tag == element.tag
+            )
+        tag = element.tag
+        frame = _Frame(
+            entity,
+            self._find_columns(entity.path) if columns_lookup else None,
+            len(self._frames),
+            self._nearest.get(tag),
+            self._next_index,
+            self._emitted,
+            suppressed,
+        )
+        self._frames.append(frame)
+        self._nearest[tag] = frame
+        self._next_index += 1
+        return frame
+
+    def _end_skipped(self, element: ET.Element) -> None:
+        """読み飛ばしている要素の終了を処理"""
+        skipped = self._skipped.pop()
+        if self._stats is not None:
+            self._stats.elements_skipped += 1
+        has_text = bool(element.text and element.text.strip())
+        has_content = has_text or skipped.has_child_text
+
+        if self._skipped:
+            # 親要素も読み飛ばしている場合は、後でフレームを作成する場合に備えて集計のみ行う
+            parent = self._skipped[-1]
+            if parent.counter is None:
+                parent.counter = ChildTagCounter()
+            parent.counter.add(element.tag, has_content)
+            parent.has_child_text = parent.has_child_text or has_text
+            del parent.element[-1]
+        elif self._frames:
+            self._add_child(self._frames[-1], element, has_text, has_content)
+
+    def _end(self, element: ET.Element) -> None:
+        """要素の終了を処理"""
+        frame = self._frames.pop()
+        if frame.shadowed is None:
+            del self._nearest[element.tag]
+        else:
+            self._nearest[element.tag] = frame.shadowed
+            frame.shadowed = None
+        frame.last_index = self._next_index - 1
+        entity = frame.entity
+        entity.complete_text()
+
+        # 自身がコレクションかどうかを確定
+        if not frame.decided:
+            is_collection, child_tag = frame.counter.result()
+            self._decide(frame, child_tag if is_collection else None)
+
+        # 自身の値の確定を待っていた行を抽出
+        for deferred in frame.deferred:
+            deferred.resolve(self._extract)
+        frame.deferred.clear()
+
+        candidate = self._create_candidate(frame)
+        own_row = None if frame.collection_tag else candidate
+
+        if not self._frames:
+            # ルート要素は常に処理対象
+            if own_row:
+                self._emit(frame, 0, own_row)
+            return
+
+        parent = self._frames[-1]
+        tag = element.tag
+        if parent.decided:
+            if tag == parent.collection_tag:
+                # コレクションの子要素として親の位置で出力し、部分木は処理しない
+                if self._emitted > frame.rows_before:
+                    self._suppress(frame.index, frame.last_index)
+                if candidate:
+                    self._emit(parent, frame.index, candidate)
+            elif own_row:
+                self._emit(frame, 0, own_row)
+        else:
+            # 親のコレクション判定が確定するまで、子要素として処理した場合の行を仮に出力
+            if own_row:
+                self._emit(frame, 0, own_row)
+            has_rows = self._emitted > frame.rows_before
+            if has_rows or candidate:
+                parent.pending_children.append((tag, frame.index, frame.last_index, has_rows, candidate))
+                if len(parent.pending_children) >= max(self._spill_threshold, parent.children_spill_at):
+                    self._spill_children(parent)
+
+        has_text = bool(element.text and element.text.strip())
+        self._add_child(parent, element, has_text, has_text or frame.has_child_text)
+
+    def _add_child(self, parent: _Frame, element: ET.Element, has_text: bool, has_content: bool) -> None:
+        """親要素に子要素の値と判定用の情報を反映し、処理済みの子要素を切り離す"""
+        tag = element.tag
+        parent.entity.add_child_values(element)
+        parent.counter.add(tag, has_content)
+        parent.has_child_text = parent.has_child_text or has_text
+        if not parent.decided:
+            decided_tag = parent.counter.decided_tag()
+            if decided_tag is not None:
+                self._decide(parent, decided_tag)
+        del parent.entity.element[-1]
+
+    def _decide(self, frame: _Frame, collection_tag: Optional[str]) -> None:
+        """コレクション判定を確定し、判定待ちの子要素を処理"""
+        frame.decided = True
+        frame.collection_tag = collection_tag
+        spilled = frame.spilled_children
+        if spilled is not None:
+            if collection_tag is not None:
+                for tag, index, last_index, has_rows, path, row in spilled.read():
+                    if tag != collection_tag:
+                        continue
+                    if path is not None:
+                        self._emit(frame, index, _RowCandidate.resolved(path, row))
+                    if has_rows:
+                        self._suppress(index, last_index)
+            spilled.close()
+            frame.spilled_children = None
+        if collection_tag is not None:
+            for tag, index, last_index, has_rows, candidate in frame.pending_children:
+                if tag != collection_tag:
+                    continue
+                if candidate:
+                    self._emit(frame, index, candidate)
+                if has_rows:
+                    self._suppress(index, last_index)
+        frame.pending_children.clear()
+
+    def _spill_children(self, frame: _Frame) -> None:
+        """判定待ちの子要素のうち、行候補が抽出済みのものを一時ファイルに退避"""
+        spilled: List[SpilledChild] = []
+        pending = []
+        for child in frame.pending_children:
+            tag, index, last_index, has_rows, candidate = child
+            if candidate is None:
+                spilled.append((tag, index, last_index, has_rows, None, None))
+            elif candidate.entity is None:
+                spilled.append((tag, index, last_index, has_rows, candidate.path, candidate.row))
+            else:
+                pending.append(child)
+
+        if spilled:
+            if frame.spilled_children is None:
+                frame.spilled_children = _SpilledChildren()
+            frame.spilled_children.write(spilled)
+        frame.pending_children = pending
+        # 抽出待ちの行候補が多い場合は退避の頻度を下げる
+        frame.children_spill_at = 2 * len(pending)
+
+    def _create_candidate(self, frame: _Frame) -> Optional[_RowCandidate]:
+        """マッピング対象の要素から行候補を作成（要素のフレームは処理中のスタックから除いた後に呼ぶ）"""
+        columns = frame.columns
+        if columns is None:
+            return None
+
+        ancestors = _NO_ANCESTORS
+        if columns.ancestors:
+            nearest = self._nearest
+            ancestors = {tag: nearest[tag].entity for tag, _ in columns.ancestors if tag in nearest}
+        candidate = _RowCandidate(frame.entity, ancestors)
+        target = self._resolution_frame(columns) if columns.deferred else None
+        if target is None:
+            candidate.resolve(self._extract)
+        else:
+            target.deferred.append(candidate)
+        return candidate
+
+    def _resolution_frame(self, columns: CompiledColumns) -> Optional[_Frame]:
+        """行の抽出を遅延すべき祖先要素を取得
+
+        祖先要素の属性は開始時点で確定しているが、テキストや子要素の値は祖先要素が
+        閉じるまで確定しない。参照する祖先のうち最も外側の要素を返す。
+        """
+        frames = self._frames
+        target: Optional[_Frame] = None
+
+        for tag, key in columns.deferred:
+            ancestor = self._nearest.get(tag)
+            if ancestor is None:
+                continue
+
+            # 参照が祖先をさらにたどる場合に備えて最も外側の祖先を求める
+            while "." in key and ancestor.depth > 0:
+                prefix, key = key.split(".", 1)
+                parent = frames[ancestor.depth - 1]
+                if prefix != parent.entity.element.tag:
+                    break
+                ancestor = parent
+
+            if target is None or ancestor.depth < target.depth:
+                target = ancestor
+
+        return target
+
+    def _emit(self, frame: _Frame, order: int, candidate: _RowCandidate) -> None:
+        """行候補を出力キー（frame の通し番号, order）とともに記録"""
+        if frame.suppressed:
+            # 除外されることが確定している行は記録しない
+            return
+        heapq.heappush(self._rows, (frame.index, order, candidate))
+        self._emitted += 1
+        if len(self._rows) >= self._spill_at:
+            self._spill()
+
+    def _suppress(self, start: int, end: int) -> None:
+        """通し番号の範囲の要素が出力する行を除外"""
+        heapq.heappush(self._suppressed, (start, end))
+
+    def _watermark(self) -> RowKey:
+        """今後記録される行の出力キーの下限を取得
+
+        処理中の要素を外側から順に調べ、その要素（または部分木）がこれから行を記録する
+        可能性がある最小の出力キーを返す。このキーより小さい行は順序が確定している。
+        """
+        frames = self._frames
+        for depth, frame in enumerate(frames):
+            tag = frame.entity.element.tag
+            if depth:
+                parent = frames[depth - 1]
+                if not parent.decided or parent.collection_tag == tag:
+                    # コレクションの子要素として部分木の行が除外される可能性がある
+                    return frame.index, 0
+            if not frame.decided:
+                return frame.index, 0
+            if frame.collection_tag is not None:
+                # 以降のコレクションの子要素の行は、処理中の子要素以降の位置に出力される
+                if depth + 1 < len(frames) and frames[depth + 1].entity.element.tag == frame.collection_tag:
+                    return frame.index, frames[depth + 1].index
+                return frame.index, self._next_index
+            if frame.columns is not None:
+                # 終了時に自身の行を出力する
+                return frame.index, 0
+        return self._next_index, 0
+
+    def _release(self, watermark: RowKey) -> Iterator[Tuple[str, Dict]]:
+        """出力キーが watermark より小さい行を順に返す"""
+        rows = self._rows
+        runs = self._runs
+        row: Optional[Dict]
+        while True:
+            if runs and (not rows or runs[0][:2] < rows[0][:2]):
+                visit_index, order, count, run = runs[0]
+                if (visit_index, order) >= watermark:
+                    return
+                _, _, path, row = run.pop()
+                head = run.head
+                if head is None:
+                    heapq.heappop(runs)
+                else:
+                    heapq.heapreplace(runs, (head[0], head[1], count, run))
+            elif rows:
+                visit_index, order, candidate = rows[0]
+                if (visit_index, order) >= watermark or candidate.entity is not None:
+                    # 未確定の行、または抽出待ちの行より後の行は返さない
+                    return
+                heapq.heappop(rows)
+                path, row = candidate.path, candidate.row
+            else:
+                return
+
+            if row and not self._is_suppressed(visit_index):
+                yield path, row
+
+    def _is_suppressed(self, index: int) -> bool:
+        """通し番号が除外範囲に含まれるかどうか
+
+        行は出力キー順に返すため、通し番号は呼び出しごとに単調に増加する。
+        """
+        suppressed = self._suppressed
+        while suppressed and suppressed[0][0] <= index:
+            _, end = heapq.heappop(suppressed)
+            if end > self._suppressed_until:
+                self._suppressed_until = end
+        return index <= self._suppressed_until
+
+    def _spill(self) -> None:
+        """抽出済みの行を出力キー順に並べて一時ファイルに退避"""
+        spilled: List[Tuple[int, int, str, Dict]] = []
+        pending: List[Tuple[int, int, _RowCandidate]] = []
+        for visit_index, order, candidate in self._rows:
+            if candidate.entity is not None:
+                pending.append((visit_index, order, candidate))
+            elif candidate.row:
+                spilled.append((visit_index, order, candidate.path, candidate.row))
+
+        if spilled:
+            spilled.sort(key=_spilled_key)
+            self._add_run(_SpilledRun(spilled))
+        heapq.heapify(pending)
+        self._rows = pending
+        # 抽出待ちの行が多い場合は退避の頻度を下げる
+        self._spill_at = max(self._spill_threshold, 2 * len(pending))
+
+    def _add_run(self, run: _SpilledRun) -> None:
+        """退避ファイルを追加し、同じ段階のファイルが MERGE_FAN_IN 個に達した場合はマージ"""
+        levels = self._levels
+        while len(levels) <= run.level:
+            levels.append([])
+        group = [other for other in levels[run.level] if other.head is not None]
+        group.append(run)
+        if len(group) < MERGE_FAN_IN:
+            levels[run.level] = group
+            self._push_run(run)
+            return
+
+        # 未読の行をマージした1つのファイルに置き換える（マージ元のファイルは読み終えて閉じる）
+        levels[run.level] = []
+        merged = _SpilledRun(heapq.merge(*(other.rows() for other in group), key=_spilled_key), run.level + 1)
+        self._runs = [entry for entry in self._runs if entry[3].head is not None]
+        heapq.heapify(self._runs)
+        self._add_run(merged)
+
+    def _push_run(self, run: _SpilledRun) -> None:
+        """退避ファイルを先頭の行の出力キー順のヒープに追加"""
+        head = run.head
+        if head is not None:
+            heapq.heappush(self._runs, (head[0], head[1], self._run_count, run))
+            self._run_count += 1
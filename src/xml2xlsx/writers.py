@@ -0,0 +1,674 @@
+"""出力ファイルの書き込みを行うモジュール
+
+出力形式ごとの書き込みクラス（OutputWriter）は、シートごとに行を追加する書き込み先を作成する。
+書き込み先は最初に見出し行、続いてデータ行を append で受け取る（openpyxlのワークシートと同じ形式）。
+
+* xlsx: 1つのExcelファイルにシートを追加する。行数がExcelの上限を超えたシートは、
+  「シート名_2」「シート名_3」…のシートに続きを書き込む
+* csv: シートごとに「出力ファイル名_シート名.csv」を作成する
+* parquet / arrow: シートごとに「出力ファイル名_シート名.parquet」（Arrow IPC は .arrow）を作成する。
+  pyarrow が必要で、蓄積したカラムの値からデータフレームを作成せずに列データを作成する。
+  decimal 型のカラムの精度と小数点以下の桁数は値から決定する
+"""
+
+import csv
+import pickle
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Any, Callable, Collection, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+from openpyxl import Workbook
+from .column_types import convert_columns, to_values
+from .exceptions import ConfigurationError
+from .sheet import SheetBuffer
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# 型を宣言したカラムをまとめて変換する行数（パイプライン処理時）
+TYPED_BATCH_SIZE = 1000
+
+# 列形式の出力でまとめて書き込む行数（パイプライン処理時）
+RECORD_BATCH_SIZE = 10000
+
+# Excelのシートの最大行数（見出し行を含む）とシート名の最大文字数
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_SHEET_NAME = 31
+
+# 出力形式と拡張子
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet", "arrow")
+_FORMAT_SUFFIXES = {".xlsx": "xlsx", ".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+
+def detect_format(output_file: str, output_format: Optional[str] = None) -> str:
+    """出力形式を決定
+
+    Args:
+        output_file: 出力ファイルのパス
+        output_format: 出力形式（OUTPUT_FORMATS のいずれか）。省略時は拡張子から判定し、
+            判定できない場合は xlsx とする
+
+    Raises:
+        ValueError: 不明な出力形式が指定された場合
+    """
+    if output_format is None:
+        return _FORMAT_SUFFIXES.get(Path(output_file).suffix.lower(), "xlsx")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不明な出力形式です: {output_format}（{', '.join(OUTPUT_FORMATS)} のいずれかを指定してください）")
+    return output_format
+
+
+def format_suffix(output_format: str) -> str:
+    """出力形式の拡張子を取得"""
+    return f".{output_format}"
+
+
+def sheet_file_path(output_file: str, sheet_name: str, suffix: str) -> str:
+    """シートごとにファイルを作成する出力形式で、シートの出力ファイルのパスを取得
+
+    出力ファイルの拡張子が同じ出力形式のもの（.arrow に対する .feather など）の場合は除去する。
+    """
+    path = Path(output_file)
+    same_format = _FORMAT_SUFFIXES.get(path.suffix.lower()) == _FORMAT_SUFFIXES[suffix]
+    stem = path.stem if same_format else path.name
+    return str(path.with_name(f"{stem}_{sheet_name}{suffix}"))
+
+
+def rollover_sheet_name(sheet_name: str, part: int, used: Collection[str] = ()) -> str:
+    """行数の上限を超えたシートの続きを書き込むシートの名前を取得
+
+    「シート名_番号」とし、31文字を超える場合はシート名の末尾を切り詰める。
+    既存のシートと重複する場合は番号を進める。
+
+    Args:
+        sheet_name: 元のシート名
+        part: 続きのシートの番号（2以上）
+        used: 既存のシート名
+    """
+    while True:
+        suffix = f"_{part}"
+        name = f"{sheet_name[: EXCEL_MAX_SHEET_NAME - len(suffix)]}{suffix}"
+        if name not in used:
+            return name
+        part += 1
+
+
+def excel_sheet_parts(sheet_name: str, row_count: int, used: Collection[str] = ()) -> Iterator[Tuple[str, int, int]]:
+    """データ行をExcelの行数の上限ごとに分割したシートを取得
+
+    Args:
+        sheet_name: シート名
+        row_count: データ行の数
+        used: 既存のシート名
+
+    Yields:
+        (シート名, 開始行, 終了行)。開始行・終了行はデータ行の位置（終了行は含まない）
+    """
+    rows_per_sheet = EXCEL_MAX_ROWS - 1
+    names = set(used)
+    name = sheet_name
+    part = 1
+    start = 0
+    while True:
+        stop = min(start + rows_per_sheet, row_count)
+        yield name, start, stop
+        names.add(name)
+        if stop >= row_count:
+            return
+        part += 1
+        name = rollover_sheet_name(sheet_name, part, names)
+        start = stop
+
+
+class OutputWriter:
+    """出力形式ごとの書き込みの基底クラス"""
+
+    def __init__(self, output_file: str):
+        """
+        Args:
+            output_file: 出力ファイルのパス
+        """
+        self._output_file = output_file
+
+    def create_sheet(self, sheet_name: str, types: Optional[Dict[str, str]] = None) -> Any:
+        """シートの書き込み先を作成
+
+        Args:
+            sheet_name: シート名
+            types: カラム名と型の名前の辞書（列形式の出力でスキーマの決定に使用する）
+
+        Returns:
+            append で見出し行、続いてデータ行を受け取るオブジェクト
+        """
+        raise NotImplementedError
+
+    def write_sheet(self, sheet_name: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+        """シートを追加して見出し行とデータ行を書き込む
+
+        Args:
+            sheet_name: シート名
+            columns: 見出し行のカラム名
+            rows: カラムの順序に並んだ値のシーケンス。欠損値は None
+        """
+        sheet = self.create_sheet(sheet_name)
+        sheet.append(list(columns))
+        for row in rows:
+            sheet.append(row)
+
+    def write_buffer(
+        self, sheet_name: str, buffer: SheetBuffer, columns: Sequence[str], types: Optional[Dict[str, str]] = None
+    ) -> None:
+        """蓄積したシートの行データを書き込む
+
+        Args:
+            sheet_name: シート名
+            buffer: 行データを蓄積したシート
+            columns: 出力するカラム名
+            types: カラム名と型の名前の辞書（オプション）
+
+        Raises:
+            DataTypeError: 型に変換できない値が含まれる場合
+        """
+        self.write_sheet(sheet_name, columns, buffer.iter_rows(columns, types))
+
+    def save(self) -> None:
+        """出力ファイルを保存"""
+        raise NotImplementedError
+
+
+class WriteOnlyExcelWriter(OutputWriter):
+    """openpyxlの書き込み専用モードでExcelファイルを出力するクラス
+
+    セルオブジェクトをメモリ上に保持せず、追加した行を順次一時ファイルに書き出すため、
+    保存時のメモリ使用量が行数に依存しない。
+    """
+
+    def __init__(self, output_file: str, sheet_names: Collection[str] = ()):
+        """
+        Args:
+            output_file: 出力Excelファイルのパス
+            sheet_names: 後から追加する可能性があるシート名。続きのシートの名前はこれらと重複させない
+        """
+        super().__init__(output_file)
+        self._workbook = Workbook(write_only=True)
+        self._sheet_names = frozenset(sheet_names)
+
+    def create_sheet(self, sheet_name: str, types: Optional[Dict[str, str]] = None) -> "_ExcelSheet":
+        """ワークシートを追加"""
+        return _ExcelSheet(self._workbook, sheet_name, self._sheet_names)
+
+    def save(self) -> None:
+        """ワークブックを保存"""
+        self._workbook.save(self._output_file)
+
+
+class _ExcelSheet:
+    """行数がExcelの上限に達した場合に続きのシートへ切り替えるワークシート
+
+    続きのシートには見出し行を再度書き込む。行はワークシートに順次書き込むため、
+    上限を超えた行をメモリ上に保持しない。
+    """
+
+    __slots__ = ("_workbook", "_sheet_name", "_reserved", "_worksheet", "_header", "_row_count", "_part")
+
+    def __init__(self, workbook: Workbook, sheet_name: str, reserved: FrozenSet[str] = frozenset()):
+        """
+        Args:
+            workbook: 書き込み専用モードのワークブック
+            sheet_name: シート名
+            reserved: 続きのシートの名前として使用しないシート名（既存のシート以外）
+        """
+        self._workbook = workbook
+        self._sheet_name = sheet_name
+        self._reserved = reserved
+        self._worksheet = workbook.create_sheet(sheet_name)
+        self._header: Optional[List[Any]] = None
+        # 現在のワークシートの行数（見出し行を含む）
+        self._row_count = 0
+        self._part = 1
+
+    def append(self, values: Sequence[Any]) -> None:
+        if self._header is None:
+            self._header = list(values)
+        elif self._row_count >= EXCEL_MAX_ROWS:
+            self._rollover()
+        self._worksheet.append(values)
+        self._row_count += 1
+
+    def _rollover(self) -> None:
+        """続きのシートを作成して見出し行を書き込む"""
+        self._part += 1
+        name = rollover_sheet_name(self._sheet_name, self._part, self._reserved.union(self._workbook.sheetnames))
+        self._worksheet = self._workbook.create_sheet(name)
+        self._worksheet.append(self._header)
+        self._row_count = 1
+
+
+class _CsvSheet:
+    """1シートのCSVファイル"""
+
+    __slots__ = ("_file", "_writer")
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+
+    def append(self, values: Sequence[Any]) -> None:
+        self._writer.writerow(values)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CsvWriter(OutputWriter):
+    """シートごとにCSVファイルを出力するクラス（UTF-8、欠損値は空文字列）"""
+
+    def __init__(self, output_file: str):
+        super().__init__(output_file)
+        self._sheets: List[_CsvSheet] = []
+
+    def create_sheet(self, sheet_name: str, types: Optional[Dict[str, str]] = None) -> _CsvSheet:
+        """シートのCSVファイルを作成"""
+        sheet = _CsvSheet(sheet_file_path(self._output_file, sheet_name, ".csv"))
+        self._sheets.append(sheet)
+        return sheet
+
+    def save(self) -> None:
+        """すべてのCSVファイルを閉じる"""
+        for sheet in self._sheets:
+            sheet.close()
+        self._sheets = []
+
+
+# Arrow の decimal128 / decimal256 型の最大精度
+_DECIMAL128_MAX_PRECISION = 38
+_DECIMAL256_MAX_PRECISION = 76
+
+
+def _arrow_type(type_name: Optional[str]) -> Any:
+    """カラムの型の名前に対応する Arrow の型を取得（型の宣言がない場合は文字列）
+
+    decimal 型は値から精度を決定するため _decimal_type で取得する。
+    """
+    types = {
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "date": pyarrow.date32(),
+        "datetime": pyarrow.timestamp("us"),
+        "bool": pyarrow.bool_(),
+    }
+    return types.get(type_name, pyarrow.string()) if type_name is not None else pyarrow.string()
+
+
+def _decimal_digits(
+    values: Iterable[Optional[Decimal]], digits: Optional[Tuple[int, int]]
+) -> Optional[Tuple[int, int]]:
+    """decimal 型のカラムの整数部と小数部の最大桁数を値で更新
+
+    Args:
+        values: カラムの値（欠損値は None）
+        digits: これまでの (整数部の桁数, 小数部の桁数)
+
+    Returns:
+        更新後の (整数部の桁数, 小数部の桁数)。無限大・非数を含む場合は None
+    """
+    if digits is None:
+        return None
+    integer, scale = digits
+    for value in values:
+        if value is None:
+            continue
+        _, numerals, exponent = value.as_tuple()
+        if not isinstance(exponent, int):
+            # 無限大・非数
+            return None
+        integer = max(integer, len(numerals) + exponent)
+        scale = max(scale, -exponent)
+    return integer, scale
+
+
+def _decimal_type(digits: Optional[Tuple[int, int]]) -> Any:
+    """decimal 型のカラムの値が収まる Arrow の型を取得
+
+    decimal128 に収まらない場合は decimal256、それにも収まらない場合と
+    無限大・非数を含む場合は文字列とする。
+    """
+    if digits is None:
+        return pyarrow.string()
+    integer, scale = digits
+    precision = max(integer + scale, 1)
+    if precision <= _DECIMAL128_MAX_PRECISION:
+        return pyarrow.decimal128(precision, scale)
+    if precision <= _DECIMAL256_MAX_PRECISION:
+        return pyarrow.decimal256(precision, scale)
+    return pyarrow.string()
+
+
+class _ArrowSheet:
+    """1シートの Parquet / Arrow IPC ファイル
+
+    見出し行を受け取った時点でスキーマを確定し、データ行は一定の行数ごとに
+    レコードバッチとして書き込む。
+    decimal 型のカラムがある場合は、すべての値の桁数が分かるまでスキーマを確定できないため、
+    レコードバッチを一時ファイルに退避し、閉じる時点で書き込む。
+    """
+
+    __slots__ = ("_path", "_file_format", "_types", "_header", "_schema", "_writer", "_rows", "_spool", "_decimals")
+
+    def __init__(self, path: str, file_format: str, types: Dict[str, str]):
+        self._path = path
+        self._file_format = file_format
+        self._types = types
+        self._header: Optional[List[str]] = None
+        self._schema: Any = None
+        self._writer: Any = None
+        self._rows: List[Sequence[Any]] = []
+        self._spool: Optional[IO[bytes]] = None
+        # decimal 型のカラムの位置 → (整数部の桁数, 小数部の桁数)（文字列とする場合は None）
+        self._decimals: Dict[int, Optional[Tuple[int, int]]] = {}
+
+    def append(self, values: Sequence[Any]) -> None:
+        """見出し行、続いてデータ行を追加（型を宣言したカラムの値は変換済みのもの）"""
+        if self._header is None:
+            self._open(values)
+            return
+        self._rows.append(values)
+        if len(self._rows) >= RECORD_BATCH_SIZE:
+            self._flush()
+
+    def write_columns(self, columns: Sequence[Sequence[Any]]) -> None:
+        """カラムごとの値をまとめて書き込む（型を宣言したカラムの値は変換済みのもの）"""
+        self._flush()
+        if self._spool is None:
+            self._write_table(columns)
+            return
+        for index, digits in self._decimals.items():
+            self._decimals[index] = _decimal_digits(columns[index], digits)
+        pickle.dump(columns, self._spool, pickle.HIGHEST_PROTOCOL)
+
+    def close(self) -> None:
+        """残りのデータ行を書き込み、ファイルを閉じる"""
+        if self._header is None:
+            return
+        self._flush()
+        if self._spool is not None:
+            self._write_spooled(self._header, self._spool)
+            self._spool = None
+        self._writer.close()
+        self._writer = None
+        self._header = None
+
+    def _open(self, header: Sequence[str]) -> None:
+        """見出し行を確定し、decimal 型のカラムがなければファイルを作成"""
+        self._header = list(header)
+        self._decimals = {i: (0, 0) for i, name in enumerate(self._header) if self._types.get(name) == "decimal"}
+        if self._decimals:
+            self._spool = tempfile.TemporaryFile()
+            return
+        self._create(self._header, [_arrow_type(self._types.get(name)) for name in self._header])
+
+    def _create(self, header: Sequence[str], field_types: Sequence[Any]) -> None:
+        """スキーマを確定してファイルを作成"""
+        self._schema = pyarrow.schema(list(zip(header, field_types)))
+        if self._file_format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(self._path, self._schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(self._path, self._schema)
+
+    def _write_spooled(self, header: Sequence[str], spool: IO[bytes]) -> None:
+        """decimal 型のカラムの型を確定し、退避したレコードバッチを書き込んで一時ファイルを閉じる"""
+        field_types = [
+            _decimal_type(self._decimals[i]) if i in self._decimals else _arrow_type(self._types.get(name))
+            for i, name in enumerate(header)
+        ]
+        as_string = [i for i in self._decimals if field_types[i] == pyarrow.string()]
+        self._create(header, field_types)
+
+        spool.seek(0)
+        while True:
+            try:
+                columns = pickle.load(spool)
+            except EOFError:
+                break
+            for i in as_string:
+                columns[i] = [None if value is None else str(value) for value in columns[i]]
+            self._write_table(columns)
+        spool.close()
+
+    def _write_table(self, columns: Sequence[Sequence[Any]]) -> None:
+        """カラムごとの値をスキーマの型に変換して書き込む"""
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(columns, self._schema)]
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema))
+
+    def _flush(self) -> None:
+        """蓄積したデータ行をレコードバッチとして書き込む"""
+        if not self._rows:
+            return
+        columns = [list(values) for values in zip(*self._rows)]
+        self._rows = []
+        self.write_columns(columns)
+
+
+class ArrowWriter(OutputWriter):
+    """シートごとに Parquet または Arrow IPC ファイルを出力するクラス（pyarrow が必要）"""
+
+    def __init__(self, output_file: str, file_format: str = "parquet"):
+        """
+        Args:
+            output_file: 出力ファイルのパス
+            file_format: "parquet" または "arrow"（Arrow IPC ファイル形式）
+
+        Raises:
+            ConfigurationError: pyarrow がインストールされていない場合
+        """
+        if pyarrow is None:
+            raise ConfigurationError(
+                f"{file_format} 形式の出力には pyarrow が必要です（pip install xml2xlsx[arrow]）"
+            )
+        super().__init__(output_file)
+        self._file_format = file_format
+        self._sheets: List[_ArrowSheet] = []
+
+    def create_sheet(self, sheet_name: str, types: Optional[Dict[str, str]] = None) -> _ArrowSheet:
+        """シートのファイルを作成"""
+        path = sheet_file_path(self._output_file, sheet_name, format_suffix(self._file_format))
+        sheet = _ArrowSheet(path, self._file_format, types or {})
+        self._sheets.append(sheet)
+        return sheet
+
+    def write_buffer(
+        self, sheet_name: str, buffer: SheetBuffer, columns: Sequence[str], types: Optional[Dict[str, str]] = None
+    ) -> None:
+        """蓄積したカラムの値から行を経由せずに列データを作成して書き込む"""
+        types = types or {}
+        sheet = self.create_sheet(sheet_name, types)
+        sheet.append(list(columns))
+        sheet.write_columns(
+            [
+                (
+                    to_values(buffer.column_values(name), types[name], name)
+                    if name in types
+                    else buffer.column_values(name)
+                )
+                for name in columns
+            ]
+        )
+
+    def save(self) -> None:
+        """すべてのファイルを閉じる"""
+        for sheet in self._sheets:
+            sheet.close()
+        self._sheets = []
+
+
+def create_writer(output_file: str, output_format: str, sheet_names: Collection[str] = ()) -> OutputWriter:
+    """出力形式に対応する書き込みクラスを作成
+
+    Args:
+        output_file: 出力ファイルのパス
+        output_format: 出力形式（OUTPUT_FORMATS のいずれか）
+        sheet_names: 出力する可能性があるシート名（xlsx で続きのシートの名前と重複させないために使用する）
+
+    Raises:
+        ConfigurationError: 出力形式に必要なライブラリがインストールされていない場合
+    """
+    if output_format == "csv":
+        return CsvWriter(output_file)
+    if output_format in ("parquet", "arrow"):
+        return ArrowWriter(output_file, output_format)
+    return WriteOnlyExcelWriter(output_file, sheet_names)
+
+
+class _SpooledSheet:
+    """見出し行が確定するまで行データを一時ファイルに退避するシート
+
+    出力するカラムは設定の順序のうち値が出現したものに限られるため、
+    設定のカラムがすべて出現するまでは見出し行を確定できない。
+    確定前の行は一時ファイルに退避し、確定後の行は書き込み先に直接書き込む。
+    型を宣言したカラムがある場合は、一定の行数ごとにカラム単位でまとめて変換してから書き込む。
+    """
+
+    __slots__ = ("_worksheet", "_ordered_columns", "_types", "_remaining", "_seen", "_spool", "_header", "_batch")
+
+    def __init__(self, worksheet: Any, ordered_columns: Sequence[str], types: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            worksheet: シートの書き込み先（OutputWriter.create_sheet を参照）
+            ordered_columns: 設定のカラム順序。空の場合は出現順に出力する
+            types: カラム名と型の名前の辞書（オプション）
+        """
+        self._worksheet = worksheet
+        self._ordered_columns = list(ordered_columns)
+        self._types = types or {}
+        # 型の変換待ちの行データ（見出し行の順序）
+        self._batch: List[List[Any]] = []
+        self._remaining = set(self._ordered_columns)
+        # 出現順のカラム名と退避した行データ内の位置
+        self._seen: Dict[str, int] = {}
+        self._spool: Optional[IO[bytes]] = None
+        self._header: Optional[List[str]] = None
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """行データを追加
+
+        Args:
+            row: カラム名と値の辞書
+        """
+        if self._header is not None:
+            self._write_row([row.get(name) for name in self._header])
+            return
+
+        for name in row:
+            if name not in self._seen:
+                self._seen[name] = len(self._seen)
+                self._remaining.discard(name)
+
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile()
+        pickle.dump([row.get(name) for name in self._seen], self._spool, pickle.HIGHEST_PROTOCOL)
+
+        if self._ordered_columns and not self._remaining:
+            self._write_header(self._ordered_columns)
+
+    def close(self) -> None:
+        """見出し行を確定し、退避した行データと変換待ちの行データを書き込む"""
+        if self._header is None:
+            if self._ordered_columns:
+                self._write_header([name for name in self._ordered_columns if name in self._seen])
+            else:
+                self._write_header(list(self._seen))
+        self._flush()
+
+    def _write_row(self, values: List[Any]) -> None:
+        """見出し行の順序の行データを書き込む（型を宣言したカラムがある場合は変換待ちとする）"""
+        if not self._types:
+            self._worksheet.append(values)
+            return
+        self._batch.append(values)
+        if len(self._batch) >= TYPED_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        """変換待ちの行データの型を変換して書き込む"""
+        if not self._batch or self._header is None:
+            return
+        for values in convert_columns(self._header, self._batch, self._types):
+            self._worksheet.append(values)
+        self._batch = []
+
+    def _write_header(self, header: List[str]) -> None:
+        """見出し行と退避した行データを書き込む"""
+        self._header = header
+        if self._spool is None:
+            return
+        if not header:
+            # 出力するカラムがない場合は空のシートとする
+            self._spool.close()
+            self._spool = None
+            return
+
+        self._worksheet.append(header)
+
+        positions = [self._seen[name] for name in header]
+        self._spool.seek(0)
+        while True:
+            try:
+                values = pickle.load(self._spool)
+            except EOFError:
+                break
+            self._write_row([values[i] if i < len(values) else None for i in positions])
+        self._spool.close()
+        self._spool = None
+
+
+class StreamingWriter:
+    """行データを生成順にシートへ書き込む出力クラス
+
+    行ごとにシートを振り分け、出力形式の書き込み先へ順次書き込む。
+    見出し行が確定していないシートの行は一時ファイルに退避するため、
+    メモリ使用量は入力・出力の大きさに依存しない。
+    """
+
+    def __init__(
+        self,
+        writer: OutputWriter,
+        ordered_columns: Callable[[str], Sequence[str]],
+        column_types: Optional[Callable[[str], Dict[str, str]]] = None,
+    ):
+        """
+        Args:
+            writer: 出力形式の書き込みクラス
+            ordered_columns: シート名から設定のカラム順序を取得する関数
+            column_types: シート名からカラム名と型の名前の辞書を取得する関数（オプション）
+        """
+        self._writer = writer
+        self._ordered_columns = ordered_columns
+        self._column_types = column_types
+        self._sheets: Dict[str, _SpooledSheet] = {}
+
+    def __len__(self) -> int:
+        return len(self._sheets)
+
+    def append(self, sheet_name: str, row: Dict[str, Any]) -> None:
+        """行データをシートに追加
+
+        Args:
+            sheet_name: シート名。初めて出現したシートは末尾に追加する
+            row: カラム名と値の辞書
+        """
+        sheet = self._sheets.get(sheet_name)
+        if sheet is None:
+            types = self._column_types(sheet_name) if self._column_types else None
+            output = self._writer.create_sheet(sheet_name, types)
+            sheet = self._sheets[sheet_name] = _SpooledSheet(output, self._ordered_columns(sheet_name), types)
+        sheet.append(row)
+
+    def save(self) -> None:
+        """退避した行データを書き込み、出力ファイルを保存"""
+        for sheet in self._sheets.values():
+            sheet.close()
+        self._writer.save()
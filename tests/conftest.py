@@ -0,0 +1,12 @@
+"""テスト共通の設定"""
+
+
+def pytest_addoption(parser):
+    """ベンチマークの結果の保存とベースラインの更新のオプションを追加"""
+    group = parser.getgroup("xml2xlsx-benchmark", "xml2xlsx のベンチマーク")
+    group.addoption("--bench-json", metavar="PATH", help="ベンチマークの計測結果をJSONファイルに保存する")
+    group.addoption(
+        "--bench-update-baseline",
+        action="store_true",
+        help="ベンチマークの計測結果で tests/benchmarks/baseline.json を更新する（回帰の判定は行わない）",
+    )
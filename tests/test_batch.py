@@ -0,0 +1,62 @@
+"""一括変換のテスト"""
+
+import pytest
+from openpyxl import load_workbook
+from xml2xlsx.batch import ConversionResult, convert_files, expand_inputs, plan_outputs
+
+CONFIG = {"mapping": {"root.item": {"sheet_name": "商品", "columns": {"name": "商品名"}}}}
+
+
+def write_inputs(directory, names):
+    """入力XMLファイルを作成"""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = directory / name
+        path.write_text(f"<root><item><name>{path.stem}</name></item></root>", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def test_expand_inputs(tmp_path):
+    """ファイル、globパターン、ディレクトリ、入力リストを展開できることをテスト"""
+    a, b = write_inputs(tmp_path / "in", ["a.xml", "b.xml"])
+    (tmp_path / "in" / "note.txt").write_text("対象外")
+    (c,) = write_inputs(tmp_path / "other", ["c.xml"])
+    list_file = tmp_path / "list.txt"
+    list_file.write_text(f"# コメント\n{c}\n\n{a}\n", encoding="utf-8")
+
+    assert expand_inputs([str(tmp_path / "in")]) == [a, b]
+    assert expand_inputs([str(tmp_path / "*" / "*.xml")]) == [a, b, c]
+    assert expand_inputs([b], str(list_file)) == [b, c, a]
+    assert expand_inputs([str(tmp_path / "none*.xml")]) == [str(tmp_path / "none*.xml")]
+
+
+def test_plan_outputs(tmp_path):
+    """出力ファイルパスの決定をテスト"""
+    assert plan_outputs(["in/a.xml"], "out.xlsx") == [("in/a.xml", "out.xlsx")]
+    assert plan_outputs(["in/a.xml", "in/b.xml"], "out") == [
+        ("in/a.xml", "out/a.xlsx"),
+        ("in/b.xml", "out/b.xlsx"),
+    ]
+    assert plan_outputs(["in/a.xml"], str(tmp_path)) == [("in/a.xml", str(tmp_path / "a.xlsx"))]
+    with pytest.raises(ValueError, match="重複"):
+        plan_outputs(["x/a.xml", "y/a.xml"], "out")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_convert_files(tmp_path, jobs):
+    """一部のファイルが失敗しても他のファイルを変換し、結果を順に返すことをテスト"""
+    inputs = write_inputs(tmp_path / "in", ["a.xml", "b.xml", "c.xml"])
+    (tmp_path / "in" / "b.xml").write_text("<root><item>", encoding="utf-8")
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    tasks = plan_outputs(inputs, str(output_dir))
+
+    results = list(convert_files(tasks, CONFIG, jobs=jobs, streaming=True))
+
+    assert [result.input_file for result in results] == inputs
+    assert [result.succeeded for result in results] == [True, False, True]
+    assert isinstance(results[1], ConversionResult) and results[1].error
+    assert load_workbook(output_dir / "c.xlsx")["商品"]["A2"].value == "c"
+    assert not (output_dir / "b.xlsx").exists()
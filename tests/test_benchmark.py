@@ -0,0 +1,262 @@
+"""変換と設定生成のベンチマーク
+
+レコード数を変えて計測した処理時間から、両対数での回帰直線の傾き（計算量の次数の推定値）を求める。
+線形の処理であれば傾きは 1 前後となり、処理が二乗に比例するようになると 2 に近づく。
+あわせてスループット（レコード/秒、MB/秒）と、tracemalloc で計測したピークメモリの
+1レコードあたりの量を記録する。
+
+起動時間のケースは、設定生成で作成したXMLパスの数（最大 5,000）の設定ファイルの読み込みを計測する
+（レコード数をXMLパスの数、入力サイズを設定ファイルのサイズとする）。
+
+tests/benchmarks/baseline.json の実行中の Python のバージョンのベースラインと比較し、次の場合に失敗とする
+（ピークメモリは Python のバージョンによって異なるため、ベースラインはバージョンごとに記録する）。
+
+* 傾きがベースライン（1 未満の場合は 1）より SLOPE_TOLERANCE 以上大きい
+* 1レコードあたりのピークメモリがベースラインの MEMORY_TOLERANCE 倍を超える
+
+スループットは実行環境に依存するため記録のみ行う。
+
+slow マーカーを付けているため、既定の実行では除外される。
+
+* ``pytest -m slow tests/test_benchmark.py --bench-json results.json``: 計測結果を保存
+* ``pytest -m slow tests/test_benchmark.py --bench-update-baseline``: 実行中のバージョンのベースラインを更新
+"""
+
+import gc
+import json
+import logging
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+import pytest
+from xml2xlsx.config_generator import generate_config
+from xml2xlsx.converter import XmlToExcelConverter
+
+test_logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).parent / "benchmarks" / "baseline.json"
+
+# ベースラインを記録する Python のバージョン
+PYTHON_VERSION = f"{sys.version_info[0]}.{sys.version_info[1]}"
+
+# 傾きの許容される増加量と、1レコードあたりのピークメモリの許容される倍率
+SLOPE_TOLERANCE = 0.3
+MEMORY_TOLERANCE = 1.5
+
+# 計測するレコード数と、各レコード数での計測回数（最小値を採用する）
+RECORD_COUNTS = [1000, 2000, 4000, 8000]
+REPEAT = 3
+
+# 起動時間のケースで計測するXMLパスの数
+STARTUP_PATH_COUNTS = [625, 1250, 2500, 5000]
+
+
+class BenchmarkCase(NamedTuple):
+    """ベンチマークの条件"""
+
+    name: str
+    depth: int = 0  # ルートとレコードの間の階層の深さ
+    fan_out: int = 4  # レコードごとの子要素（兄弟要素）の数
+    mappings: int = 1  # マッピング設定の数（行を出力しない設定を含む）
+    options: Dict = {"output_format": "csv"}  # XmlToExcelConverter のオプション
+    generate: bool = False  # 変換ではなく設定生成を計測する
+    startup: bool = False  # 設定生成で作成した設定ファイルの読み込みを計測する
+
+
+CASES = [
+    BenchmarkCase("convert_flat"),
+    BenchmarkCase("convert_deep", depth=6),
+    BenchmarkCase("convert_fan_out", fan_out=16),
+    BenchmarkCase("convert_mappings", mappings=200),
+    BenchmarkCase("convert_xlsx", options={}),
+    BenchmarkCase("convert_streaming", options={"streaming": True, "pipeline": True, "output_format": "csv"}),
+    BenchmarkCase("generate_flat", generate=True),
+    BenchmarkCase("generate_deep", depth=6, fan_out=16, generate=True),
+    BenchmarkCase("startup_load_config", fan_out=8, startup=True),
+]
+
+# テストの実行中に計測した結果（ベースラインの更新と保存に使用する）
+_results: Dict[str, Dict] = {}
+
+
+def create_xml(path: Path, record_count: int, depth: int, fan_out: int) -> None:
+    """ルートから depth 階層下に、fan_out 個の子要素を持つレコードが並ぶXMLファイルを生成"""
+    # 設定生成ではパスがシート名となるため、31文字に収まるよう短いタグとする
+    opening = "".join(f"<l{level}>" for level in range(depth))
+    closing = "".join(f"</l{level}>" for level in reversed(range(depth)))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<r v="root">{opening}<rs>')
+        for i in range(record_count):
+            fields = "".join(f"<f{j}>V{i}-{j}</f{j}>" for j in range(fan_out))
+            f.write(f"<rec id='{i}'>{fields}</rec>\n")
+        f.write(f"</rs>{closing}</r>")
+
+
+def create_paths_xml(path: Path, path_count: int, attribute_count: int) -> None:
+    """ルートの下に異なるタグの要素が path_count 個並ぶXMLファイルを生成（設定生成でXMLパスごとの設定となる）"""
+    attributes = " ".join(f'a{j}="{j}"' for j in range(attribute_count))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<r>')
+        for i in range(path_count):
+            f.write(f"<p{i} {attributes}/>\n")
+        f.write("</r>")
+
+
+def create_config(fan_out: int, mapping_count: int) -> Dict:
+    """レコードのマッピング設定に、一致しない設定を加えて mapping_count 個とした設定を作成"""
+    columns = {"@id": "ID", "r.@v": "ルート"}
+    columns.update((f"f{j}", f"項目{j}") for j in range(fan_out))
+    mapping = {"rs.rec": {"sheet_name": "records", "columns": columns}}
+    for i in range(mapping_count - len(mapping)):
+        mapping[f"unused{i}.entry{i}"] = {"sheet_name": f"unused{i}", "columns": {"@id": "ID"}}
+    return {"mapping": mapping}
+
+
+def fit_slope(sizes: List[int], seconds: List[float]) -> float:
+    """両対数での最小二乗法による回帰直線の傾きを計算"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return numerator / denominator
+
+
+def measure(run: Callable[[], None]) -> float:
+    """REPEAT 回実行した処理時間の最小値を計測(秒)
+
+    計測前から存在するオブジェクト（他のテストが残したものを含む）は GC の走査対象から外し、
+    処理中の GC の時間がテストの実行順に依存しないようにする。
+    """
+    best = math.inf
+    for _ in range(REPEAT):
+        gc.collect()
+        gc.freeze()
+        try:
+            start_time = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start_time)
+        finally:
+            gc.unfreeze()
+    return best
+
+
+def peak_memory(run: Callable[[], None]) -> int:
+    """tracemalloc で処理中のピークメモリを計測(バイト)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def input_path(case: BenchmarkCase, tmp_path: Path, record_count: int) -> Path:
+    """レコード数に対応する入力ファイルのパスを取得（起動時間のケースは設定ファイル）"""
+    if case.startup:
+        return tmp_path / f"config_{record_count}.toml"
+    return tmp_path / f"data_{record_count}.xml"
+
+
+def runner(case: BenchmarkCase, tmp_path: Path, record_count: int) -> Callable[[], None]:
+    """レコード数に対応する入力ファイルを生成し、計測する処理を作成"""
+    if case.startup:
+        xml_path = tmp_path / f"paths_{record_count}.xml"
+        config_path = input_path(case, tmp_path, record_count)
+        create_paths_xml(xml_path, record_count, case.fan_out)
+        generate_config([str(xml_path)], str(config_path))
+        return lambda: XmlToExcelConverter().load_config(str(config_path))
+
+    xml_path = input_path(case, tmp_path, record_count)
+    create_xml(xml_path, record_count, case.depth, case.fan_out)
+
+    if case.generate:
+        config_path = tmp_path / "config.toml"
+        return lambda: generate_config([str(xml_path)], str(config_path))
+
+    converter = XmlToExcelConverter(**case.options)
+    converter.config = create_config(case.fan_out, case.mappings)
+    output_path = tmp_path / "output"
+    return lambda: converter.convert(str(xml_path), str(output_path))
+
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report(request):
+    """すべてのケースの計測後に結果を保存し、指定された場合はベースラインを更新"""
+    yield
+    if not _results:
+        return
+    json_path = request.config.getoption("--bench-json")
+    if json_path:
+        Path(json_path).write_text(json.dumps(_results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if request.config.getoption("--bench-update-baseline"):
+        baselines = load_baselines()
+        baselines[PYTHON_VERSION] = {
+            name: {"slope": result["slope"], "memory_per_record": result["memory_per_record"]}
+            for name, result in _results.items()
+        }
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(baselines, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def load_baselines() -> Dict[str, Dict]:
+    """Python のバージョン → ケース名 → ベースラインの対応表を読み込む"""
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_benchmark(case, tmp_path, request):
+    """処理時間の増加の次数と1レコードあたりのピークメモリがベースラインから悪化していないことを確認"""
+    record_counts = STARTUP_PATH_COUNTS if case.startup else RECORD_COUNTS
+    runners = [runner(case, tmp_path, record_count) for record_count in record_counts]
+    seconds = [measure(run) for run in runners]
+
+    largest = record_counts[-1]
+    input_size = input_path(case, tmp_path, largest).stat().st_size
+    memory = peak_memory(runner(case, tmp_path, largest))
+    result = {
+        "slope": round(fit_slope(record_counts, seconds), 3),
+        "memory_per_record": round(memory / largest, 1),
+        "records_per_second": round(largest / seconds[-1], 1),
+        "mb_per_second": round(input_size / seconds[-1] / (1024 * 1024), 3),
+        "peak_memory": memory,
+        "seconds": dict(zip(map(str, record_counts), (round(value, 5) for value in seconds))),
+    }
+    _results[case.name] = result
+    test_logger.info(f"{case.name}: {result}")
+
+    if request.config.getoption("--bench-update-baseline"):
+        return
+    baseline = load_baselines().get(PYTHON_VERSION, {}).get(case.name)
+    if baseline is None:
+        pytest.skip(f"Python {PYTHON_VERSION} のベースラインがありません: {case.name}（--bench-update-baseline で作成）")
+
+    slope_limit = max(baseline["slope"], 1.0) + SLOPE_TOLERANCE
+    if result["slope"] > slope_limit:
+        # 他の処理の負荷による一時的な遅延と区別するため、もう一度計測して各レコード数の最小値で判定する
+        seconds = [min(value, measure(run)) for value, run in zip(seconds, runners)]
+        result["slope"] = round(fit_slope(record_counts, seconds), 3)
+        result["seconds"] = dict(zip(map(str, record_counts), (round(value, 5) for value in seconds)))
+    assert result["slope"] <= slope_limit, (
+        f"処理時間の増加の次数が悪化しています: {baseline['slope']} → {result['slope']}（{result['seconds']}）"
+    )
+    memory_limit = baseline["memory_per_record"] * MEMORY_TOLERANCE
+    assert result["memory_per_record"] <= memory_limit, (
+        f"1レコードあたりのピークメモリが増加しています: "
+        f"{baseline['memory_per_record']} → {result['memory_per_record']} バイト"
+    )
+
+
+def test_fit_slope():
+    """傾きの計算が計算量の次数を推定できることを確認"""
+    sizes = [100, 200, 400, 800]
+    assert fit_slope(sizes, [size * 1e-6 for size in sizes]) == pytest.approx(1.0)
+    assert fit_slope(sizes, [size**2 * 1e-9 for size in sizes]) == pytest.approx(2.0)
@@ -1,7 +1,9 @@
 """CLIモジュールのテスト"""
 
+import json
 from textwrap import dedent
 import pytest
+from openpyxl import load_workbook
 from xml2xlsx.cli import main
 from xml2xlsx import __version__
 
@@ -126,6 +128,164 @@ def test_convert_xml_to_excel(tmp_path, capsys):
     assert "変換が完了しました" in captured.err
 
 
+def test_convert_streaming(tmp_path, capsys):
+    """ストリーミング処理での変換テスト"""
+    xml_path = tmp_path / "test.xml"
+    config_path = tmp_path / "config.toml"
+    output_path = tmp_path / "output.xlsx"
+
+    xml_path.write_text("<root><item><name>商品A</name></item></root>")
+    config_path.write_text(
+        dedent(
+            """
+            [mapping."root.item"]
+            sheet_name = "商品"
+
+            [mapping."root.item".columns]
+            name = "商品名"
+        """
+        )
+    )
+
+    result = main(["convert", "-i", str(xml_path), "-c", str(config_path), "-o", str(output_path), "--streaming"])
+    assert result == 0
+    assert output_path.exists()
+    captured = capsys.readouterr()
+    assert "変換が完了しました" in captured.err
+
+    write_only_path = tmp_path / "write_only.xlsx"
+    args = ["convert", "-i", str(xml_path), "-c", str(config_path), "-o", str(write_only_path)]
+    result = main(args + ["--streaming", "--write-only"])
+    assert result == 0
+    assert load_workbook(write_only_path)["商品"]["A2"].value == "商品A"
+
+    pipeline_path = tmp_path / "pipeline.xlsx"
+    args = ["convert", "-i", str(xml_path), "-c", str(config_path), "-o", str(pipeline_path)]
+    result = main(args + ["--streaming", "--pipeline"])
+    assert result == 0
+    assert load_workbook(pipeline_path)["商品"]["A2"].value == "商品A"
+
+    for parser in ("stdlib", "lxml"):
+        parser_path = tmp_path / f"{parser}.xlsx"
+        args = ["convert", "-i", str(xml_path), "-c", str(config_path), "-o", str(parser_path)]
+        result = main(args + ["--parser", parser])
+        assert result == 0
+        assert load_workbook(parser_path)["商品"]["A2"].value == "商品A"
+
+
+def test_convert_multiple_inputs(tmp_path, capsys):
+    """複数ファイルの並列変換と結果の集計をテスト"""
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    for name in ["a", "b", "c"]:
+        (input_dir / f"{name}.xml").write_text(f"<root><item><name>{name}</name></item></root>")
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(
+        dedent(
+            """
+            [mapping."root.item"]
+            sheet_name = "商品"
+
+            [mapping."root.item".columns]
+            name = "商品名"
+        """
+        )
+    )
+    output_dir = tmp_path / "out"
+
+    args = ["convert", "-i", str(input_dir / "*.xml"), "-c", str(config_path), "-o", str(output_dir)]
+    result = main(args + ["--jobs", "2"])
+    assert result == 0
+    assert sorted(path.name for path in output_dir.iterdir()) == ["a.xlsx", "b.xlsx", "c.xlsx"]
+    assert load_workbook(output_dir / "b.xlsx")["商品"]["A2"].value == "b"
+    captured = capsys.readouterr()
+    assert "変換が完了しました（3件）" in captured.err
+
+    # --format を指定した場合はその拡張子で出力し、シートごとにファイルを作成する
+    csv_dir = tmp_path / "csv"
+    args = ["convert", "-i", str(input_dir / "*.xml"), "-c", str(config_path), "-o", str(csv_dir)]
+    assert main(args + ["--format", "csv"]) == 0
+    assert sorted(path.name for path in csv_dir.iterdir()) == ["a_商品.csv", "b_商品.csv", "c_商品.csv"]
+    assert (csv_dir / "b_商品.csv").read_text(encoding="utf-8").splitlines() == ["商品名", "b"]
+    capsys.readouterr()
+
+    # 失敗したファイルがあっても他のファイルは変換し、終了コードで失敗を通知する
+    (input_dir / "b.xml").write_text("<root><item>")
+    list_file = tmp_path / "inputs.txt"
+    list_file.write_text("\n".join(str(input_dir / f"{name}.xml") for name in ["a", "b", "c"]))
+    args = ["convert", "--input-list", str(list_file), "-c", str(config_path), "-o", str(output_dir)]
+    result = main(args + ["-j", "2"])
+    assert result == 1
+    captured = capsys.readouterr()
+    assert f"エラー: {input_dir / 'b.xml'}" in captured.err
+    assert f"変換しました: {input_dir / 'c.xml'}" in captured.err
+    assert "3件中1件の変換に失敗しました" in captured.err
+
+
+def test_convert_stats(tmp_path, capsys):
+    """統計情報の表示とJSONファイルへの保存をテスト"""
+    for name in ["a", "b"]:
+        xml_content = f"<root><item><name>{name}</name></item><item><name>x</name></item></root>"
+        (tmp_path / f"{name}.xml").write_text(xml_content)
+    config_path = tmp_path / "config.toml"
+    config_path.write_text('[mapping."root.item"]\nsheet_name = "商品"\ncolumns = { name = "商品名" }\n')
+    stats_path = tmp_path / "stats.json"
+
+    args = ["convert", "-i", str(tmp_path / "*.xml"), "-c", str(config_path), "-o", str(tmp_path / "out")]
+    result = main(args + ["--jobs", "2", "--stats", "--stats-json", str(stats_path)])
+    assert result == 0
+    captured = capsys.readouterr()
+    assert f"統計情報: {tmp_path / 'a.xml'}" in captured.err
+    assert "行数: 商品 2" in captured.err
+
+    records = json.loads(stats_path.read_text(encoding="utf-8"))
+    assert [record["input_file"] for record in records] == [str(tmp_path / "a.xml"), str(tmp_path / "b.xml")]
+    assert records[1]["stats"]["rows"] == {"商品": 2}
+    assert records[1]["stats"]["stages"]["parse"]["calls"] == 1
+
+
+def test_generate_multiple_inputs(tmp_path, capsys):
+    """複数ファイルからの並列な設定生成をテスト"""
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    (input_dir / "a.xml").write_text("<root><item><id>1</id></item></root>")
+    (input_dir / "b.xml").write_text("<root><item><name>B</name></item></root>")
+    config_path = tmp_path / "config.toml"
+
+    result = main(["generate", "-i", str(input_dir), "-o", str(config_path), "--jobs", "2"])
+    assert result == 0
+    content = config_path.read_text()
+    assert "id" in content
+    assert "name" in content
+    captured = capsys.readouterr()
+    assert "設定ファイルを生成しました" in captured.err
+
+    result = main(["generate", "-i", str(input_dir / "a.xml"), str(tmp_path / "none.xml"), "-o", str(config_path)])
+    assert result == 1
+    captured = capsys.readouterr()
+    assert "入力ファイルが見つかりません" in captured.err
+
+
+def test_generate_with_sampling(tmp_path, capsys):
+    """サンプリングによる設定生成と解析範囲の報告をテスト"""
+    xml_path = tmp_path / "data.xml"
+    xml_path.write_text("<root>" + "".join(f"<item><id>{i}</id></item>" for i in range(5000)) + "</root>")
+    config_path = tmp_path / "config.toml"
+
+    args = ["generate", "-i", str(xml_path), "-o", str(config_path)]
+    result = main(args + ["--stop-after", "50", "--sample-bytes", "1M"])
+    assert result == 0
+    assert "root.item" in config_path.read_text()
+    captured = capsys.readouterr()
+    assert f"{xml_path}: " in captured.err
+    assert "（早期終了）" in captured.err
+
+    result = main(["generate", "-i", str(xml_path), "-o", str(config_path), "--sample-ratio", "1.5"])
+    assert result == 1
+    captured = capsys.readouterr()
+    assert "sample_ratio" in captured.err
+
+
 def test_convert_with_invalid_xml(tmp_path, capsys):
     """不正なXMLファイルの処理テスト"""
     invalid_xml = tmp_path / "invalid.xml"
@@ -0,0 +1,149 @@
+"""カラムの型変換のテスト"""
+
+import datetime
+from decimal import Decimal
+from textwrap import dedent
+import pytest
+import pandas as pd
+from openpyxl import load_workbook
+from xml2xlsx.column_types import to_series, to_values
+from xml2xlsx.converter import XmlToExcelConverter, ConfigurationError
+from xml2xlsx.exceptions import DataTypeError
+
+XML_CONTENT = """
+    <root>
+        <item id="1">
+            <price>1200.5</price>
+            <amount>10.10</amount>
+            <released>2024-02-01</released>
+            <updated>2024-02-01T09:30:00</updated>
+            <active>true</active>
+            <note>A</note>
+        </item>
+        <item id="2">
+            <price>980</price>
+            <active>No</active>
+            <note>B</note>
+        </item>
+    </root>
+"""
+
+CONFIG = {
+    "mapping": {
+        "root.item": {
+            "sheet_name": "items",
+            "columns": {
+                "@id": "ID",
+                "price": "価格",
+                "amount": "金額",
+                "released": "発売日",
+                "updated": "更新日時",
+                "active": "有効",
+                "note": "備考",
+            },
+            "types": {
+                "ID": "int",
+                "価格": "float",
+                "金額": "decimal",
+                "発売日": "date",
+                "更新日時": "datetime",
+                "有効": "bool",
+            },
+        }
+    }
+}
+
+
+def test_to_series_dtypes():
+    """型ごとに対応する dtype に変換されることをテスト"""
+    assert str(to_series(["1", " 2 ", None, ""], "int").dtype) == "Int64"
+    assert to_series(["1.5", None], "float").dtype == "float64"
+    assert to_series(["1.10", None], "decimal").tolist()[0] == Decimal("1.10")
+    assert str(to_series(["2024-01-02", None], "date").dtype).startswith("datetime64")
+    assert str(to_series(["TRUE", "0", "off", None], "bool").dtype) == "boolean"
+
+    assert to_values(["1", None], "int") == [1, None]
+    assert to_values(["2024-01-02T10:00:00", None], "date") == [datetime.date(2024, 1, 2), None]
+    assert to_values(["yes", "false"], "bool") == [True, False]
+
+
+def test_to_series_mixed_timezones():
+    """オフセットが値によって異なる日時を値ごとの現地時刻に変換することをテスト"""
+    values = ["2024-03-10T01:30:00-05:00", "2024-03-10T03:30:00-04:00", "2024-03-10T05:00:00Z", "2024-03-10T06:00:00"]
+    expected = [
+        datetime.datetime(2024, 3, 10, 1, 30),
+        datetime.datetime(2024, 3, 10, 3, 30),
+        datetime.datetime(2024, 3, 10, 5, 0),
+        datetime.datetime(2024, 3, 10, 6, 0),
+    ]
+    series = to_series(values + [None], "datetime")
+    assert str(series.dtype).startswith("datetime64")
+    assert to_values(values + [None], "datetime") == expected + [None]
+    assert to_values(values, "date") == [datetime.date(2024, 3, 10)] * 4
+
+    with pytest.raises(DataTypeError):
+        to_series(["2024-03-10T01:30:00-05:00", "2024-03-10T03:30:00-04:00", "昨日"], "datetime")
+
+
+@pytest.mark.parametrize(
+    "type_name, value",
+    [("int", "1.5"), ("int", "abc"), ("float", "x"), ("decimal", "1,000"), ("date", "昨日"), ("bool", "maybe")],
+)
+def test_invalid_values(type_name, value):
+    """変換できない値の場合にカラム名を含むエラーとなることをテスト"""
+    with pytest.raises(DataTypeError, match="カラム '価格'"):
+        to_series(["1", value], type_name, "価格")
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"write_only": True}, {"streaming": True, "pipeline": True}],
+)
+def test_typed_columns_written_as_excel_types(tmp_path, options):
+    """型を宣言したカラムがExcelに数値・日付・真偽値として書き込まれることをテスト"""
+    xml_path = tmp_path / "test.xml"
+    output_path = tmp_path / "output.xlsx"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+
+    converter = XmlToExcelConverter(**options)
+    converter.config = CONFIG
+    converter.convert(str(xml_path), str(output_path))
+
+    rows = list(load_workbook(output_path)["items"].values)
+    assert rows[0] == ("ID", "価格", "金額", "発売日", "更新日時", "有効", "備考")
+    assert rows[1] == (
+        1,
+        1200.5,
+        pytest.approx(10.1),
+        datetime.datetime(2024, 2, 1),
+        datetime.datetime(2024, 2, 1, 9, 30),
+        True,
+        "A",
+    )
+    assert rows[2] == (2, 980, None, None, None, False, "B")
+
+
+def test_typed_data_frames(tmp_path):
+    """データフレームのカラムが宣言した型の dtype になることをテスト"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+
+    converter = XmlToExcelConverter()
+    converter.config = CONFIG
+    converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+
+    df = converter.data_frames["items"]
+    assert str(df["ID"].dtype) == "Int64"
+    assert df["価格"].dtype == "float64"
+    assert str(df["発売日"].dtype).startswith("datetime64")
+    assert str(df["有効"].dtype) == "boolean"
+    assert df["備考"].tolist() == ["A", "B"]
+    pd.testing.assert_series_equal(df["金額"], pd.Series([Decimal("10.10"), None], name="金額"), check_dtype=False)
+
+
+def test_invalid_type_config(tmp_path):
+    """不明な型を設定した場合のエラーをテスト"""
+    config_path = tmp_path / "config.toml"
+    config_path.write_text('[mapping."root.item"]\ncolumns = { "@id" = "ID" }\ntypes = { ID = "integer" }\n')
+    with pytest.raises(ConfigurationError, match="カラム 'ID' の型が不明です"):
+        XmlToExcelConverter(str(config_path))
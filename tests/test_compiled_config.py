@@ -0,0 +1,120 @@
+"""構築済みの設定とそのキャッシュのテスト"""
+
+import logging
+import pickle
+import xml.etree.ElementTree as ET
+from textwrap import dedent
+import pytest
+import xml2xlsx
+from openpyxl import load_workbook
+from xml2xlsx.cli import main
+from xml2xlsx.compiled_config import CACHE_DIR_ENV, ConfigCache, compile_config
+from xml2xlsx.config import loads_config
+from xml2xlsx.converter import XmlToExcelConverter
+from xml2xlsx.entity import Entity
+from xml2xlsx.extractors import ancestor_table
+
+CONFIG_CONTENT = dedent(
+    """
+    [mapping."root.item"]
+    sheet_name = "商品"
+    columns = { "@id" = "ID", name = "名前", "root.@shop" = "店舗" }
+    types = { ID = "int" }
+
+    [mapping."extra.item"]
+    sheet_name = "商品"
+    columns = { price = "価格" }
+    types = { "価格" = "float" }
+"""
+)
+
+XML_CONTENT = '<root shop="S1"><item id="1"><name>A</name></item><item id="2"><name>B</name></item></root>'
+
+
+def convert(tmp_path, config_path, name, **options):
+    """設定ファイルを読み込んで変換し、出力したシートの値を取得"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(XML_CONTENT)
+    converter = XmlToExcelConverter(**options)
+    converter.load_config(str(config_path))
+    converter.convert(str(xml_path), str(tmp_path / f"{name}.xlsx"))
+    return list(load_workbook(tmp_path / f"{name}.xlsx")["商品"].values)
+
+
+def test_compile_config_sheets():
+    """シートごとのカラムの順序と型が設定の定義順にまとめられることをテスト"""
+    compiled = compile_config(loads_config(CONFIG_CONTENT))
+    assert compiled.sheet_columns == {"商品": ["ID", "名前", "店舗"], "item": ["ID", "名前", "店舗"]}
+    assert compiled.sheet_types["商品"] == {"ID": "int", "価格": "float"}
+    assert compiled.mapping_index.lookup("root.item")[0] == "root.item"
+
+
+def test_compiled_config_pickle():
+    """pickle で復元した設定の抽出関数が同じ値を抽出することをテスト"""
+    compiled = pickle.loads(pickle.dumps(compile_config(loads_config(CONFIG_CONTENT))))
+
+    root = ET.fromstring(XML_CONTENT)
+    item = Entity(root[0], "root.item", Entity(root, "root"))
+    ancestors = ancestor_table(item)
+    values = {target: extract(item, ancestors) for target, extract in compiled.columns["root.item"].extractors}
+    assert values == {"ID": "1", "名前": "A", "店舗": "S1"}
+    assert compiled.row_tags("item") and not compiled.row_tags("name")
+    assert compiled.context_tags("root")
+
+
+def test_config_cache(tmp_path, monkeypatch):
+    """2回目以降はTOMLを解析せずにキャッシュから読み込み、内容を変更すると作り直すことをテスト"""
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(CONFIG_CONTENT, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    expected = convert(tmp_path, config_path, "first", config_cache=str(cache_dir))
+    assert expected[1] == (1, "A", "S1")
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
+
+    # キャッシュがある場合は TOML を解析しない（環境変数での指定）
+    monkeypatch.setenv(CACHE_DIR_ENV, str(cache_dir))
+    monkeypatch.setattr("xml2xlsx.converter.loads_config", lambda *args: pytest.fail("TOMLを解析しました"))
+    assert convert(tmp_path, config_path, "cached") == expected
+    monkeypatch.undo()
+
+    # 内容を変更すると別のキャッシュとなる
+    config_path.write_text(CONFIG_CONTENT.replace('"名前"', '"商品名"'), encoding="utf-8")
+    assert convert(tmp_path, config_path, "changed", config_cache=str(cache_dir))[0] == ("ID", "商品名", "店舗")
+    assert len(list(cache_dir.glob("*.pickle"))) == 2
+
+    # ライブラリのバージョンが変わるとキャッシュのキーが変わる
+    data = config_path.read_bytes()
+    path = ConfigCache(str(cache_dir)).path(data)
+    monkeypatch.setattr(xml2xlsx, "__version__", "0.0.0-test")
+    assert ConfigCache(str(cache_dir)).path(data) != path
+
+
+def test_broken_config_cache(tmp_path, caplog):
+    """壊れたキャッシュは警告を出力して作り直すことをテスト"""
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(CONFIG_CONTENT, encoding="utf-8")
+    cache = ConfigCache(str(tmp_path / "cache"))
+    cache.directory.mkdir()
+    cache.path(config_path.read_bytes()).write_bytes(b"broken")
+
+    with caplog.at_level(logging.WARNING):
+        rows = convert(tmp_path, config_path, "output", config_cache=str(cache.directory))
+    assert rows[1] == (1, "A", "S1")
+    assert "設定のキャッシュを読み込めません" in caplog.text
+    assert cache.get(config_path.read_bytes()) is not None
+
+
+def test_cli_config_cache(tmp_path):
+    """--config-cache で構築済みの設定をキャッシュすることをテスト"""
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(CONFIG_CONTENT, encoding="utf-8")
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(XML_CONTENT)
+    cache_dir = tmp_path / "cache"
+
+    for name in ("first", "second"):
+        args = ["convert", "-i", str(xml_path), "-c", str(config_path), "-o", str(tmp_path / f"{name}.xlsx")]
+        assert main(args + ["--config-cache", str(cache_dir)]) == 0
+        assert load_workbook(tmp_path / f"{name}.xlsx")["商品"]["B3"].value == "B"
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
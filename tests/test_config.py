@@ -0,0 +1,34 @@
+"""設定ファイルの読み書きのテスト"""
+
+import pytest
+from xml2xlsx.config import dump_config, dumps_config, load_config, loads_config
+
+
+def test_dump_config_roundtrip(tmp_path):
+    """書き込んだ設定ファイルを読み込むと同じ設定となることをテスト"""
+    config = {
+        "mapping": {
+            "root.item": {
+                "sheet_name": "商品",
+                "columns": {"@id": "ID", "name": "名前", 'a"b\\c': "制御\t文字\x01\x7f\n"},
+                "types": {"ID": "int"},
+            },
+            "empty": {},
+        },
+        "options": {"chunk_size": 1000, "streaming": True, "ratio": 0.5, "limit": float("inf"), "tags": ["a", 1]},
+    }
+    config_path = tmp_path / "config.toml"
+    with open(config_path, "w", encoding="utf-8") as f:
+        dump_config(config, f)
+    assert load_config(str(config_path)) == config
+
+    content = config_path.read_text(encoding="utf-8")
+    assert content.startswith('[mapping."root.item"]\nsheet_name = "商品"\n\n[mapping."root.item".columns]\n')
+    assert "[mapping.empty]\n" in content
+    assert loads_config(content) == config
+
+
+def test_dumps_config_unsupported_value():
+    """TOMLで表現できない値は TypeError となることをテスト"""
+    with pytest.raises(TypeError):
+        dumps_config({"options": {"value": None}})
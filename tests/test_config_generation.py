@@ -1,10 +1,12 @@
 """設定ファイル生成機能のテスト"""
 
 import tempfile
+import tracemalloc
 import warnings
 from pathlib import Path
 import pytest
-from xml2xlsx.config_generator import generate_config
+from xml2xlsx.config import load_config
+from xml2xlsx.config_generator import SamplingOptions, _analyze_xml_structure, _scan_xml_structure, generate_config
 
 
 def test_generate_config_basic():
@@ -181,3 +183,121 @@ def test_generate_config_long_sheet_name():
         with pytest.raises(ValueError) as exc_info:
             generate_config(input_files=[str(xml_path)], output_file=str(config_path))
         assert "シート名が長すぎます" in str(exc_info.value)
+
+
+def test_generate_config_parallel():
+    """並列に解析した結果が順に解析した結果と一致することをテスト"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_files = []
+        for i in range(4):
+            xml_path = Path(tmpdir) / f"test{i}.xml"
+            xml_path.write_text(f'<root><item id="{i}"><field{i}>値</field{i}></item><extra{i} /></root>')
+            input_files.append(str(xml_path))
+
+        sequential_path = Path(tmpdir) / "sequential.toml"
+        parallel_path = Path(tmpdir) / "parallel.toml"
+        generate_config(input_files=input_files, output_file=str(sequential_path))
+        generate_config(input_files=input_files, output_file=str(parallel_path), jobs=2)
+
+        assert parallel_path.read_text() == sequential_path.read_text()
+        config = load_config(str(parallel_path))
+        paths = list(config["mapping"])
+        assert paths[:5] == ["root", "root.item", "root.item.field0", "root.extra0", "root.item.field1"]
+        assert list(config["mapping"]["root.item"]["columns"]) == ["@id", "field0", "field1", "field2", "field3"]
+
+
+def test_analyze_xml_structure_memory():
+    """構造解析のメモリ使用量がファイルサイズに依存しないことをテスト"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        def peak_memory(record_count: int) -> int:
+            xml_path = Path(tmpdir) / f"data_{record_count}.xml"
+            with open(xml_path, "w", encoding="utf-8") as f:
+                f.write("<root>")
+                for i in range(record_count):
+                    f.write(f"<record id='{i}'><name>Name {i}</name><value>{i}</value></record>")
+                f.write("</root>")
+
+            tracemalloc.start()
+            try:
+                entities = _analyze_xml_structure(str(xml_path))
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                assert entities["root.record"] == {"attributes": {"id"}, "elements": {"name", "value"}}
+
+        small = peak_memory(1000)
+        large = peak_memory(20000)
+        assert large < small * 2, f"メモリ使用量が増加しています: {small} → {large} bytes"
+
+
+def write_records(path: Path, record_count: int, late_field_at: int = -1) -> None:
+    """同じ構造のレコードが続き、指定した位置のレコードだけ追加の要素を持つXMLを作成"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<root>")
+        for i in range(record_count):
+            extra = "<late>x</late>" if i == late_field_at else ""
+            f.write(f"<record id='{i}'><name>Name {i}</name>{extra}</record>")
+        f.write("</root>")
+
+
+def test_sampling_max_per_path():
+    """パスごとの上限を超えた要素を解析しないことをテスト"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        xml_path = Path(tmpdir) / "data.xml"
+        write_records(xml_path, 100, late_field_at=50)
+
+        entities, report = _scan_xml_structure(str(xml_path), SamplingOptions(max_per_path=10))
+        assert entities["root.record"]["elements"] == {"name"}
+        assert report.elements_analyzed == 1 + 10 + 10
+        assert report.elements_scanned == 1 + 100 * 2 + 1
+        assert not report.stopped_early
+
+        entities = _analyze_xml_structure(str(xml_path))
+        assert entities["root.record"]["elements"] == {"name", "late"}
+
+
+def test_sampling_ratio():
+    """繰り返し出現する兄弟要素を割合に応じて解析することをテスト"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        xml_path = Path(tmpdir) / "data.xml"
+        write_records(xml_path, 100, late_field_at=30)
+
+        entities, report = _scan_xml_structure(str(xml_path), SamplingOptions(sample_ratio=0.1))
+        # 0, 10, 20, ... 番目のレコードを解析する
+        assert report.elements_analyzed == 1 + 10 * 2 + 1
+        assert entities["root.record"]["elements"] == {"name", "late"}
+
+
+def test_sampling_stop_after():
+    """新しい構造が見つからない要素が続いたら解析を終了することをテスト"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        xml_path = Path(tmpdir) / "data.xml"
+        write_records(xml_path, 20000)
+
+        entities, report = _scan_xml_structure(str(xml_path), SamplingOptions(stop_after=100))
+        assert entities["root.record"] == {"attributes": {"id"}, "elements": {"name"}}
+        assert report.stopped_early
+        assert report.elements_analyzed < 200
+        assert report.bytes_scanned < report.file_size
+
+
+def test_sampling_max_bytes():
+    """読み込むバイト数の上限で解析を終了することをテスト"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        xml_path = Path(tmpdir) / "data.xml"
+        write_records(xml_path, 20000)
+        config_path = Path(tmpdir) / "config.toml"
+
+        reports = generate_config(
+            input_files=[str(xml_path)], output_file=str(config_path), sampling=SamplingOptions(max_bytes=64 * 1024)
+        )
+        (report,) = reports
+        assert report.stopped_early
+        assert 64 * 1024 <= report.bytes_scanned < report.file_size / 2
+        assert "root.record" in load_config(str(config_path))["mapping"]
+
+        with pytest.raises(ValueError):
+            generate_config(
+                input_files=[str(xml_path)], output_file=str(config_path), sampling=SamplingOptions(sample_ratio=0)
+            )
@@ -223,3 +223,132 @@ def test_custom_sheet_names(tmp_path):
 
     with pd.ExcelFile(output_path) as excel:
         assert "カスタムシート" in excel.sheet_names
+
+
+def test_collection_children_subtree_not_traversed(tmp_path):
+    """コレクションの子要素の部分木は走査せず、他の子要素は走査することをテスト"""
+    xml_content = dedent(
+        """
+        <root>
+            <items>
+                <item><name>A</name><part><name>A1</name></part></item>
+                <item><name>B</name><part><name>B1</name></part></item>
+                <note><part><name>N1</name></part></note>
+            </items>
+        </root>
+    """
+    ).lstrip()
+
+    xml_path = tmp_path / "test.xml"
+    output_path = tmp_path / "output.xlsx"
+    xml_path.write_text(xml_content)
+
+    converter = XmlToExcelConverter()
+    converter.config = {
+        "mapping": {
+            "root.items.item": {"sheet_name": "item", "columns": {"name": "名前"}},
+            "part": {"sheet_name": "part", "columns": {"name": "名前"}},
+        }
+    }
+    converter.convert(str(xml_path), str(output_path))
+
+    result = pd.read_excel(output_path, sheet_name=None, dtype=str)
+    assert result["item"]["名前"].tolist() == ["A", "B"]
+    # コレクションの子要素（item）配下の part は出力されない
+    assert result["part"]["名前"].tolist() == ["N1"]
+
+
+def test_unmapped_subtrees_skipped(tmp_path):
+    """行を出力しない部分木を読み飛ばし、その要素数を統計情報に記録することをテスト"""
+    xml_content = dedent(
+        """
+        <root>
+            <meta><audit><by>A</by><by>B</by></audit></meta>
+            <catalog id="C1">
+                <group><entry><sku>X1</sku></entry><entry><sku>X2</sku></entry></group>
+                <group><note>N</note></group>
+            </catalog>
+        </root>
+    """
+    ).lstrip()
+
+    xml_path = tmp_path / "test.xml"
+    output_path = tmp_path / "output.xlsx"
+    xml_path.write_text(xml_content)
+
+    converter = XmlToExcelConverter()
+    converter.config = {
+        "mapping": {"entry": {"sheet_name": "entries", "columns": {"sku": "SKU", "catalog.@id": "カタログ"}}}
+    }
+    converter.convert(str(xml_path), str(output_path))
+
+    result = pd.read_excel(output_path, sheet_name="entries", dtype=str)
+    assert result["SKU"].tolist() == ["X1", "X2"]
+    assert result["カタログ"].tolist() == ["C1", "C1"]
+    # meta の部分木（4要素）、2つ目の group の部分木（2要素）、行の要素の子要素（sku）
+    assert converter.stats.elements_skipped == 8
+
+
+def test_skippable_subtrees_single_pass(tmp_path):
+    """読み飛ばす部分木の判定が階層の深さによらず各要素を一度だけ確認することをテスト"""
+    depth = 300
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(
+        "<root>" + "<wrap><note>N</note>" * depth + "<entry><sku>X</sku></entry>" + "</wrap>" * depth + "</root>"
+    )
+
+    converter = XmlToExcelConverter()
+    converter.config = {"mapping": {"entry": {"sheet_name": "entries", "columns": {"sku": "SKU"}}}}
+    row_tags = converter._row_tags
+    checked = []
+
+    def counting_row_tags(tag):
+        checked.append(tag)
+        return row_tags(tag)
+
+    converter._row_tags = counting_row_tags
+    converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+
+    result = pd.read_excel(tmp_path / "output.xlsx", sheet_name="entries", dtype=str)
+    assert result["SKU"].tolist() == ["X"]
+    # 各階層の note と、行の要素の子要素（sku）
+    assert converter.stats.elements_skipped == depth + 1
+    # 要素数（ルート、wrap と note、entry と sku）以下の確認で済む
+    assert len(checked) <= 2 * depth + 3
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"streaming": True}, {"streaming": True, "pipeline": True}, {"output_format": "csv"}],
+)
+def test_collect_stats(tmp_path, options):
+    """統計情報の集計を有効にした場合に処理段階ごとの時間と件数を集計することをテスト"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(
+        "<root><meta><by>A</by></meta><items>"
+        + "".join(f"<item id='{i}'><name>N{i}</name></item>" for i in range(3))
+        + "</items></root>"
+    )
+
+    converter = XmlToExcelConverter(collect_stats=True, **options)
+    converter.config = {"mapping": {"root.items.item": {"sheet_name": "items", "columns": {"name": "名前"}}}}
+    converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+
+    stats = converter.stats.as_dict()
+    assert stats["rows"] == {"items": 3}
+    # meta の部分木（2要素）と行の要素の子要素（name）はどの処理方法でも読み飛ばした要素として数える
+    skipped = 5
+    assert stats["elements_skipped"] == skipped
+    assert stats["elements_visited"] == stats["entities_created"] + skipped
+    assert stats["stages"]["extract"]["calls"] == 3
+    assert stats["mapping_cache_misses"] >= 1
+    assert stats["mapping_cache_hits"] + stats["mapping_cache_misses"] == stats["stages"]["lookup"]["calls"]
+    assert "write" in stats["stages"]
+    # 処理段階の時間は入れ子の段階を含まないため、合計は全体の時間と一致する
+    assert sum(stage["wall"] for stage in stats["stages"].values()) == pytest.approx(stats["wall"])
+
+    # 無効の場合は計測しない
+    converter.collect_stats = False
+    converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+    assert converter.stats.stages == {}
+    assert converter.stats.elements_skipped == skipped
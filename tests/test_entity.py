@@ -271,3 +271,83 @@ def test_deep_hierarchy_collection(context: EntityContext):
     assert "name" in task.get_columns()
     assert task.get_value("id") == "1"
     assert task.get_value("name") == "Task 1"
+
+
+def test_inherited_values_resolved_from_ancestors():
+    """親・祖父母の値を複製せずに参照できることをテスト"""
+    xml = dedent(
+        """
+        <organization name="Org1">
+            <code>O1</code>
+            <department name="Dev1">
+                <employee name="Emp1"/>
+            </department>
+        </organization>
+    """
+    )
+    context = EntityContext()
+    org = context.process_xml_element(ET.fromstring(xml))
+    dept = context.process_xml_element(org.element.find("department"), "organization", org)
+    emp = context.process_xml_element(dept.element.find("employee"), "organization.department", dept)
+
+    assert emp.get_value("department.@name") == "Dev1"
+    assert emp.get_value("department.organization.@name") == "Org1"
+    assert emp.get_value("department.organization.code") == "O1"
+    assert emp.get_value("department.unknown") is None
+
+    columns = emp.get_columns()
+    assert "@name" in columns
+    assert "department.@name" in columns
+    assert "department.organization.code" in columns
+    assert "department.organization.department.@name" in columns
+
+
+def test_entity_compact_representation():
+    """エンティティが __dict__ を持たず、属性キーを共有することをテスト"""
+    xml = dedent(
+        """
+        <items>
+            <item id="1"><name lang="ja">A</name></item>
+            <item id="2"><name lang="ja">B</name></item>
+        </items>
+    """
+    )
+    context = EntityContext()
+    items = context.process_xml_element(ET.fromstring(xml))
+    first, second = (context.process_xml_element(child, "items", items) for child in items.element)
+
+    assert not hasattr(first, "__dict__")
+    assert first.get_columns() == ["@id", "items.item.@id", "name", "name.@lang"]
+    keys = {key: key for key in first._values}
+    for key in second._values:
+        if key.startswith("@") or ".@" in key:
+            assert keys[key] is key
+
+
+def test_collection_detection_first_repeated_tag(context: EntityContext):
+    """最初に出現したタグを優先してコレクションと判定することをテスト"""
+    xml = dedent(
+        """
+        <data>
+            <header>Header</header>
+            <item><name>1</name></item>
+            <item><name>2</name></item>
+            <header>Header 2</header>
+        </data>
+    """
+    )
+    element = ET.fromstring(xml)
+    assert context.is_collection_element(element) == (True, "header")
+    # 繰り返し判定しても同じ結果
+    assert context.is_collection_element(element) == (True, "header")
+
+
+def test_entity_ignores_comments_and_processing_instructions():
+    """コメントや処理命令を含むツリーでそれらを値としないことをテスト"""
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True, insert_pis=True))
+    element = ET.fromstring("<item><!-- メモ --><?app data?><id>1</id></item>", parser=parser)
+    assert len(element) == 3
+
+    entity = EntityContext().process_xml_element(element)
+    assert entity.get_columns() == ["id"]
+    assert entity.get_value("id") == "1"
@@ -0,0 +1,101 @@
+"""カラムの抽出関数のテスト"""
+
+import xml.etree.ElementTree as ET
+from xml2xlsx.converter import XmlToExcelConverter
+from xml2xlsx.entity import Entity
+from xml2xlsx.extractors import AncestorReference, ancestor_table, compile_columns
+
+
+def build_entities(xml_content: str, tag: str) -> Entity:
+    """ルートから指定したタグの要素までのエンティティを作成"""
+    element = ET.fromstring(xml_content)
+    entity = Entity(element, element.tag)
+    while element.tag != tag:
+        element = next(child for child in element if child.tag == tag or child.find(f".//{tag}") is not None)
+        entity = Entity(element, f"{entity.path}.{element.tag}", entity)
+    return entity
+
+
+XML_CONTENT = """
+<orders>
+    <order id="1">
+        <customer type="vip">山田</customer>
+        <lines>
+            <line no="10">
+                <product code="P1">商品A</product>
+                <line>注記</line>
+            </line>
+        </lines>
+    </order>
+</orders>
+"""
+
+
+def test_compile_columns_kinds():
+    """自身の値と祖先要素の参照をそれぞれ抽出できることをテスト"""
+    entity = build_entities(XML_CONTENT, "line")
+    columns = compile_columns(
+        {
+            "@no": "行番号",
+            "product": "商品",
+            "line": "注記",
+            "order.@id": "注文番号",
+            "order.customer": "顧客",
+            "order.customer.@type": "顧客区分",
+            "order.unknown": "不明",
+            "product.@code": "商品コード",
+        }
+    )
+
+    ancestors = ancestor_table(entity)
+    values = {target: extract(entity, ancestors) for target, extract in columns.extractors}
+    assert list(values) == ["行番号", "商品", "注記", "注文番号", "顧客", "顧客区分", "不明", "商品コード"]
+    assert values["行番号"] == "10"
+    assert values["商品"] == "商品A"
+    assert values["注記"] == "注記"
+    assert values["注文番号"] == "1"
+    assert values["顧客"] == "山田"
+    assert values["顧客区分"] == "vip"
+    assert values["不明"] is None
+    # ドットを含む参照は常に祖先要素を参照する
+    assert values["商品コード"] is None
+
+    assert columns.ancestors == (
+        AncestorReference("order", "@id"),
+        AncestorReference("order", "customer"),
+        AncestorReference("order", "customer.@type"),
+        AncestorReference("order", "unknown"),
+        AncestorReference("product", "@code"),
+    )
+    # 属性のみを参照する祖先要素は抽出を遅延しない
+    assert AncestorReference("order", "@id") not in columns.deferred
+    assert AncestorReference("order", "customer.@type") in columns.deferred
+
+
+def test_ancestor_table_uses_nearest_ancestor():
+    """祖先の対応表が同じタグの最も近い祖先要素を指すことをテスト"""
+    entity = build_entities("<a><b id='outer'><b id='inner'><c/></b></b></a>", "c")
+    table = ancestor_table(entity)
+    assert set(table) == {"a", "b"}
+    assert table["b"].get_value("@id") == "inner"
+
+    columns = compile_columns({"b.@id": "ID"})
+    (_, extract), = columns.extractors
+    assert extract(entity, table) == "inner"
+    # 対応表にない祖先は参照できない
+    assert extract(entity, {}) is None
+
+
+def test_converter_compiles_columns_on_config():
+    """設定時にマッピングごとの抽出関数が構築されることをテスト"""
+    converter = XmlToExcelConverter()
+    converter.config = {
+        "mapping": {
+            "orders.order.lines.line": {"columns": {"@no": "行番号", "order.@id": "注文番号"}},
+            "orders.order": {"sheet_name": "注文"},
+        }
+    }
+    entity = build_entities(XML_CONTENT, "line")
+
+    assert converter._extract_data(entity) == {"行番号": "10", "注文番号": "1"}
+    assert converter._extract_data(entity.parent.parent) is None
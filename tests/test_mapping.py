@@ -4,6 +4,7 @@ from textwrap import dedent
 import pytest
 import pandas as pd
 from xml2xlsx.converter import XmlToExcelConverter
+from xml2xlsx.mapping import MappingIndex, TagFilter
 
 
 def test_basic_column_mapping(tmp_path):
@@ -266,3 +267,56 @@ def test_custom_sheet_names(tmp_path):
         assert list(df.columns) == ["商品コード", "商品名"]
         assert df.iloc[0]["商品コード"] == "001"
         assert df.iloc[0]["商品名"] == "Item 1"
+
+
+def test_mapping_index_lookup():
+    """マッピング設定の検索が完全一致・定義順の末尾一致に従うことをテスト"""
+    mapping = {
+        "item": {"sheet_name": "short"},
+        "root.items.item": {"sheet_name": "full"},
+        "items.item": {"sheet_name": "partial"},
+    }
+    index = MappingIndex(mapping)
+
+    # 完全一致が優先される
+    assert index.lookup("root.items.item") == ("root.items.item", mapping["root.items.item"])
+    # 末尾一致は定義順で最初のもの
+    assert index.lookup("data.items.item") == ("item", mapping["item"])
+    # 末尾一致は文字単位で判定される
+    assert index.lookup("root.subitem") == ("item", mapping["item"])
+    assert index.lookup("root.items") == (None, None)
+    # キャッシュされた結果も同じ
+    assert index.lookup("root.subitem") == ("item", mapping["item"])
+
+
+def test_mapping_index_matches_linear_scan():
+    """インデックスの検索結果が設定の線形走査と一致することをテスト"""
+    mapping = {path: {"sheet_name": str(i)} for i, path in enumerate(["b.c", "a.b.c", "c", "x.a", "a", "bc"])}
+    index = MappingIndex(mapping)
+
+    def linear_scan(path):
+        if path in mapping:
+            return path, mapping[path]
+        for config_path, config in mapping.items():
+            if path.endswith(config_path):
+                return config_path, config
+        return None, None
+
+    for path in ["a", "a.b.c", "x.a.b.c", "abc", "b.c.a", "x.a", "y.x.a", "d", "b", "ab.c", "bbc"]:
+        assert index.lookup(path) == linear_scan(path), path
+
+
+def test_tag_filter_matches_mapping_paths():
+    """タグのフィルタが設定パスに一致しうる要素のタグをすべて含むことをテスト"""
+    config_paths = ["b.c", "a.b.c", "x.a", "bc", "a"]
+    mapping = {path: {} for path in config_paths}
+    index = MappingIndex(mapping)
+    tag_filter = TagFilter.for_paths(config_paths)
+
+    for parent in ["", "a.", "b.", "x.", "a.b."]:
+        for tag in ["a", "b", "c", "bc", "abc", "xa", "d", "a.b", "d.c", "cb"]:
+            if index.lookup(parent + tag) != (None, None):
+                assert tag_filter(tag), parent + tag
+    assert not tag_filter("d")
+    assert not tag_filter("cb")
+    assert tag_filter.union({"d"})("d")
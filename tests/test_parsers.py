@@ -0,0 +1,114 @@
+"""パーサーバックエンドのテスト"""
+
+import io
+import xml.etree.ElementTree as ET
+from textwrap import dedent
+import pytest
+import pandas as pd
+from xml2xlsx import parsers
+from xml2xlsx.converter import XmlToExcelConverter, ConfigurationError
+from xml2xlsx.parsers import iterparse, parse, resolve_backend
+
+XML_CONTENT = dedent(
+    """
+    <?xml version="1.0" encoding="UTF-8"?>
+    <root>
+        <!-- コメント -->
+        <?pi data?>
+        <item id="1">
+            <name><![CDATA[A & <B>]]></name>
+            <note>  </note>
+        </item>
+        <item id="2"><name>C</name></item>
+    </root>
+"""
+).lstrip()
+
+
+def element_summary(element) -> tuple:
+    """要素のタグ・属性・テキスト・子要素を比較用に要約"""
+    text = element.text.strip() if element.text and element.text.strip() else None
+    children = tuple(element_summary(child) for child in element if isinstance(child.tag, str))
+    return element.tag, dict(element.attrib), text, children
+
+
+def test_resolve_backend():
+    """バックエンドの決定とフォールバックをテスト"""
+    assert resolve_backend("stdlib") == "stdlib"
+    assert resolve_backend() == "stdlib"
+    assert resolve_backend("lxml") == ("lxml" if parsers.lxml_available() else "stdlib")
+
+    for backend in ("unknown", "auto"):
+        with pytest.raises(ValueError, match="不明なパーサーです"):
+            resolve_backend(backend)
+
+
+def test_lxml_falls_back_when_unavailable(monkeypatch):
+    """lxml が利用できない場合に標準ライブラリにフォールバックすることをテスト"""
+    monkeypatch.setattr(parsers, "lxml_etree", None)
+    assert resolve_backend("lxml") == "stdlib"
+    root = parse(io.BytesIO(XML_CONTENT.encode("utf-8")), "lxml")
+    assert root.find("item/name").text == "A & <B>"
+
+
+def test_parse_error_type():
+    """解析エラーが ET.ParseError として送出されることをテスト"""
+    with pytest.raises(ET.ParseError):
+        parse(io.BytesIO(b"<root><item></root>"), "stdlib")
+    with pytest.raises(ET.ParseError):
+        list(iterparse(io.BytesIO(b"<root><item></root>"), backend="stdlib"))
+
+
+def test_backends_produce_same_structure():
+    """lxml と標準ライブラリで同じ要素の構造が得られることをテスト"""
+    pytest.importorskip("lxml")
+    data = XML_CONTENT.encode("utf-8")
+    assert element_summary(parse(io.BytesIO(data), "lxml")) == element_summary(parse(io.BytesIO(data), "stdlib"))
+
+    def end_events(backend):
+        return [
+            (element.tag, dict(element.attrib), (element.text or "").strip())
+            for _, element in iterparse(io.BytesIO(data), backend=backend)
+        ]
+
+    assert end_events("lxml") == end_events("stdlib")
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_converter_parser_option(tmp_path, streaming):
+    """設定ファイルと引数でパーサーを指定できることをテスト"""
+    xml_path = tmp_path / "test.xml"
+    config_path = tmp_path / "config.toml"
+    output_path = tmp_path / "output.xlsx"
+    xml_path.write_text(XML_CONTENT, encoding="utf-8")
+    config_path.write_text(
+        dedent(
+            """
+            [options]
+            parser = "stdlib"
+
+            [mapping."root.item"]
+            sheet_name = "item"
+
+            [mapping."root.item".columns]
+            "@id" = "ID"
+            name = "名前"
+        """
+        ),
+        encoding="utf-8",
+    )
+
+    for parser in (None, "stdlib", "lxml"):
+        converter = XmlToExcelConverter(str(config_path), streaming=streaming, parser=parser)
+        converter.convert(str(xml_path), str(output_path))
+        df = pd.read_excel(output_path, sheet_name="item", dtype=str)
+        assert df["ID"].tolist() == ["1", "2"]
+        assert df["名前"].tolist() == ["A & <B>", "C"]
+
+
+def test_invalid_parser_option(tmp_path):
+    """不明なパーサーを設定した場合のエラーをテスト"""
+    config_path = tmp_path / "config.toml"
+    config_path.write_text('[options]\nparser = "sax"\n\n[mapping."root.item"]\nsheet_name = "item"\n')
+    with pytest.raises(ConfigurationError, match="不明なパーサーです"):
+        XmlToExcelConverter(str(config_path))
@@ -1,183 +1,107 @@
 """パフォーマンステスト"""
 
-import gc
 import time
 import logging
-import psutil
 import pytest
+import xml.etree.ElementTree as ET
 from pathlib import Path
 from textwrap import dedent
+from test_benchmark import SLOPE_TOLERANCE, fit_slope, measure
 from xml2xlsx.converter import XmlToExcelConverter
+from xml2xlsx.entity import ChildTagCounter, Entity, EntityContext
+from xml2xlsx.sheet import SheetBuffer
 
 test_logger = logging.getLogger(__name__)
 
 
-def create_test_xml(path: Path, record_count: int) -> None:
-    """テスト用のXMLファイルを生成"""
-    xml_content = ['<?xml version="1.0" encoding="UTF-8"?>', "<root>", "<records>"]
-    for i in range(record_count):
-        xml_content.extend(
-            [
-                f"<record id='{i}'>",
-                f"<name>Name {i}</name>",
-                f"<value>{i * 100}</value>",
-                f"<description>Description for record {i}</description>",
-                "</record>",
-            ]
-        )
-    xml_content.extend(["</records>", "</root>"])
+def create_deep_xml(path: Path, depth: int) -> None:
+    """テスト用の深い階層のXMLファイルを生成"""
+    xml_content = ['<?xml version="1.0" encoding="UTF-8"?>']
+    for level in range(depth):
+        xml_content.extend([f"<level{level} id='{level}'>", f"<name>Level {level}</name>"])
+    xml_content.extend(f"</level{level}>" for level in reversed(range(depth)))
     path.write_text("\n".join(xml_content))
 
 
-def create_test_config(path: Path) -> None:
-    """テスト用の設定ファイルを生成"""
-    config_content = dedent(
-        """
-        [mapping."root.records.record"]
-        sheet_name = "records"
-
-        [mapping."root.records.record".columns]
-        "@id" = "ID"
-        "name" = "名前"
-        "value" = "値"
-        "description" = "説明"
-    """
-    )
-    path.write_text(config_content)
-
-
-def measure_memory() -> float:
-    """メモリ使用量を計測(MB単位)"""
-    gc.collect()  # 明示的なGC実行
-    time.sleep(0.1)  # GC完了を待機
-    process = psutil.Process()
-    return process.memory_info().rss / (1024 * 1024)
-
-
-def test_basic_performance(tmp_path):
-    """基本的なパフォーマンステスト"""
-    # テストファイルの作成
-    xml_path = tmp_path / "data.xml"
-    config_path = tmp_path / "config.toml"
-    output_path = tmp_path / "output.xlsx"
+def fill_sheet_buffer(record_count: int) -> None:
+    """シートに行を追加してデータフレームを作成"""
+    sheet = SheetBuffer()
+    for i in range(record_count):
+        sheet.append({"ID": str(i), "名前": f"Name {i}", "値": str(i * 100), "説明": f"Description for record {i}"})
+    sheet.to_dataframe()
 
-    record_count = 1000
-    create_test_xml(xml_path, record_count)
-    create_test_config(config_path)
 
-    # 性能計測
-    initial_memory = measure_memory()
-    start_time = time.time()
+@pytest.mark.slow
+def test_sheet_buffer_linear_scaling_1m():
+    """100万行までシートデータの蓄積が行数に対して線形であることを確認
 
-    # 変換実行
-    converter = XmlToExcelConverter()
-    converter.load_config(str(config_path))
-    converter.convert(str(xml_path), str(output_path))
-
-    # 結果の検証
-    execution_time = time.time() - start_time
-    peak_memory = measure_memory()
-    memory_increase = peak_memory - initial_memory
+    処理時間の比ではなく、両対数での回帰直線の傾き（計算量の次数の推定値）で判定する。
+    """
+    record_counts = [1000, 10000, 100000, 1000000]
+    seconds = [measure(lambda count=count: fill_sheet_buffer(count)) for count in record_counts]
+    for count, value in zip(record_counts, seconds):
+        test_logger.info(f"{count}行: {value / count * 1e6:.2f}µs/行")
 
-    assert execution_time < 10.0, f"実行時間が長すぎます: {execution_time:.2f}秒"
-    assert memory_increase < 200.0, f"メモリ使用量が多すぎます: {memory_increase:.2f}MB"
-    assert output_path.exists()
+    slope = fit_slope(record_counts, seconds)
+    assert slope <= 1.0 + SLOPE_TOLERANCE, f"処理時間の増加の次数が線形を超えています: {slope:.3f}（{seconds}）"
 
 
-def test_large_file_performance(tmp_path):
-    """大規模ファイルのパフォーマンステスト"""
-    # テストファイルの作成
-    xml_path = tmp_path / "large_data.xml"
+def test_deep_hierarchy_entity_creation(tmp_path, monkeypatch):
+    """深い階層でも各要素のエンティティが一度だけ作成されることを確認"""
+    depth = 50
+    xml_path = tmp_path / "deep.xml"
     config_path = tmp_path / "config.toml"
     output_path = tmp_path / "output.xlsx"
+    create_deep_xml(xml_path, depth)
+    config_path.write_text(
+        dedent(
+            f"""
+            [mapping."level{depth - 1}"]
+            sheet_name = "deep"
+
+            [mapping."level{depth - 1}".columns]
+            "@id" = "ID"
+            "name" = "名前"
+            "level0.@id" = "ルートID"
+        """
+        )
+    )
+
+    created = []
+    original_init = Entity.__init__
 
-    # レコード数を2000に削減（開発時の迅速なフィードバックのため）
-    record_count = 2000
-    create_test_xml(xml_path, record_count)
-    create_test_config(config_path)
+    def counting_init(self, element, *args, **kwargs):
+        created.append(element)
+        original_init(self, element, *args, **kwargs)
 
-    # メモリ使用量の監視
-    initial_memory = measure_memory()
-    start_time = time.time()
+    monkeypatch.setattr(Entity, "__init__", counting_init)
 
-    # 変換実行
+    start_time = time.perf_counter()
     converter = XmlToExcelConverter()
     converter.load_config(str(config_path))
     converter.convert(str(xml_path), str(output_path))
+    execution_time = time.perf_counter() - start_time
+    test_logger.info(f"深さ{depth}: {execution_time:.3f}秒, エンティティ数 {len(created)}")
 
-    # 結果の検証
-    execution_time = time.time() - start_time
-    peak_memory = measure_memory()
-    memory_increase = peak_memory - initial_memory
+    element_count = depth * 2
+    assert len(created) <= element_count, f"エンティティが重複して作成されています: {len(created)}"
+    assert len({id(element) for element in created}) == len(created)
+    assert converter.data_frames["deep"].iloc[0]["ルートID"] == "0"
 
-    # 時間制限を緩和（2000レコードの処理に対して現実的な値）
-    assert execution_time < 15.0, f"大規模ファイルの実行時間が長すぎます: {execution_time:.2f}秒"
-    assert memory_increase < 200.0, f"大規模ファイルのメモリ使用量が多すぎます: {memory_increase:.2f}MB"
-    assert output_path.exists()
 
+def test_collection_detection_single_pass(monkeypatch):
+    """コレクション判定が各子要素を一度だけ調べることを確認"""
+    checked = []
+    original_has_content = ChildTagCounter.has_content
 
-def test_resource_management(tmp_path):
-    """リソース管理の総合テスト"""
-    xml_path = tmp_path / "test.xml"
-    config_path = tmp_path / "config.toml"
-    output_path = tmp_path / "output.xlsx"
-    create_test_config(config_path)
-
-    # 1. 段階的なメモリ使用量の確認
-    record_counts = [100, 500, 1000]  # サイズを小さく調整
-    memory_increases = []
-
-    for count in record_counts:
-        # 一時ファイルを削除してクリーンな状態を確保
-        xml_path.unlink(missing_ok=True)
-        output_path.unlink(missing_ok=True)
-        gc.collect()
-        time.sleep(0.1)  # GC完了を待機
-
-        # ファイル生成
-        create_test_xml(xml_path, count)
-
-        # 変換前のメモリ使用量を計測
-        initial_memory = measure_memory()
-
-        # 変換実行
-        converter = XmlToExcelConverter()
-        converter.load_config(str(config_path))
-        converter.convert(str(xml_path), str(output_path))
-
-        # 変換後のメモリ使用量を計測
-        peak_memory = measure_memory()
-        memory_increase = peak_memory - initial_memory
-        memory_increases.append(memory_increase)
-
-        # オブジェクトを解放
-        del converter
-        gc.collect()
-        time.sleep(0.1)  # GC完了を待機
-
-    # メモリ増加率が緩やかであることを確認
-    for i in range(len(memory_increases) - 1):
-        if memory_increases[i] > 0:  # 0除算を防ぐ
-            ratio = memory_increases[i + 1] / memory_increases[i]
-            msg = f"メモリ増加: {memory_increases[i]:.1f}MB → {memory_increases[i+1]:.1f}MB"
-            assert ratio < 7.0, msg
-
-    # 2. エラー時のリソース解放
-    invalid_xml = "不正なXML"
-    xml_path.write_text(invalid_xml)
-    error_initial_memory = measure_memory()
-
-    with pytest.raises(Exception):
-        converter = XmlToExcelConverter()
-        converter.load_config(str(config_path))
-        converter.convert(str(xml_path), str(output_path))
-
-    del converter
-    gc.collect()
-    time.sleep(0.1)  # GC完了を待機
-
-    error_final_memory = measure_memory()
-    error_memory_diff = error_final_memory - error_initial_memory
-
-    # エラー後のメモリ増加は50MB以内であることを期待
-    assert error_memory_diff < 50.0, f"エラー後のメモリリーク: {error_memory_diff:.1f}MB"
+    def counting_has_content(element):
+        checked.append(element)
+        return original_has_content(element)
+
+    monkeypatch.setattr(ChildTagCounter, "has_content", staticmethod(counting_has_content))
+
+    child_count = 2000
+    element = ET.fromstring("<r>" + "<x><v>1</v></x>" * child_count + "<y><v>1</v></y>" * child_count + "</r>")
+    assert EntityContext().is_collection_element(element) == (True, "x")
+    assert len(checked) == 2 * child_count
+    assert len({id(child) for child in checked}) == len(checked)
@@ -0,0 +1,93 @@
+"""プロファイルの出力のテスト"""
+
+import pstats
+import pytest
+from xml2xlsx.cli import main
+from xml2xlsx.converter import XmlToExcelConverter
+from xml2xlsx.profiling import TAG_FILE, collapse_stacks, profile
+
+CONFIG = {"mapping": {"root.item": {"sheet_name": "items", "columns": {"name": "名前"}}, "other": {"columns": {}}}}
+
+
+def read_collapsed(path):
+    """collapsed stack 形式のファイルを (呼び出し経路, 時間) のリストとして読み込む"""
+    lines = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, count = line.rstrip("\n").rsplit(" ", 1)
+            lines.append((stack.split(";"), int(count)))
+    return lines
+
+
+def test_profile_convert(tmp_path):
+    """変換処理のプロファイルが入力サイズとマッピング設定の数の付加情報とともに出力されることをテスト"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text("<root>" + "<item><name>A</name></item>" * 2000 + "</root>")
+    converter = XmlToExcelConverter()
+    converter.config = CONFIG
+
+    with profile(str(tmp_path / "prof" / "run.pstats"), [str(xml_path)], converter.config, mode="tree") as result:
+        converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+
+    size = xml_path.stat().st_size
+    assert result.pstats_path == str(tmp_path / "prof" / "run.pstats")
+    assert result.label() == f"input_size={size},mappings=2,mode=tree"
+
+    stats = pstats.Stats(result.pstats_path).stats  # type: ignore[attr-defined]
+    assert (TAG_FILE, 0, result.label()) in stats
+    assert any(name == "convert" for _, _, name in stats)
+
+    lines = read_collapsed(result.collapsed_path)
+    assert lines
+    assert all(stack[0] == f"xml2xlsx[{result.label()}]" for stack, _ in lines)
+    assert any(frame.endswith(":_extract_data") for stack, _ in lines for frame in stack)
+
+
+def test_profile_written_on_error(tmp_path):
+    """処理中に例外が発生した場合もプロファイルを出力することをテスト"""
+    with pytest.raises(ValueError):
+        with profile(str(tmp_path / "failed")) as result:
+            raise ValueError("失敗")
+    assert (tmp_path / "failed.pstats").exists()
+    assert result.collapsed_path == str(tmp_path / "failed.collapsed.txt")
+
+
+def test_collapse_stacks():
+    """呼び出し元ごとの累積時間の比率で自身の時間を経路に按分することをテスト"""
+    main_key = ("app.py", 1, "main")
+    a = ("app.py", 10, "a")
+    b = ("app.py", 20, "b")
+    leaf = ("lib.py", 5, "leaf")
+    stats = {
+        main_key: (1, 1, 0.001, 0.010, {}),
+        a: (1, 1, 0.001, 0.004, {main_key: (1, 1, 0.001, 0.004)}),
+        b: (1, 1, 0.001, 0.005, {main_key: (1, 1, 0.001, 0.005)}),
+        # leaf は a から 3ms、b から 4ms 呼び出される（自身の時間は合計 7ms）
+        leaf: (2, 2, 0.007, 0.007, {a: (1, 1, 0.003, 0.003), b: (1, 1, 0.004, 0.004)}),
+    }
+    result = {";".join(stack): count for stack, count in collapse_stacks(stats)}
+    assert result == {
+        "app.py:1:main": 1000,
+        "app.py:1:main;app.py:10:a": 1000,
+        "app.py:1:main;app.py:10:a;lib.py:5:leaf": 3000,
+        "app.py:1:main;app.py:20:b": 1000,
+        "app.py:1:main;app.py:20:b;lib.py:5:leaf": 4000,
+    }
+
+
+def test_cli_profile(tmp_path, capsys):
+    """--profile で設定生成のプロファイルを出力し、生成したマッピング設定の数を記録することをテスト"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text("<root><item><name>A</name></item><item><name>B</name></item></root>")
+    config_path = tmp_path / "config.toml"
+
+    args = ["generate", "-i", str(xml_path), "-o", str(config_path)]
+    result = main(args + ["--profile", str(tmp_path / "gen"), "-j", "2"])
+    assert result == 0
+    captured = capsys.readouterr()
+    assert "1プロセスで処理します" in captured.err
+    assert "プロファイルを出力しました" in captured.err
+
+    stack, _ = read_collapsed(tmp_path / "gen.collapsed.txt")[0]
+    assert stack[0].startswith(f"xml2xlsx[input_size={xml_path.stat().st_size},mappings=")
+    assert (tmp_path / "gen.pstats").exists()
@@ -0,0 +1,32 @@
+"""シートデータ蓄積のテスト"""
+
+import pandas as pd
+from xml2xlsx.sheet import SheetBuffer
+
+
+def test_sheet_buffer_columns_in_appearance_order():
+    """カラムが出現順に並び、欠損値が補完されることをテスト"""
+    sheet = SheetBuffer()
+    sheet.append({"名前": "A", "価格": "100"})
+    sheet.append({"価格": "200", "説明": "説明B"})
+    sheet.append({"名前": "C"})
+
+    assert len(sheet) == 3
+    assert sheet.columns == ["名前", "価格", "説明"]
+
+    df = sheet.to_dataframe()
+    assert list(df.columns) == ["名前", "価格", "説明"]
+    assert df["名前"].tolist()[0] == "A" and pd.isna(df["名前"].tolist()[1])
+    assert df["価格"].tolist()[:2] == ["100", "200"] and pd.isna(df["価格"].tolist()[2])
+    assert df["説明"].tolist()[1] == "説明B"
+
+
+def test_sheet_buffer_matches_concat():
+    """行ごとの連結と同じデータフレームが得られることをテスト"""
+    rows = [{"a": "1"}, {"b": "2"}, {"a": "3", "b": "4"}]
+    sheet = SheetBuffer()
+    for row in rows:
+        sheet.append(row)
+
+    expected = pd.concat([pd.DataFrame([row]) for row in rows], ignore_index=True)
+    pd.testing.assert_frame_equal(sheet.to_dataframe(), expected, check_dtype=False)
@@ -0,0 +1,378 @@
+"""ストリーミング処理のテスト"""
+
+import tempfile
+import tracemalloc
+from textwrap import dedent
+import pytest
+import pandas as pd
+from xml2xlsx.converter import XmlToExcelConverter
+from xml2xlsx.streaming import MERGE_FAN_IN, StreamProcessor
+
+
+def convert_both(tmp_path, xml_content: str, config: dict) -> tuple[dict, dict]:
+    """通常処理とストリーミング処理の両方で変換し、シートごとのデータを返す"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(xml_content).strip(), encoding="utf-8")
+
+    results = []
+    for streaming in (False, True):
+        output_path = tmp_path / f"output_{streaming}.xlsx"
+        converter = XmlToExcelConverter(streaming=streaming)
+        converter.config = config
+        converter.convert(str(xml_path), str(output_path))
+        results.append(pd.read_excel(output_path, sheet_name=None, dtype=str))
+    return results[0], results[1]
+
+
+def assert_same_output(tree_result: dict, stream_result: dict) -> None:
+    """シート順序と内容が一致することを確認"""
+    assert list(tree_result) == list(stream_result)
+    for sheet_name, df in tree_result.items():
+        pd.testing.assert_frame_equal(df, stream_result[sheet_name])
+
+
+def test_streaming_matches_tree_conversion(tmp_path):
+    """ストリーミング処理の出力が通常処理と一致することをテスト"""
+    xml_content = """
+        <orders>
+            <order id="1">
+                <order_date>2024-02-01</order_date>
+                <order_items>
+                    <order_item>
+                        <product_name>商品A</product_name>
+                        <quantity>2</quantity>
+                    </order_item>
+                    <order_item>
+                        <product_name>商品B</product_name>
+                        <quantity>1</quantity>
+                    </order_item>
+                </order_items>
+            </order>
+        </orders>
+    """
+    config = {
+        "mapping": {
+            "orders.order": {
+                "sheet_name": "注文",
+                "columns": {"@id": "注文番号", "order_date": "注文日"},
+            },
+            "orders.order.order_items.order_item": {
+                "sheet_name": "明細",
+                "columns": {"product_name": "商品名", "quantity": "数量", "order.@id": "注文番号"},
+            },
+        }
+    }
+
+    tree_result, stream_result = convert_both(tmp_path, xml_content, config)
+    assert_same_output(tree_result, stream_result)
+    assert stream_result["明細"]["商品名"].tolist() == ["商品A", "商品B"]
+    assert stream_result["明細"]["注文番号"].tolist() == ["1", "1"]
+
+
+def test_streaming_parent_value_defined_after_children(tmp_path):
+    """子要素より後に出現する親要素の値を参照できることをテスト"""
+    xml_content = """
+        <root>
+            <group>
+                <items>
+                    <item><name>A</name></item>
+                    <item><name>B</name></item>
+                </items>
+                <code>G1</code>
+            </group>
+        </root>
+    """
+    config = {
+        "mapping": {
+            "root.group.items.item": {
+                "sheet_name": "items",
+                "columns": {"name": "名前", "group.code": "グループ"},
+            }
+        }
+    }
+
+    tree_result, stream_result = convert_both(tmp_path, xml_content, config)
+    assert_same_output(tree_result, stream_result)
+    assert stream_result["items"]["グループ"].tolist() == ["G1", "G1"]
+
+
+def test_streaming_nearest_ancestor_with_same_tag(tmp_path):
+    """同じタグの祖先が入れ子になっている場合に最も近い祖先を参照することをテスト"""
+    xml_content = """
+        <root>
+            <section id="S1">
+                <section id="S2">
+                    <items>
+                        <item><name>A</name></item>
+                        <item><name>B</name></item>
+                    </items>
+                    <title>内側</title>
+                </section>
+                <title>外側</title>
+            </section>
+        </root>
+    """
+    config = {
+        "mapping": {
+            "root.section.section.items.item": {
+                "sheet_name": "items",
+                "columns": {"name": "名前", "section.@id": "節", "section.title": "見出し"},
+            }
+        }
+    }
+
+    tree_result, stream_result = convert_both(tmp_path, xml_content, config)
+    assert_same_output(tree_result, stream_result)
+    assert stream_result["items"]["節"].tolist() == ["S2", "S2"]
+    assert stream_result["items"]["見出し"].tolist() == ["内側", "内側"]
+
+
+def test_streaming_collection_children_subtree(tmp_path):
+    """コレクションの子要素の部分木の扱いが通常処理と一致することをテスト"""
+    xml_content = """
+        <root>
+            <header><title>T</title></header>
+            <orders>
+                <order id="1">
+                    <name>O1</name>
+                    <lines><line><code>L1</code></line></lines>
+                </order>
+                <order id="2">
+                    <name>O2</name>
+                    <lines><line><code>L2</code></line></lines>
+                </order>
+            </orders>
+            <summary><line><code>S1</code></line></summary>
+        </root>
+    """
+    config = {
+        "mapping": {
+            "line": {"sheet_name": "lines", "columns": {"code": "コード"}},
+            "root.orders.order": {"sheet_name": "orders", "columns": {"@id": "ID", "name": "名前"}},
+            "root.header": {"sheet_name": "header", "columns": {"title": "タイトル"}},
+        }
+    }
+
+    tree_result, stream_result = convert_both(tmp_path, xml_content, config)
+    assert_same_output(tree_result, stream_result)
+    assert list(stream_result) == ["header", "orders", "lines"]
+
+
+def test_streaming_skips_unmapped_subtrees(tmp_path):
+    """行を出力しない部分木を読み飛ばしても出力が通常処理と一致することをテスト"""
+    xml_content = """
+        <root>
+            <meta><audit><by>A</by><by>B</by></audit></meta>
+            <catalog id="C1">
+                <group>
+                    <box><entry><sku>X1</sku></entry><entry><sku>X2</sku></entry></box>
+                </group>
+                <group><note>N</note></group>
+            </catalog>
+            <orders>
+                <order id="1"><name>O1</name><extra><a>1</a><b>2</b></extra></order>
+                <order id="2"><name>O2</name><extra><a>3</a></extra></order>
+            </orders>
+        </root>
+    """
+    config = {
+        "mapping": {
+            "entry": {"sheet_name": "entries", "columns": {"sku": "SKU", "catalog.@id": "カタログ"}},
+            "root.orders.order": {"sheet_name": "orders", "columns": {"@id": "ID", "name": "名前"}},
+        }
+    }
+
+    tree_result, stream_result = convert_both(tmp_path, xml_content, config)
+    assert_same_output(tree_result, stream_result)
+    assert stream_result["entries"]["SKU"].tolist() == ["X1", "X2"]
+    assert stream_result["entries"]["カタログ"].tolist() == ["C1", "C1"]
+
+    converter = XmlToExcelConverter(streaming=True)
+    converter.config = config
+    converter.convert(str(tmp_path / "test.xml"), str(tmp_path / "stats.xlsx"))
+    # meta・2つ目の group の部分木と、entry・order の子要素の部分木
+    assert converter.stats.elements_skipped == 15
+
+
+def test_streaming_requires_config(tmp_path):
+    """ストリーミング処理でも設定が必要なことをテスト"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text("<root><item>1</item></root>")
+
+    converter = XmlToExcelConverter(streaming=True)
+    with pytest.raises(Exception) as excinfo:
+        converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+    assert "設定ファイルが必要です" == str(excinfo.value)
+
+
+def test_streaming_memory_independent_of_file_size(tmp_path):
+    """ストリーミング処理のメモリ使用量がファイルサイズに依存しないことをテスト"""
+
+    def peak_memory(record_count: int) -> int:
+        xml_path = tmp_path / f"data_{record_count}.xml"
+        with open(xml_path, "w", encoding="utf-8") as f:
+            f.write("<root><records>")
+            for i in range(record_count):
+                f.write(f"<record id='{i}'><name>Name {i}</name><value>{i}</value></record>")
+            f.write("</records></root>")
+
+        processor = StreamProcessor(lambda path: None, lambda entity, ancestors: None)
+        tracemalloc.start()
+        try:
+            assert list(processor.iter_rows(str(xml_path))) == []
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small = peak_memory(1000)
+    large = peak_memory(20000)
+    assert large < small * 2, f"メモリ使用量が増加しています: {small} → {large} bytes"
+
+
+def test_streaming_yields_rows_before_end_of_file(tmp_path):
+    """順序が確定した行がファイルの読み込み完了前に返されることをテスト"""
+    xml_path = tmp_path / "data.xml"
+    with open(xml_path, "w", encoding="utf-8") as f:
+        f.write("<root>")
+        for i in range(5000):
+            f.write(f"<record id='{i}'><name>Name {i}</name></record>")
+        f.write("</root>")
+
+    converter = XmlToExcelConverter(streaming=True)
+    converter.config = {"mapping": {"root.record": {"columns": {"@id": "ID"}}}}
+    processor = StreamProcessor(converter._find_columns, converter._extract_data)
+
+    with open(xml_path, "rb") as source:
+        rows = processor.iter_rows(source)
+        assert next(rows) == ("root.record", {"ID": "0"})
+        assert source.tell() < xml_path.stat().st_size
+        assert sum(1 for _ in rows) == 4999
+
+
+def test_streaming_spilled_rows_keep_order(tmp_path):
+    """一時ファイルに退避した行の順序と除外が保たれることをテスト"""
+    xml_path = tmp_path / "data.xml"
+    xml_path.write_text(
+        dedent(
+            """
+            <root>
+                <header><title>T</title></header>
+                <orders>
+                    <order id="1"><name>O1</name><lines><line><code>L1</code></line></lines></order>
+                    <order id="2"><name>O2</name><lines><line><code>L2</code></line></lines></order>
+                </orders>
+                <summary><line><code>S1</code></line><line><code>S2</code></line></summary>
+                <footer><title>F</title></footer>
+            </root>
+            """
+        ).strip(),
+        encoding="utf-8",
+    )
+    converter = XmlToExcelConverter()
+    converter.config = {
+        "mapping": {
+            "line": {"columns": {"code": "コード", "orders.@id": "ID"}},
+            "root.orders.order": {"columns": {"@id": "ID", "name": "名前"}},
+            "title": {"columns": {"title": "タイトル"}},
+        }
+    }
+
+    expected = list(converter._iter_rows(str(xml_path)))
+    for threshold in (1, 2, 3):
+        processor = StreamProcessor(converter._find_columns, converter._extract_data, spill_threshold=threshold)
+        assert list(processor.iter_rows(str(xml_path))) == expected
+    assert [path for path, _ in expected] == [
+        "root.header.title",
+        "root.orders.order",
+        "root.orders.order",
+        "root.summary.line",
+        "root.summary.line",
+        "root.footer.title",
+    ]
+
+
+def test_streaming_many_spilled_runs(tmp_path, monkeypatch):
+    """退避ファイルが多数になる場合も、同時に開くファイル数を抑えて順序を保つことをテスト"""
+    xml_path = tmp_path / "data.xml"
+    with open(xml_path, "w", encoding="utf-8") as f:
+        # ルート要素の行が最後まで確定しないため、以降の行はすべて退避される
+        f.write('<root v="R"><records>')
+        for i in range(3000):
+            f.write(f"<record id='{i}'><name>Name {i}</name></record>")
+        f.write("</records></root>")
+
+    open_files = []
+    max_open = 0
+    temporary_file = tempfile.TemporaryFile
+
+    def tracked_temporary_file():
+        nonlocal max_open
+        file = temporary_file()
+        open_files.append(file)
+        max_open = max(max_open, sum(1 for opened in open_files if not opened.closed))
+        return file
+
+    monkeypatch.setattr(tempfile, "TemporaryFile", tracked_temporary_file)
+    converter = XmlToExcelConverter()
+    converter.config = {
+        "mapping": {"root": {"columns": {"@v": "V"}}, "root.records.record": {"columns": {"@id": "ID", "name": "名前"}}}
+    }
+    processor = StreamProcessor(converter._find_columns, converter._extract_data, spill_threshold=5)
+    assert list(processor.iter_rows(str(xml_path))) == list(converter._iter_rows(str(xml_path)))
+    assert len(open_files) >= 600
+    assert max_open <= 3 * MERGE_FAN_IN
+    assert all(opened.closed for opened in open_files)
+
+
+def test_streaming_attribute_only_records_memory(tmp_path):
+    """属性のみを持つ要素の並び（親要素が閉じるまでコレクション判定が確定しない）でメモリ使用量が増加しないことをテスト"""
+    converter = XmlToExcelConverter()
+    converter.config = {"mapping": {"root.records.record": {"columns": {"@id": "ID", "@name": "名前"}}}}
+
+    def peak_memory(record_count: int) -> int:
+        xml_path = tmp_path / f"data_{record_count}.xml"
+        with open(xml_path, "w", encoding="utf-8") as f:
+            f.write("<root><records>")
+            for i in range(record_count):
+                f.write(f"<record id='{i}' name='Name {i}'/>")
+            f.write("</records></root>")
+
+        processor = StreamProcessor(converter._find_columns, converter._extract_data, spill_threshold=1000)
+        tracemalloc.start()
+        try:
+            assert sum(1 for _ in processor.iter_rows(str(xml_path))) == record_count
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # 退避したファイルの読み込みバッファはマージの段数（レコード数の対数）に応じて増えるため、
+    # レコード数に比例して増加しないことを確認する（比例する場合は8倍近くとなる）
+    small = peak_memory(5000)
+    large = peak_memory(40000)
+    assert large < small * 3, f"メモリ使用量がレコード数に比例して増加しています: {small} → {large} bytes"
+
+
+def test_streaming_spilled_children_collection(tmp_path):
+    """判定待ちの子要素を退避した後に親要素がコレクションと判定された場合も、ツリー走査と同じ行を返すことをテスト"""
+    xml_path = tmp_path / "data.xml"
+    with open(xml_path, "w", encoding="utf-8") as f:
+        f.write("<root><records>")
+        for i in range(50):
+            f.write(f"<record id='{i}'/>")
+        # 内容を持つ要素が現れるため、親要素の終了時にコレクションと判定される
+        f.write("<meta>M</meta><record id='50'><v>1</v></record><record id='51'><v>2</v></record>")
+        f.write("</records><other><record id='x'/><record id='y'/></other></root>")
+
+    converter = XmlToExcelConverter()
+    converter.config = {
+        "mapping": {
+            "root.records": {"columns": {"meta": "メタ"}},
+            "record": {"columns": {"@id": "ID", "v": "値"}},
+        }
+    }
+    expected = list(converter._iter_rows(str(xml_path)))
+    # records はコレクションのため自身の行は出力しない
+    assert [path for path, _ in expected] == ["root.records.record"] * 52 + ["root.other.record"] * 2
+    for threshold in (3, 10_000):
+        processor = StreamProcessor(converter._find_columns, converter._extract_data, spill_threshold=threshold)
+        assert list(processor.iter_rows(str(xml_path))) == expected
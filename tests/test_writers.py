@@ -0,0 +1,392 @@
+"""出力処理のテスト"""
+
+import tracemalloc
+from decimal import Decimal
+from textwrap import dedent
+import pytest
+import pandas as pd
+from openpyxl import load_workbook
+from xml2xlsx.converter import XmlToExcelConverter, ConfigurationError
+from xml2xlsx.sheet import SheetBuffer
+from xml2xlsx import writers
+from xml2xlsx.writers import StreamingWriter, WriteOnlyExcelWriter
+
+XML_CONTENT = """
+    <orders>
+        <order id="1">
+            <order_date>2024-02-01</order_date>
+            <order_items>
+                <order_item>
+                    <product_name>商品A</product_name>
+                    <quantity>2</quantity>
+                </order_item>
+                <order_item>
+                    <product_name>商品B</product_name>
+                </order_item>
+            </order_items>
+        </order>
+    </orders>
+"""
+
+CONFIG = {
+    "mapping": {
+        "orders.order": {
+            "sheet_name": "注文",
+            "columns": {"order_date": "注文日", "@id": "注文番号"},
+        },
+        "orders.order.order_items.order_item": {
+            "sheet_name": "明細",
+            "columns": {"order.@id": "注文番号", "quantity": "数量", "product_name": "商品名"},
+        },
+    }
+}
+
+
+def convert(tmp_path, write_only: bool = False, **options) -> str:
+    """変換して出力ファイルのパスを返す"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+    output_path = tmp_path / f"output_{write_only}_{'_'.join(options)}.xlsx"
+    converter = XmlToExcelConverter(write_only=write_only, **options)
+    converter.config = CONFIG
+    converter.convert(str(xml_path), str(output_path))
+    return str(output_path)
+
+
+def test_write_only_matches_default_output(tmp_path):
+    """書き込み専用モードの出力が通常の出力と一致することをテスト"""
+    expected = pd.read_excel(convert(tmp_path, False), sheet_name=None, dtype=str)
+    actual = pd.read_excel(convert(tmp_path, True), sheet_name=None, dtype=str)
+
+    assert list(expected) == list(actual) == ["注文", "明細"]
+    for sheet_name, df in expected.items():
+        pd.testing.assert_frame_equal(df, actual[sheet_name])
+
+
+def test_write_only_column_order(tmp_path):
+    """書き込み専用モードで設定のカラム順序と欠損値が保たれることをテスト"""
+    workbook = load_workbook(convert(tmp_path, True))
+    rows = list(workbook["明細"].values)
+
+    assert rows[0] == ("注文番号", "数量", "商品名")
+    assert rows[1] == ("1", "2", "商品A")
+    assert rows[2] == ("1", None, "商品B")
+
+
+def test_sheet_buffer_iter_rows():
+    """指定したカラムの順序で行データを取得できることをテスト"""
+    buffer = SheetBuffer()
+    buffer.append({"a": "1", "b": "2"})
+    buffer.append({"c": "3"})
+
+    assert list(buffer.iter_rows()) == [("1", "2", None), (None, None, "3")]
+    assert list(buffer.iter_rows(["c", "a"])) == [(None, "1"), ("3", None)]
+
+
+def test_write_only_save_memory(tmp_path):
+    """書き込み専用モードの保存時のメモリ使用量が行数に依存しないことをテスト"""
+
+    def measure(row_count: int) -> int:
+        converter = XmlToExcelConverter(write_only=True)
+        converter.config = {"mapping": {"root.item": {"columns": {"@id": "ID", "name": "名前"}}}}
+        sheet = converter.sheets["item"] = SheetBuffer()
+        for i in range(row_count):
+            sheet.append({"ID": str(i), "名前": f"name{i}"})
+
+        tracemalloc.start()
+        converter._save_write_only(str(tmp_path / f"output_{row_count}.xlsx"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    small = measure(1_000)
+    large = measure(5_000)
+    assert large < small * 2
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_pipeline_matches_default_output(tmp_path, streaming):
+    """パイプライン処理の出力が通常の出力と一致することをテスト"""
+    expected = pd.read_excel(convert(tmp_path), sheet_name=None, dtype=str)
+    actual = pd.read_excel(convert(tmp_path, pipeline=True, streaming=streaming), sheet_name=None, dtype=str)
+
+    assert list(expected) == list(actual)
+    for sheet_name, df in expected.items():
+        pd.testing.assert_frame_equal(df, actual[sheet_name])
+
+
+def test_pipeline_does_not_accumulate_rows(tmp_path):
+    """パイプライン処理では行データをシートに蓄積しないことをテスト"""
+    converter = XmlToExcelConverter(pipeline=True)
+    converter.config = CONFIG
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+    converter.convert(str(xml_path), str(tmp_path / "output.xlsx"))
+
+    assert converter.sheets == {}
+    assert converter.data_frames == {}
+
+
+def test_streaming_writer_spools_until_header_is_known(tmp_path):
+    """見出し行の確定前の行が退避され、設定の順序で書き込まれることをテスト"""
+    output_path = tmp_path / "output.xlsx"
+    ordered = {"items": ["ID", "名前", "価格"], "other": []}
+    writer = StreamingWriter(WriteOnlyExcelWriter(str(output_path)), lambda sheet_name: ordered[sheet_name])
+    writer.append("items", {"ID": "1"})
+    writer.append("other", {"b": "x", "a": "y"})
+    writer.append("items", {"価格": "100", "ID": "2"})
+    writer.append("items", {"名前": "商品C", "ID": "3"})
+    writer.append("items", {"ID": "4", "未設定": "z"})
+    writer.save()
+
+    workbook = load_workbook(output_path)
+    assert workbook.sheetnames == ["items", "other"]
+    assert list(workbook["items"].values) == [
+        ("ID", "名前", "価格"),
+        ("1", None, None),
+        ("2", None, "100"),
+        ("3", "商品C", None),
+        ("4", None, None),
+    ]
+    assert list(workbook["other"].values) == [("b", "a"), ("x", "y")]
+
+
+def test_streaming_writer_converts_typed_columns_in_batches(tmp_path, monkeypatch):
+    """型を宣言したカラムが一定の行数ごとに変換されて書き込まれることをテスト"""
+    monkeypatch.setattr(writers, "TYPED_BATCH_SIZE", 2)
+    output_path = tmp_path / "output.xlsx"
+    writer = StreamingWriter(
+        WriteOnlyExcelWriter(str(output_path)), lambda sheet_name: ["ID", "価格"], lambda sheet_name: {"価格": "int"}
+    )
+    writer.append("items", {"ID": "1"})
+    for i in range(2, 6):
+        writer.append("items", {"ID": str(i), "価格": str(i * 100)})
+    writer.save()
+
+    assert list(load_workbook(output_path)["items"].values) == [
+        ("ID", "価格"),
+        ("1", None),
+        ("2", 200),
+        ("3", 300),
+        ("4", 400),
+        ("5", 500),
+    ]
+
+
+def test_pipeline_memory_independent_of_size(tmp_path):
+    """ストリーミングとパイプライン処理のメモリ使用量がレコード数に依存しないことをテスト"""
+    config = {"mapping": {"root.item": {"columns": {"@id": "ID", "name": "名前"}}}}
+
+    def measure(record_count: int) -> int:
+        xml_path = tmp_path / f"test_{record_count}.xml"
+        with open(xml_path, "w", encoding="utf-8") as f:
+            f.write("<root>")
+            for i in range(record_count):
+                f.write(f'<item id="{i}"><name>name{i}</name></item>')
+            f.write("</root>")
+
+        converter = XmlToExcelConverter(streaming=True, pipeline=True)
+        converter.config = config
+        tracemalloc.start()
+        converter.convert(str(xml_path), str(tmp_path / f"output_{record_count}.xlsx"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    small = measure(1_000)
+    large = measure(5_000)
+    assert large < small * 2
+
+
+def test_detect_format():
+    """出力形式が引数・拡張子の順に決定されることをテスト"""
+    assert writers.detect_format("out.xlsx") == "xlsx"
+    assert writers.detect_format("out.CSV") == "csv"
+    assert writers.detect_format("out.parquet") == "parquet"
+    assert writers.detect_format("out.feather") == "arrow"
+    assert writers.detect_format("out.dat") == "xlsx"
+    assert writers.detect_format("out.xlsx", "csv") == "csv"
+    with pytest.raises(ValueError, match="不明な出力形式です"):
+        writers.detect_format("out.xlsx", "json")
+
+
+@pytest.mark.parametrize("options", [{}, {"streaming": True, "pipeline": True}])
+def test_csv_output_per_sheet(tmp_path, options):
+    """CSV形式ではシートごとにファイルが作成されることをテスト"""
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+
+    converter = XmlToExcelConverter(**options)
+    converter.config = CONFIG
+    converter.convert(str(xml_path), str(tmp_path / "output.csv"))
+
+    assert converter.data_frames == {}
+    orders = pd.read_csv(tmp_path / "output_注文.csv", dtype=str, keep_default_na=False)
+    items = pd.read_csv(tmp_path / "output_明細.csv", dtype=str, keep_default_na=False)
+    assert orders.to_dict("list") == {"注文日": ["2024-02-01"], "注文番号": ["1"]}
+    assert items.to_dict("list") == {"注文番号": ["1", "1"], "数量": ["2", ""], "商品名": ["商品A", "商品B"]}
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+@pytest.mark.parametrize("options", [{}, {"streaming": True, "pipeline": True}])
+def test_columnar_output(tmp_path, monkeypatch, output_format, options):
+    """Parquet・Arrow IPC形式で型を宣言したカラムがスキーマに反映されることをテスト"""
+    pyarrow = pytest.importorskip("pyarrow")
+    monkeypatch.setattr(writers, "RECORD_BATCH_SIZE", 1)
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+    config = {"mapping": dict(CONFIG["mapping"])}
+    config["mapping"]["orders.order.order_items.order_item"] = {
+        **CONFIG["mapping"]["orders.order.order_items.order_item"],
+        "types": {"注文番号": "int", "数量": "int"},
+    }
+
+    converter = XmlToExcelConverter(output_format=output_format, **options)
+    converter.config = config
+    converter.convert(str(xml_path), str(tmp_path / "output"))
+
+    path = tmp_path / f"output_明細.{output_format}"
+    if output_format == "parquet":
+        table = pytest.importorskip("pyarrow.parquet").read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(str(path)).read_all()
+    assert table.schema.field("数量").type == pyarrow.int64()
+    assert table.schema.field("商品名").type == pyarrow.string()
+    assert table.to_pydict() == {"注文番号": [1, 1], "数量": [2, None], "商品名": ["商品A", "商品B"]}
+
+
+@pytest.mark.parametrize("options", [{}, {"streaming": True, "pipeline": True}])
+def test_columnar_decimal_precision(tmp_path, monkeypatch, options):
+    """decimal 型のカラムの精度を値から決定し、収まらない場合は文字列とすることをテスト"""
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(writers, "RECORD_BATCH_SIZE", 1)
+    large = "1" * 30 + ".12345"
+    values = {
+        "small": ["1.5", "-20.25"],
+        "large": ["0.1", large],
+        "huge": ["9" * 80, "1"],
+        "inf": ["1", "Infinity"],
+    }
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(
+        "<root>"
+        + "".join(
+            "<item>" + "".join(f"<{name}>{column[i]}</{name}>" for name, column in values.items()) + "</item>"
+            for i in range(2)
+        )
+        + "</root>"
+    )
+
+    converter = XmlToExcelConverter(**options)
+    converter.config = {
+        "mapping": {
+            "root.item": {
+                "sheet_name": "items",
+                "columns": {name: name for name in values},
+                "types": {name: "decimal" for name in values},
+            }
+        }
+    }
+    converter.convert(str(xml_path), str(tmp_path / "output.parquet"))
+
+    table = pq.read_table(tmp_path / "output_items.parquet")
+    assert str(table.schema.field("small").type) == "decimal128(4, 2)"
+    assert str(table.schema.field("large").type) == "decimal128(35, 5)"
+    assert str(table.schema.field("huge").type) == "string"
+    assert str(table.schema.field("inf").type) == "string"
+    assert table.to_pydict() == {
+        "small": [Decimal("1.50"), Decimal("-20.25")],
+        "large": [Decimal("0.10000"), Decimal(large)],
+        "huge": ["9" * 80, "1"],
+        "inf": ["1", "Infinity"],
+    }
+
+
+def test_columnar_output_requires_pyarrow(tmp_path, monkeypatch):
+    """pyarrow がない場合に Parquet 形式の出力がエラーとなることをテスト"""
+    monkeypatch.setattr(writers, "pyarrow", None)
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+
+    converter = XmlToExcelConverter()
+    converter.config = CONFIG
+    with pytest.raises(ConfigurationError, match="pyarrow が必要です"):
+        converter.convert(str(xml_path), str(tmp_path / "output.parquet"))
+
+
+def test_sheet_file_path():
+    """出力ファイルの拡張子が出力形式のものの場合に除去されることをテスト"""
+    assert writers.sheet_file_path("out.arrow", "items", ".arrow") == "out_items.arrow"
+    assert writers.sheet_file_path("out.feather", "items", ".arrow") == "out_items.arrow"
+    assert writers.sheet_file_path("out.CSV", "items", ".csv") == "out_items.csv"
+    assert writers.sheet_file_path("out.data", "items", ".csv") == "out.data_items.csv"
+    assert writers.sheet_file_path("out.parquet", "items", ".arrow") == "out.parquet_items.arrow"
+
+
+def test_feather_output_file_name(tmp_path):
+    """.feather の出力ファイルから拡張子を除いたシートのファイルを作成することをテスト"""
+    pytest.importorskip("pyarrow")
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text(dedent(XML_CONTENT).strip(), encoding="utf-8")
+
+    converter = XmlToExcelConverter()
+    converter.config = CONFIG
+    converter.convert(str(xml_path), str(tmp_path / "output.feather"))
+
+    assert (tmp_path / "output_明細.arrow").exists()
+    assert not list(tmp_path.glob("output.feather_*"))
+
+
+def test_rollover_sheet_name():
+    """続きのシート名が31文字以内で既存のシートと重複しないことをテスト"""
+    assert writers.rollover_sheet_name("records", 2) == "records_2"
+    long_name = "あ" * 31
+    assert writers.rollover_sheet_name(long_name, 12) == "あ" * 28 + "_12"
+    assert writers.rollover_sheet_name("records", 2, {"records_2", "records_3"}) == "records_4"
+
+
+@pytest.mark.parametrize("options", [{}, {"write_only": True}, {"streaming": True, "pipeline": True}])
+def test_sheet_rollover_at_row_limit(tmp_path, monkeypatch, options):
+    """行数がExcelの上限を超えたシートが続きのシートに分割されることをテスト"""
+    monkeypatch.setattr(writers, "EXCEL_MAX_ROWS", 3)
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text("<root>" + "".join(f"<item id='{i}'/>" for i in range(5)) + "<last id='x'/></root>")
+
+    converter = XmlToExcelConverter(**options)
+    converter.config = {
+        "mapping": {
+            "root.item": {"sheet_name": "records", "columns": {"@id": "ID"}},
+            "root.last": {"sheet_name": "last", "columns": {"@id": "ID"}},
+        }
+    }
+    output_path = tmp_path / "output.xlsx"
+    converter.convert(str(xml_path), str(output_path))
+
+    workbook = load_workbook(output_path)
+    assert sorted(workbook.sheetnames) == ["last", "records", "records_2", "records_3"]
+    assert list(workbook["records"].values) == [("ID",), ("0",), ("1",)]
+    assert list(workbook["records_2"].values) == [("ID",), ("2",), ("3",)]
+    assert list(workbook["records_3"].values) == [("ID",), ("4",)]
+
+
+@pytest.mark.parametrize("options", [{}, {"write_only": True}, {"streaming": True, "pipeline": True}])
+def test_sheet_rollover_avoids_mapped_sheet_names(tmp_path, monkeypatch, options):
+    """続きのシートの名前が後から出力する設定のシート名と重複しないことをテスト"""
+    monkeypatch.setattr(writers, "EXCEL_MAX_ROWS", 3)
+    xml_path = tmp_path / "test.xml"
+    xml_path.write_text("<root>" + "".join(f"<item id='{i}'/>" for i in range(3)) + "<extra id='x'/></root>")
+
+    converter = XmlToExcelConverter(**options)
+    converter.config = {
+        "mapping": {
+            "root.item": {"sheet_name": "records", "columns": {"@id": "ID"}},
+            "root.extra": {"sheet_name": "records_2", "columns": {"@id": "ID"}},
+        }
+    }
+    output_path = tmp_path / "output.xlsx"
+    converter.convert(str(xml_path), str(output_path))
+
+    workbook = load_workbook(output_path)
+    assert sorted(workbook.sheetnames) == ["records", "records_2", "records_3"]
+    assert list(workbook["records_3"].values) == [("ID",), ("2",)]
+    assert list(workbook["records_2"].values) == [("ID",), ("x",)]